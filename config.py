@@ -21,10 +21,54 @@ class Settings(BaseSettings):
     COLUMNS_TO_READ: List  = columns_to_read
     DBT_DIR: str
 
+    # extraction: full | delta (since the last successful run), see the Readme for the rest
+    EXTRACTION_MODE: str = "full"
+    EXTRACTION_MAX_PAGES: int | None = None
+    EXTRACTION_CONCURRENCY: int = 1
+    PARTITION_START_YEAR: int = 2008
+    RATE_LIMIT_MAX_REQUESTS: int = 50
+    RATE_LIMIT_WINDOW_SECONDS: int = 60
+    SHARD_WRITER_QUEUE_SIZE: int = 8
+    PAGE_INGESTION: str = "json"
+
+    # compaction: final | incremental; clustering sorts in runs of COMPACTION_SORT_RUN_ROWS
+    COMPACTION_ROW_GROUP_SIZE: int = 5000
+    COMPACTION_COMPRESSION: str = "zstd"
+    COMPACTION_WORKERS: int = 4
+    COMPACTION_CLUSTER: bool = True
+    COMPACTION_SORT_RUN_ROWS: int = 50000
+    COMPACTION_MODE: str = "final"
+    COMPACTION_ROW_GROUPS_PER_FILE: int = 20
+
+    # transform: full | stream (needs LOAD_MODE=upsert or LOAD_RESUMABLE), python | arrow engine
+    TRANSFORM_MODE: str = "full"
+    TRANSFORM_BATCH_SIZE: int = 5000
+    TRANSFORM_ENGINE: str = "python"
+    TRANSFORM_WORKERS: int = 1
+    PRUNE_COLUMNS: bool = True
+    # md5 keeps the existing keys, siphash is for fresh warehouses only
+    SURROGATE_KEY_SCHEME: str = "md5"
+
+    # load: copy | insert, append | upsert
+    LOAD_METHOD: str = "copy"
+    LOAD_COPY_BATCH_ROWS: int = 50000
+    LOAD_WORKERS: int = 1
+    LOAD_MODE: str = "append"
+    LOAD_RESUMABLE: bool = False
+    LOAD_CHUNK_ROWS: int = 100000
+    LOAD_ABANDONED_AFTER_HOURS: int = 24
+
+    CHANGE_DETECTION: bool = False
+
+    TRANSFORM_CACHE: bool = True
+    TRANSFORM_CACHE_MAX_ENTRIES: int = 7
+    TRANSFORM_CACHE_MAX_MB: int = 2048
+
     model_config = SettingsConfigDict(
         env_file=".env",
         env_file_encoding="utf-8",
         case_sensitive=False,
+        env_ignore_empty=True,
         extra="ignore"
     )
 
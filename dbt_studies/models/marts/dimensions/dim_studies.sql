@@ -14,8 +14,10 @@ transformed as (
         brief_title,
         official_title,
         acronym,
-        brief_summary,
-        detailed_description,
+        -- long texts live once per distinct text in dim_study_texts
+        brief_summary_hash,
+        detailed_description_hash,
+        eligibility_criteria_hash,
         
 
         overall_status,
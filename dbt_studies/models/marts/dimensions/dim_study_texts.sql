@@ -0,0 +1,29 @@
+{{ config(
+    materialized='incremental',
+    unique_key='text_hash'
+) }}
+
+-- content-addressed: a text_hash always names the same content, so only new hashes are added
+
+with texts_source as (
+    select * from {{ source('staging', 'study_texts') }}
+),
+
+texts as (
+    select distinct on (text_hash)
+        text_hash,
+        content,
+        etl_created_at
+
+    from texts_source
+
+    {% if is_incremental() %}
+    where not exists (
+        select 1 from {{ this }} existing where existing.text_hash = texts_source.text_hash
+    )
+    {% endif %}
+
+    order by text_hash, etl_created_at
+)
+
+select * from texts
@@ -0,0 +1,330 @@
+from datetime import datetime
+from typing import Dict, List, Tuple
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from etl.study_spec import STUDY_SPEC, TEXT_COLUMNS
+from etl.transform import Transformer, CATEGORICAL_COLUMNS
+from etl.utils.keys import KeyGenerator
+from etl.utils.vocabulary import Vocabulary
+from etl.utils.log_service import progress_logger
+
+
+AGE_PATTERN = r'^\s*(?P<years>[+-]?\d+)(?:\s|$)'
+
+
+class ArrowTransformer:
+    """Columnar counterpart to Transformer, flattening the protocolSection struct with Arrow kernels."""
+
+    def __init__(self, parquet_path, change_detector=None, key_scheme: str = "md5"):
+        self.parquet_path = parquet_path
+        self.change_detector = change_detector
+        self.keys = KeyGenerator(key_scheme)
+        self.vocabulary = Vocabulary()
+        self.etl_created_at = None
+
+
+    def read_selective_parquet_columns(self, file_to_read: str, columns_to_read: List[str]) -> Dict[str, pd.DataFrame]:
+        """Same contract as Transformer.read_selective_parquet_columns."""
+        tables = self.flatten_parquet_to_tables(file_to_read, columns_to_read)
+        return {name: table.to_pandas() for name, table in tables.items()}
+
+
+    def flatten_parquet_to_tables(self, file_to_read: str, columns_to_read: List[str]) -> Dict[str, pa.Table]:
+        """Read the leaf columns under columns_to_read and flatten them into the staging tables."""
+        progress_logger.info(f"Reading parquet file at {file_to_read} (arrow engine)")
+        root = Transformer.nested_root(columns_to_read)
+        protocols = pa.chunked_array([
+            chunk
+            for file in Transformer.list_parquet_files(file_to_read)
+            for chunk in Transformer.select_nested(Transformer.read_columns(file, columns_to_read), root).chunks
+        ])
+        return self.flatten_protocols(protocols.combine_chunks())
+
+
+    def flatten_protocols(self, protocols: pa.StructArray) -> Dict[str, pa.Table]:
+        progress_logger.info(f"Flattening {len(protocols)} studies...")
+        self.etl_created_at = datetime.now().isoformat()
+
+        nct_id = self.field(protocols, 'identificationModule', 'nctId')
+        has_id = self.truthy(nct_id)
+        skipped = len(protocols) - pc.sum(has_id).as_py() if len(protocols) else 0
+        if skipped:
+            progress_logger.warning(f"{skipped} studies missing NCT ID, skipping")
+
+        protocols = protocols.filter(has_id)
+        nct_id = nct_id.filter(has_id)
+
+        if self.change_detector:
+            changed = self.detect_changes(protocols, nct_id)
+            protocols = protocols.filter(changed)
+            nct_id = nct_id.filter(changed)
+
+        study_key = self.generate_keys(nct_id)
+
+        studies, study_texts = self.split_texts(self.extract_studies(protocols, study_key, nct_id))
+        sponsors, study_sponsors = self.extract_sponsors(protocols, study_key)
+        conditions, study_conditions = self.extract_conditions(protocols, study_key)
+        interventions, study_interventions = self.extract_interventions(protocols, study_key)
+        sites, study_sites = self.extract_sites(protocols, study_key)
+
+        tables = {
+            'studies': studies,
+            'study_texts': study_texts,
+            'sponsors': sponsors,
+            'conditions': conditions,
+            'interventions': interventions,
+            'sites': sites,
+            'study_sponsors': study_sponsors,
+            'study_conditions': study_conditions,
+            'study_interventions': study_interventions,
+            'study_sites': study_sites,
+        }
+
+        for name, table in tables.items():
+            key_cols = [col for col in table.column_names if col.endswith('_key')]
+            original_len = table.num_rows
+            tables[name] = self.first_occurrences(table, key_cols)
+            if tables[name].num_rows < original_len:
+                progress_logger.info(f"  {name}: Removed {original_len - tables[name].num_rows} duplicates")
+
+        self.encode_categories(tables)
+
+        progress_logger.info(f"Tables created: { {name: table.num_rows for name, table in tables.items()} }")
+        return tables
+
+
+    def encode_categories(self, tables: Dict[str, pa.Table]):
+        """Dictionary-encode the CATEGORICAL_COLUMNS over the shared vocabulary."""
+        for name, columns in CATEGORICAL_COLUMNS.items():
+            table = tables[name]
+            for column in columns:
+                position = table.schema.get_field_index(column)
+                if position != -1:
+                    table = table.set_column(position, column, self.vocabulary.dictionary(column, table.column(position)))
+            tables[name] = table
+
+
+    def detect_changes(self, protocols: pa.StructArray, nct_id: pa.Array) -> pa.Array:
+        """Mask of studies that are new or changed."""
+        last_update = self.field(protocols, 'statusModule', 'lastUpdatePostDateStruct', 'date')
+        return pa.array([
+            self.change_detector.classify(study_id, updated, lambda idx=idx: protocols[idx].as_py()) != 'unchanged'
+            for idx, (study_id, updated) in enumerate(zip(nct_id.to_pylist(), last_update.to_pylist()))
+        ], pa.bool_())
+
+
+    def extract_studies(self, protocols: pa.StructArray, study_key: pa.Array, nct_id: pa.Array) -> pa.Table:
+        columns = {'study_key': study_key, 'nct_id': nct_id}
+        columns.update(STUDY_SPEC.project(protocols, self.field, {'age_years': self.extract_age_years, 'category': self.as_string}))
+
+        return self.with_timestamp(columns, len(protocols))
+
+
+    def split_texts(self, studies: pa.Table) -> Tuple[pa.Table, pa.Table]:
+        """Same as Transformer.split_texts."""
+        hashes, contents = [], []
+        for column in TEXT_COLUMNS:
+            position = studies.schema.get_field_index(column)
+            values = self.as_string(studies.column(position).combine_chunks())
+            present = pc.is_valid(values)
+            text_hash = pc.if_else(present, self.generate_keys(values), pa.scalar(None, pa.string()))
+            studies = studies.set_column(position, f"{column}_hash", text_hash)
+            hashes.append(text_hash.filter(present))
+            contents.append(values.filter(present))
+
+        texts = {'text_hash': pa.concat_arrays(hashes), 'content': pa.concat_arrays(contents)}
+        study_texts = self.with_timestamp(texts, len(texts['text_hash']))
+        return studies, self.first_occurrences(study_texts, ['text_hash'])
+
+
+    def extract_sponsors(self, protocols: pa.StructArray, study_key: pa.Array) -> Tuple[pa.Table, pa.Table]:
+        lead_name = self.field(protocols, 'sponsorCollaboratorsModule', 'leadSponsor', 'name')
+        has_lead = self.truthy(lead_name)
+        lead_idx = pc.indices_nonzero(has_lead)
+
+        # collaborators only count for studies that have a named lead sponsor
+        collaborators = self.field(protocols, 'sponsorCollaboratorsModule', 'collaborators').filter(has_lead)
+        collab_parent, collab = self.explode(collaborators)
+        collab_parent = pc.take(lead_idx, collab_parent)
+        has_name = self.truthy(self.field(collab, 'name'))
+        collab_parent, collab = collab_parent.filter(has_name), collab.filter(has_name)
+
+        lead_count, collab_count = len(lead_idx), len(collab)
+        combined = pa.table({
+            'study_idx': pa.concat_arrays([lead_idx.cast(pa.int64()), collab_parent.cast(pa.int64())]),
+            'is_lead': pa.concat_arrays([
+                pa.repeat(True, lead_count), pa.repeat(False, collab_count)
+            ]),
+            'position': pa.array(range(lead_count + collab_count), pa.int64()),
+            'sponsor_name': pa.concat_arrays([
+                self.as_string(lead_name.filter(has_lead)), self.as_string(self.field(collab, 'name'))
+            ]),
+            'sponsor_class': pa.concat_arrays([
+                self.as_string(self.field(protocols, 'sponsorCollaboratorsModule', 'leadSponsor', 'class').filter(has_lead)),
+                self.as_string(self.field(collab, 'class')),
+            ]),
+        })
+        # Transformer emits each study's lead sponsor followed by its collaborators
+        combined = combined.sort_by([('study_idx', 'ascending'), ('is_lead', 'descending'), ('position', 'ascending')])
+
+        sponsor_key = self.generate_keys(combined['sponsor_name'])
+        bridge_study_key = pc.take(study_key, combined['study_idx'])
+        role = pc.if_else(combined['is_lead'], 'lead', 'collab')
+
+        sponsors = self.with_timestamp({
+            'sponsor_key': sponsor_key,
+            'sponsor_name': combined['sponsor_name'],
+            'sponsor_class': combined['sponsor_class'],
+        }, combined.num_rows)
+
+        study_sponsors = self.with_timestamp({
+            'study_sponsor_key': self.generate_keys(bridge_study_key, sponsor_key, role),
+            'study_key': bridge_study_key,
+            'sponsor_key': sponsor_key,
+            'is_lead': combined['is_lead'],
+            'is_collaborator': pc.invert(combined['is_lead']),
+        }, combined.num_rows)
+
+        return sponsors, study_sponsors
+
+
+    def extract_conditions(self, protocols: pa.StructArray, study_key: pa.Array) -> Tuple[pa.Table, pa.Table]:
+        parent, condition = self.explode(self.field(protocols, 'conditionsModule', 'conditions'))
+        keep = self.truthy(condition)
+        parent, condition = parent.filter(keep), self.as_string(condition.filter(keep))
+
+        condition_key = self.generate_keys(condition)
+        bridge_study_key = pc.take(study_key, parent)
+
+        conditions = self.with_timestamp({
+            'condition_key': condition_key,
+            'condition_name': condition,
+        }, len(condition))
+
+        study_conditions = self.with_timestamp({
+            'study_condition_key': self.generate_keys(bridge_study_key, condition_key),
+            'study_key': bridge_study_key,
+            'condition_key': condition_key,
+        }, len(condition))
+
+        return conditions, study_conditions
+
+
+    def extract_interventions(self, protocols: pa.StructArray, study_key: pa.Array) -> Tuple[pa.Table, pa.Table]:
+        parent, intervention = self.explode(self.field(protocols, 'armsInterventionsModule', 'interventions'))
+        keep = self.truthy(self.field(intervention, 'name'))
+        parent, intervention = parent.filter(keep), intervention.filter(keep)
+
+        intervention_type = self.as_string(self.field(intervention, 'type'))
+        intervention_name = self.as_string(self.field(intervention, 'name'))
+        intervention_key = self.generate_keys(intervention_type, intervention_name)
+        bridge_study_key = pc.take(study_key, parent)
+
+        interventions = self.with_timestamp({
+            'intervention_key': intervention_key,
+            'intervention_type': intervention_type,
+            'intervention_name': intervention_name,
+            'intervention_description': self.field(intervention, 'description'),
+        }, len(intervention))
+
+        study_interventions = self.with_timestamp({
+            'study_intervention_key': self.generate_keys(bridge_study_key, intervention_key),
+            'study_key': bridge_study_key,
+            'intervention_key': intervention_key,
+        }, len(intervention))
+
+        return interventions, study_interventions
+
+
+    def extract_sites(self, protocols: pa.StructArray, study_key: pa.Array) -> Tuple[pa.Table, pa.Table]:
+        parent, location = self.explode(self.field(protocols, 'contactsLocationsModule', 'locations'))
+        keep = pc.or_(self.truthy(self.field(location, 'facility')), self.truthy(self.field(location, 'city')))
+        parent, location = parent.filter(keep), location.filter(keep)
+
+        facility = self.as_string(self.field(location, 'facility'))
+        city = self.as_string(self.field(location, 'city'))
+        country = self.as_string(self.field(location, 'country'))
+        site_key = self.generate_keys(facility, city, country)
+        bridge_study_key = pc.take(study_key, parent)
+
+        sites = self.with_timestamp({
+            'site_key': site_key,
+            'facility_name': facility,
+            'city': city,
+            'state': self.field(location, 'state'),
+            'zip': self.field(location, 'zip'),
+            'country': country,
+            'latitude': self.field(location, 'geoPoint', 'lat'),
+            'longitude': self.field(location, 'geoPoint', 'lon'),
+        }, len(location))
+
+        study_sites = self.with_timestamp({
+            'study_site_key': self.generate_keys(bridge_study_key, site_key),
+            'study_key': bridge_study_key,
+            'site_key': site_key,
+        }, len(location))
+
+        return sites, study_sites
+
+
+    @staticmethod
+    def field(array: pa.Array, *path: str) -> pa.Array:
+        """Struct field access that yields nulls for missing fields, like Transformer.safe_get."""
+        for name in path:
+            if not pa.types.is_struct(array.type) or array.type.get_field_index(name) == -1:
+                return pa.nulls(len(array))
+            array = pc.struct_field(array, name)
+        return array
+
+
+    @staticmethod
+    def explode(lists: pa.Array) -> Tuple[pa.Array, pa.Array]:
+        """Flatten a list column, returning (parent row index, values)."""
+        if not pa.types.is_list(lists.type) and not pa.types.is_large_list(lists.type):
+            return pa.array([], pa.int64()), pa.nulls(0)
+        return pc.list_parent_indices(lists), pc.list_flatten(lists)
+
+
+    @staticmethod
+    def truthy(array: pa.Array) -> pa.Array:
+        """Non-null, non-empty strings, as Python truthiness would see them."""
+        if pa.types.is_null(array.type):
+            return pa.repeat(False, len(array))
+        return pc.fill_null(pc.greater(pc.utf8_length(array), 0), False)
+
+
+    @staticmethod
+    def as_string(array: pa.Array) -> pa.Array:
+        return array if pa.types.is_string(array.type) else array.cast(pa.string())
+
+
+    @staticmethod
+    def extract_age_years(ages: pa.Array) -> pa.Array:
+        """Vectorised Transformer.extract_age_years: leading integer of strings like '18 Years'."""
+        if pa.types.is_null(ages.type):
+            return pa.nulls(len(ages), pa.int64())
+        years = pc.struct_field(pc.extract_regex(ArrowTransformer.as_string(ages), AGE_PATTERN), 'years')
+        return pc.cast(pc.if_else(pc.equal(years, ''), None, years), pa.int64())
+
+
+    def generate_keys(self, *arrays: pa.Array) -> pa.Array:
+        """KeyGenerator over whole columns."""
+        return pa.array(self.keys(*arrays), pa.string())
+
+
+    def with_timestamp(self, columns: Dict[str, pa.Array], num_rows: int) -> pa.Table:
+        columns['etl_created_at'] = pa.repeat(self.etl_created_at, num_rows)
+        return pa.table(columns)
+
+
+    @staticmethod
+    def first_occurrences(table: pa.Table, key_cols: List[str]) -> pa.Table:
+        """Keep the first row for each key combination, preserving row order."""
+        if not key_cols or table.num_rows == 0:
+            return table
+
+        indexed = table.select(key_cols).append_column('__row', pa.array(range(table.num_rows), pa.int64()))
+        first_rows = indexed.group_by(key_cols, use_threads=False).aggregate([('__row', 'min')])['__row_min']
+        return table.take(pc.take(first_rows, pc.sort_indices(first_rows)))
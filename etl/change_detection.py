@@ -0,0 +1,128 @@
+import hashlib
+import json
+import os
+import sqlite3
+from datetime import datetime
+from typing import Any, Callable, Dict
+
+from etl.utils.log_service import progress_logger
+
+
+class ChangeDetector:
+    """Index of nct_id -> (lastUpdatePostDate, content hash) deciding which studies to flatten and load."""
+
+    statuses = ('new', 'changed', 'unchanged')
+
+    def __init__(self, index_path: str, full_snapshot: bool = True):
+        self.index_path = index_path
+        # only a full extraction can tell that a study disappeared from the registry
+        self.full_snapshot = full_snapshot
+
+        os.makedirs(os.path.dirname(index_path) or '.', exist_ok=True)
+        self.conn = sqlite3.connect(index_path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS study_index ("
+            "nct_id TEXT PRIMARY KEY, last_update TEXT, content_hash TEXT NOT NULL)"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS change_reports ("
+            "run_at TEXT, new INTEGER, changed INTEGER, unchanged INTEGER, disappeared INTEGER)"
+        )
+        self.conn.commit()
+
+        self.pending: Dict[str, tuple] = {}
+        self.seen = set()
+        self.counts = {status: 0 for status in self.statuses}
+
+
+    @staticmethod
+    def content_hash(protocol: Dict) -> str:
+        """Stable hash of a protocolSection from pandas or Arrow."""
+        payload = json.dumps(
+            protocol, sort_keys=True, separators=(',', ':'),
+            default=lambda value: value.tolist() if hasattr(value, 'tolist') else str(value)
+        )
+        return hashlib.sha1(payload.encode()).hexdigest()
+
+
+    def classify(self, nct_id: str, last_update: str | None, get_protocol: Callable[[], Any]) -> str:
+        """Return 'new', 'changed' or 'unchanged'."""
+        self.seen.add(nct_id)
+        indexed = self.conn.execute(
+            "SELECT last_update, content_hash FROM study_index WHERE nct_id = ?", (nct_id,)
+        ).fetchone()
+
+        if indexed and last_update is not None and indexed[0] == last_update:
+            status = 'unchanged'
+        else:
+            content_hash = self.content_hash(get_protocol())
+            if indexed is None:
+                status = 'new'
+            elif indexed[1] == content_hash:
+                status = 'unchanged'
+            else:
+                status = 'changed'
+            self.pending[nct_id] = (last_update, content_hash)
+
+        self.counts[status] += 1
+        return status
+
+
+    def has_changed(self, protocol: Dict) -> bool:
+        """True if a protocolSection dict should go on to be flattened."""
+        nct_id = (protocol.get('identificationModule') or {}).get('nctId')
+        if not nct_id:
+            return True  # let the transformer report and skip it
+
+        last_update = ((protocol.get('statusModule') or {}).get('lastUpdatePostDateStruct') or {}).get('date')
+        return self.classify(nct_id, last_update, lambda: protocol) != 'unchanged'
+
+
+    def state(self) -> Dict:
+        """Picklable snapshot of what this detector saw, for merging across processes."""
+        return {'pending': self.pending, 'seen': self.seen, 'counts': self.counts}
+
+
+    def merge(self, state: Dict):
+        self.pending.update(state['pending'])
+        self.seen.update(state['seen'])
+        for status, count in state['counts'].items():
+            self.counts[status] += count
+
+
+    def disappeared(self) -> list:
+        if not self.full_snapshot:
+            return []
+        return [
+            nct_id for (nct_id,) in self.conn.execute("SELECT nct_id FROM study_index")
+            if nct_id not in self.seen
+        ]
+
+
+    def report(self) -> Dict[str, int]:
+        report = dict(self.counts)
+        report['disappeared'] = len(self.disappeared())
+        return report
+
+
+    def commit(self) -> Dict[str, int]:
+        """Persist the index updates and report; call only after the load succeeded."""
+        disappeared = self.disappeared()
+        report = dict(self.counts, disappeared=len(disappeared))
+
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO study_index (nct_id, last_update, content_hash) VALUES (?, ?, ?)",
+                [(nct_id, last_update, content_hash) for nct_id, (last_update, content_hash) in self.pending.items()]
+            )
+            self.conn.executemany("DELETE FROM study_index WHERE nct_id = ?", [(n,) for n in disappeared])
+            self.conn.execute(
+                "INSERT INTO change_reports VALUES (?, ?, ?, ?, ?)",
+                (datetime.now().isoformat(), report['new'], report['changed'],
+                 report['unchanged'], report['disappeared'])
+            )
+
+        self.pending = {}
+        progress_logger.info(f"Change detection report: {report}")
+        return report
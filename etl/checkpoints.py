@@ -0,0 +1,277 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, List
+
+import pyarrow.parquet as pq
+
+from etl.utils.exceptions import FileCompactionError
+from etl.utils.log_service import progress_logger, error_logger
+
+
+# partition name used by the sequential Extractor, which follows a single token chain
+REGISTRY = "registry"
+
+
+class CheckpointStore:
+    """Extraction runs and the per-page shard manifest in one SQLite database."""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+
+        # shared by the fetch loop and the shard writer thread
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=FULL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS runs ("
+            "run_id TEXT PRIMARY KEY, shard_dir TEXT NOT NULL, status TEXT NOT NULL, "
+            "started_at TEXT NOT NULL, finished_at TEXT)"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            "run_id TEXT NOT NULL, partition TEXT NOT NULL, page INTEGER NOT NULL, next_token TEXT, "
+            "shard_file TEXT NOT NULL, row_count INTEGER NOT NULL, checksum TEXT NOT NULL, saved_at TEXT NOT NULL, "
+            "PRIMARY KEY (run_id, partition, page))"
+        )
+        # set once incremental compaction has folded the shard into a closed dataset file
+        if 'compacted_file' not in {row[1] for row in self.conn.execute("PRAGMA table_info(pages)")}:
+            self.conn.execute("ALTER TABLE pages ADD COLUMN compacted_file TEXT")
+        # "full" or "delta"; a delta run only asks for studies updated on or after since
+        run_columns = {row[1] for row in self.conn.execute("PRAGMA table_info(runs)")}
+        if 'mode' not in run_columns:
+            self.conn.execute("ALTER TABLE runs ADD COLUMN mode TEXT")
+            self.conn.execute("ALTER TABLE runs ADD COLUMN since TEXT")
+        # delta extraction resumes from the newest value each watermark was advanced to
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS watermarks ("
+            "name TEXT PRIMARY KEY, value TEXT NOT NULL, updated_at TEXT NOT NULL)"
+        )
+        self.conn.commit()
+
+
+    def open_run(self, shard_dir: str, mode: str = "full", since: str | None = None) -> Dict:
+        """Resume the newest unfinished run, or start a new one writing to shard_dir."""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT run_id, shard_dir, status, started_at, mode, since FROM runs WHERE status != 'SUCCESS' "
+                "ORDER BY started_at DESC LIMIT 1"
+            ).fetchone()
+            if row:
+                progress_logger.info(f"Resuming run {row[0]} ({row[2]}, {row[4] or 'full'}) in {row[1]}")
+                return {
+                    'run_id': row[0], 'shard_dir': row[1], 'started_at': row[3],
+                    'mode': row[4] or 'full', 'since': row[5],
+                }
+
+            run_id = datetime.now().strftime("%Y%m%dT%H%M%S%f")
+            started_at = datetime.now().isoformat()
+            with self.conn:
+                self.conn.execute(
+                    "INSERT INTO runs (run_id, shard_dir, status, started_at, mode, since) "
+                    "VALUES (?, ?, 'IN PROGRESS', ?, ?, ?)",
+                    (run_id, shard_dir, started_at, mode, since)
+                )
+            progress_logger.info(f"Started {mode} run {run_id} in {shard_dir}" + (f" since {since}" if since else ""))
+            return {'run_id': run_id, 'shard_dir': shard_dir, 'started_at': started_at, 'mode': mode, 'since': since}
+
+
+    def finish_run(self, run_id: str, status: str):
+        with self.lock, self.conn:
+            self.conn.execute(
+                "UPDATE runs SET status = ?, finished_at = ? WHERE run_id = ?",
+                (status, datetime.now().isoformat(), run_id)
+            )
+
+
+    def watermark(self, name: str) -> str | None:
+        with self.lock:
+            row = self.conn.execute("SELECT value FROM watermarks WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+
+    def set_watermark(self, name: str, value: str):
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO watermarks (name, value, updated_at) VALUES (?, ?, ?)",
+                (name, value, datetime.now().isoformat())
+            )
+        progress_logger.info(f"Watermark {name} advanced to {value}")
+
+
+    def record_page(self, run_id: str, partition: str, page: int, next_token: str | None, shard_file: str):
+        """Record a shard that is already on disk. One transaction per page."""
+        row_count, checksum = self.describe_shard(shard_file)
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO pages "
+                "(run_id, partition, page, next_token, shard_file, row_count, checksum, saved_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (run_id, partition, page, next_token, shard_file, row_count, checksum, datetime.now().isoformat())
+            )
+
+
+    def resume_point(self, run_id: str, partition: str) -> Dict:
+        """Newest page of a partition whose shard still matches the manifest."""
+        while True:
+            with self.lock:
+                row = self.conn.execute(
+                    "SELECT page, next_token, shard_file, row_count, checksum FROM pages "
+                    "WHERE run_id = ? AND partition = ? ORDER BY page DESC LIMIT 1",
+                    (run_id, partition)
+                ).fetchone()
+            if row is None:
+                return {'page': 0, 'token': None, 'done': False}
+
+            page, token, shard_file, row_count, checksum = row
+            if self.shard_matches(shard_file, row_count, checksum):
+                return {'page': page, 'token': token, 'done': token is None}
+
+            error_logger.warning(
+                f"Shard {shard_file} for {partition} page {page} is missing or changed, fetching it again"
+            )
+            with self.lock, self.conn:
+                self.conn.execute(
+                    "DELETE FROM pages WHERE run_id = ? AND partition = ? AND page = ?",
+                    (run_id, partition, page)
+                )
+
+
+    def manifest(self, run_id: str) -> List[Dict]:
+        """Every recorded shard of a run, in partition and page order."""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT partition, page, shard_file, row_count, checksum FROM pages "
+                "WHERE run_id = ? ORDER BY partition, page",
+                (run_id,)
+            ).fetchall()
+        return [
+            {'partition': p, 'page': n, 'shard_file': f, 'row_count': r, 'checksum': c}
+            for p, n, f, r, c in rows
+        ]
+
+
+    def uncompacted_pages(self, run_id: str) -> List[Dict]:
+        """Recorded shards not yet folded into a closed dataset file, in partition and page order."""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT partition, page, next_token, shard_file, row_count FROM pages "
+                "WHERE run_id = ? AND compacted_file IS NULL ORDER BY partition, page",
+                (run_id,)
+            ).fetchall()
+        return [
+            {'partition': p, 'page': n, 'next_token': t, 'shard_file': f, 'row_count': r}
+            for p, n, t, f, r in rows
+        ]
+
+
+    def mark_compacted(self, run_id: str, partition: str, pages: List[int], compacted_file: str):
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "UPDATE pages SET compacted_file = ? WHERE run_id = ? AND partition = ? AND page = ?",
+                [(compacted_file, run_id, partition, page) for page in pages]
+            )
+
+
+    def compacted_files(self, run_id: str) -> set:
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT DISTINCT compacted_file FROM pages WHERE run_id = ? AND compacted_file IS NOT NULL",
+                (run_id,)
+            ).fetchall()
+        return {row[0] for row in rows}
+
+
+    def reset_compacted(self, run_id: str):
+        with self.lock, self.conn:
+            self.conn.execute("UPDATE pages SET compacted_file = NULL WHERE run_id = ?", (run_id,))
+
+
+    def compaction_inputs(self, run_id: str) -> List[tuple]:
+        """(shard file, expected row count) for every page of the run, in page order."""
+        pages_by_partition: Dict[str, Dict[int, Dict]] = {}
+        for entry in self.manifest(run_id):
+            pages_by_partition.setdefault(entry['partition'], {})[entry['page']] = entry
+
+        inputs = []
+        for partition, pages in pages_by_partition.items():
+            shard_dir = os.path.dirname(pages[max(pages)]['shard_file'])
+            for page in range(1, max(pages) + 1):
+                if page in pages:
+                    inputs.append((pages[page]['shard_file'], pages[page]['row_count']))
+                elif os.path.exists(f"{shard_dir}/{page}.parquet"):
+                    inputs.append((f"{shard_dir}/{page}.parquet", None))
+                else:
+                    raise FileCompactionError(f"page {page} of {partition} is neither in the manifest nor on disk")
+        return inputs
+
+
+    @staticmethod
+    def describe_shard(shard_file: str) -> tuple:
+        row_count = pq.ParquetFile(shard_file).metadata.num_rows
+        digest = hashlib.sha256()
+        with open(shard_file, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        return row_count, digest.hexdigest()
+
+
+    @classmethod
+    def shard_matches(cls, shard_file: str, row_count: int, checksum: str) -> bool:
+        if not os.path.exists(shard_file):
+            return False
+        try:
+            return cls.describe_shard(shard_file) == (row_count, checksum)
+        except Exception:
+            return False
+
+
+    def import_legacy_state(self, states_dirs: List[str]):
+        """One-off import of an unfinished run from the old last_*.py modules."""
+        for states_dir in states_dirs:
+            self._import_state_modules(states_dir)
+
+
+    def _import_state_modules(self, states_dir: str):
+        def read_value(name):
+            path = f"{states_dir}/{name}.py"
+            if not os.path.exists(path):
+                return None
+            match = re.search(r'=\s*"(.*)"', open(path).read())
+            return match.group(1) if match else None
+
+        result = read_value("last_extraction_result")
+        shard_dir = read_value("last_shard_path")
+        token = read_value("last_token")
+        if result is None or result == "SUCCESS" or not shard_dir or not os.path.isdir(shard_dir):
+            return
+
+        pages = sorted(
+            int(name[:-len(".parquet")]) for name in os.listdir(shard_dir)
+            if name.endswith(".parquet") and name[:-len(".parquet")].isdigit()
+        )
+        if not pages:
+            return
+
+        run_id = f"legacy-{os.path.basename(shard_dir)}"
+        self._import_run(run_id, shard_dir, {REGISTRY: (pages[-1], token or None, f"{shard_dir}/{pages[-1]}.parquet")})
+        for name in ("last_extraction_result", "last_shard_path", "last_token"):
+            if os.path.exists(f"{states_dir}/{name}.py"):
+                os.replace(f"{states_dir}/{name}.py", f"{states_dir}/{name}.py.migrated")
+
+
+    def _import_run(self, run_id: str, shard_dir: str, latest: Dict[str, tuple]):
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR IGNORE INTO runs (run_id, shard_dir, status, started_at) VALUES (?, ?, 'IN PROGRESS', ?)",
+                (run_id, shard_dir, datetime.now().isoformat())
+            )
+        for partition, (page, token, shard_file) in latest.items():
+            if os.path.exists(shard_file):
+                self.record_page(run_id, partition, page, token, shard_file)
+        progress_logger.info(f"Imported legacy checkpoints for {len(latest)} partitions as run {run_id}")
@@ -0,0 +1,367 @@
+import bisect
+import glob
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Tuple
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from etl.utils.exceptions import FileCompactionError
+from etl.utils.log_service import progress_logger, error_logger
+
+
+NCT_ID_PATH = ('protocolSection', 'identificationModule', 'nctId')
+
+
+class Compactor:
+    """Folds page shards into one compacted parquet file, optionally clustered by nct_id."""
+
+    def __init__(self, row_group_size: int = 5000, compression: str = "zstd",
+                 workers: int = 4, cluster: bool = True, sort_run_rows: int = 50000):
+        self.row_group_size = row_group_size
+        self.compression = compression
+        self.workers = workers
+        self.cluster = cluster
+        self.sort_run_rows = sort_run_rows
+        # rows each run contributes to the merge at a time
+        self.merge_batch_rows = max(1, min(row_group_size, sort_run_rows // 8))
+
+
+    def compact(self, shards: List[Tuple[str, int | None]], file_to_write: str) -> int:
+        """shards is a list of (path, expected row count or None) in page order."""
+        started = time.perf_counter()
+        paths = [path for path, _ in shards]
+        temp_file = f"{file_to_write}.tmp"
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                schema = pa.unify_schemas(
+                    list(pool.map(pq.read_schema, paths)), promote_options="permissive"
+                ).remove_metadata()
+
+                tables = self.ordered_reads(pool, shards, schema)
+                if self.cluster and self.nct_ids(schema.empty_table()) is not None:
+                    total = self.write_clustered(tables, schema, temp_file)
+                else:
+                    total = self.write_streaming(tables, schema, temp_file)
+
+            written = pq.ParquetFile(temp_file).metadata.num_rows
+            if written != total:
+                raise FileCompactionError(f"wrote {written} rows but the shards hold {total}")
+
+            os.replace(temp_file, file_to_write)
+
+        except Exception:
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+            raise
+
+        progress_logger.info(
+            f"{len(shards)} pages ({total} studies) compacted at {file_to_write} "
+            f"in {time.perf_counter() - started:.1f}s, {os.path.getsize(file_to_write) / 1e6:.1f} MB"
+        )
+        return total
+
+
+    def ordered_reads(self, pool: ThreadPoolExecutor, shards: List[Tuple[str, int | None]],
+                      schema: pa.Schema) -> Iterator[pa.Table]:
+        """Yield shards in the given order while up to 2 x workers reads run ahead."""
+        pending = deque()
+        shards = iter(shards)
+
+        def submit_next():
+            shard = next(shards, None)
+            if shard is not None:
+                pending.append((shard, pool.submit(self.read_shard, shard[0], schema)))
+
+        for _ in range(self.workers * 2):
+            submit_next()
+
+        while pending:
+            (path, expected), future = pending.popleft()
+            table = future.result()
+            if expected is not None and table.num_rows != expected:
+                raise FileCompactionError(
+                    f"{path} holds {table.num_rows} rows but the manifest recorded {expected}"
+                )
+            submit_next()
+            yield table
+
+
+    @staticmethod
+    def read_shard(path: str, schema: pa.Schema) -> pa.Table:
+        """Read a shard and conform it to the unified schema, null-filling missing columns."""
+        table = pq.read_table(path).replace_schema_metadata(None)
+        for field in schema:
+            if field.name not in table.column_names:
+                table = table.append_column(field, pa.nulls(table.num_rows, field.type))
+        return table.select(schema.names).cast(schema)
+
+
+    def write_streaming(self, tables: Iterator[pa.Table], schema: pa.Schema, temp_file: str) -> int:
+        total = 0
+        with pq.ParquetWriter(temp_file, schema, **self.writer_options()) as writer:
+            for table in tables:
+                writer.write_table(table, row_group_size=self.row_group_size)
+                total += table.num_rows
+        return total
+
+
+    def write_clustered(self, tables: Iterator[pa.Table], schema: pa.Schema, temp_file: str) -> int:
+        """Sort by nct_id in spilled runs of sort_run_rows, merged into temp_file."""
+        runs: List[str] = []
+        buffered: List[pa.Table] = []
+        rows = 0
+        try:
+            for table in tables:
+                buffered.append(table)
+                rows += table.num_rows
+                if rows >= self.sort_run_rows:
+                    runs.append(self.spill_run(pa.concat_tables(buffered), f"{temp_file}.run{len(runs)}"))
+                    buffered, rows = [], 0
+
+            if not runs:
+                table = self.sort_by_nct_id(pa.concat_tables(buffered)) if buffered else schema.empty_table()
+                pq.write_table(table, temp_file, row_group_size=self.row_group_size, **self.writer_options())
+                return table.num_rows
+
+            if buffered:
+                runs.append(self.spill_run(pa.concat_tables(buffered), f"{temp_file}.run{len(runs)}"))
+            del buffered
+            return self.merge_runs(runs, schema, temp_file)
+
+        finally:
+            for run in runs:
+                if os.path.exists(run):
+                    os.remove(run)
+
+
+    def spill_run(self, table: pa.Table, path: str) -> str:
+        pq.write_table(
+            self.sort_by_nct_id(table), path, row_group_size=self.merge_batch_rows, compression='lz4'
+        )
+        return path
+
+
+    def merge_runs(self, runs: List[str], schema: pa.Schema, temp_file: str) -> int:
+        """K-way merge of sorted run files, one batch per run in memory."""
+        readers = [pq.ParquetFile(run).iter_batches(batch_size=self.merge_batch_rows) for run in runs]
+        buffers: List[Tuple[pa.Table, List[str]] | None] = [None] * len(readers)
+
+        def refill(position: int):
+            batch = next(readers[position], None)
+            if batch is None:
+                buffers[position] = None
+            else:
+                table = pa.Table.from_batches([batch])
+                buffers[position] = (table, self.sort_keys(table).to_pylist())
+
+        for position in range(len(readers)):
+            refill(position)
+
+        total = 0
+        pending = schema.empty_table()
+        with pq.ParquetWriter(temp_file, schema, **self.writer_options()) as writer:
+            while any(buffers):
+                bound = min(keys[-1] for _, keys in filter(None, buffers))
+                parts = []
+                for position, buffer in enumerate(buffers):
+                    if buffer is None:
+                        continue
+                    table, keys = buffer
+                    cut = bisect.bisect_right(keys, bound)
+                    parts.append(table.slice(0, cut))
+                    if cut == len(keys):
+                        refill(position)
+                    else:
+                        buffers[position] = (table.slice(cut), keys[cut:])
+
+                pending = pa.concat_tables([pending, self.sort_by_nct_id(pa.concat_tables(parts))])
+                while pending.num_rows >= self.row_group_size:
+                    writer.write_table(pending.slice(0, self.row_group_size))
+                    total += self.row_group_size
+                    pending = pending.slice(self.row_group_size)
+
+            if pending.num_rows:
+                writer.write_table(pending)
+                total += pending.num_rows
+        return total
+
+
+    def sort_by_nct_id(self, table: pa.Table) -> pa.Table:
+        return table.take(pc.sort_indices(self.sort_keys(table)))
+
+
+    def sort_keys(self, table: pa.Table) -> pa.ChunkedArray:
+        # studies without an id sort first, in the in-memory sort and the merge alike
+        return pc.fill_null(self.nct_ids(table), "")
+
+
+    def writer_options(self) -> dict:
+        return {
+            'compression': self.compression,
+            'use_dictionary': True,
+            'write_statistics': True,
+        }
+
+
+    @staticmethod
+    def nct_ids(table: pa.Table) -> pa.ChunkedArray | None:
+        """studies.protocolSection.identificationModule.nctId, or None if the shards don't have it."""
+        if 'studies' not in table.column_names:
+            return None
+        try:
+            return pc.struct_field(table.column('studies'), list(NCT_ID_PATH))
+        except (KeyError, pa.ArrowInvalid):
+            return None
+
+
+def page_order(shard: str) -> Tuple[str, int, str]:
+    """Sort key for shard paths like '2022/12.parquet': partition, then page number."""
+    directory, name = os.path.split(shard)
+    stem = name[:-len(".parquet")] if name.endswith(".parquet") else name
+    return directory, int(stem) if stem.isdigit() else -1, stem
+
+
+class IncrementalCompactor:
+    """Folds shards into a partitioned parquet dataset while extraction runs."""
+
+    def __init__(self, dataset_dir: str, run_id: str, checkpoints, schema: pa.Schema,
+                 row_group_size: int = 5000, row_groups_per_file: int = 20, compression: str = "zstd"):
+        self.dataset_dir = dataset_dir
+        self.run_id = run_id
+        self.checkpoints = checkpoints
+        self.schema = schema
+        self.row_group_size = row_group_size
+        self.row_groups_per_file = row_groups_per_file
+        self.compression = compression
+
+        self.open_files: Dict[str, Dict] = {}
+        self.error: Exception | None = None
+
+
+    def start(self):
+        """Drop files the manifest doesn't know, then fold shards recorded but never compacted."""
+        # pages of runs imported from the old state files are only partly in the manifest
+        if any(expected is None for _, expected in self.checkpoints.compaction_inputs(self.run_id)):
+            self.error = FileCompactionError(f"run {self.run_id} has shards missing from the manifest")
+            progress_logger.info(f"Run {self.run_id} predates the manifest, compacting it once extraction ends")
+            return
+
+        os.makedirs(self.dataset_dir, exist_ok=True)
+        known = self.checkpoints.compacted_files(self.run_id)
+        for path in self.dataset_files():
+            if path not in known:
+                os.remove(path)
+
+        pending = self.checkpoints.uncompacted_pages(self.run_id)
+        if pending:
+            progress_logger.info(f"Folding {len(pending)} shards recorded before the restart")
+        for entry in pending:
+            self.add(entry['partition'], entry['page'], entry['shard_file'], entry['next_token'] is None)
+
+
+    def add(self, partition: str, page: int, shard_file: str, last_page: bool):
+        """Fold one durable shard. Runs on the shard writer thread."""
+        if self.error:
+            return
+
+        try:
+            table = Compactor.read_shard(shard_file, self.schema)
+            state = self.open_files.setdefault(partition, {
+                'writer': None, 'temp_file': None, 'final_file': None,
+                'buffer': [], 'buffered_rows': 0, 'buffered_pages': [], 'row_groups': 0, 'pages': [],
+            })
+            state['buffer'].append(table)
+            state['buffered_rows'] += table.num_rows
+            state['buffered_pages'].append(page)
+
+            if state['buffered_rows'] >= self.row_group_size:
+                self.flush_row_group(partition, state)
+            if last_page or state['row_groups'] >= self.row_groups_per_file:
+                self.close_file(partition)
+
+        except Exception as e:
+            self.error = e
+            error_logger.error(f"Incremental compaction stopped, falling back to a final compaction: {str(e)}")
+            self.abandon()
+
+
+    def flush_row_group(self, partition: str, state: Dict):
+        if not state['buffer']:
+            return
+
+        if state['writer'] is None:
+            partition_dir = f"{self.dataset_dir}/partition={partition}"
+            os.makedirs(partition_dir, exist_ok=True)
+            sequence = len(glob.glob(f"{partition_dir}/part-{self.run_id}-*.parquet"))
+            name = f"part-{self.run_id}-{sequence:05d}.parquet"
+            state['final_file'] = f"{partition_dir}/{name}"
+            state['temp_file'] = f"{partition_dir}/.{name}.inprogress"
+            state['writer'] = pq.ParquetWriter(
+                state['temp_file'], self.schema,
+                compression=self.compression, use_dictionary=True, write_statistics=True
+            )
+
+        table = pa.concat_tables(state['buffer'])
+        state['writer'].write_table(table, row_group_size=self.row_group_size)
+        state['row_groups'] += -(-table.num_rows // self.row_group_size)
+        state['pages'].extend(state['buffered_pages'])
+        state['buffer'], state['buffered_rows'], state['buffered_pages'] = [], 0, []
+
+
+    def close_file(self, partition: str):
+        state = self.open_files.pop(partition, None)
+        if state is None:
+            return
+
+        self.flush_row_group(partition, state)
+        if state['writer'] is None:
+            return
+
+        state['writer'].close()
+        os.replace(state['temp_file'], state['final_file'])
+        self.checkpoints.mark_compacted(self.run_id, partition, state['pages'], state['final_file'])
+        progress_logger.info(
+            f"Compacted {len(state['pages'])} pages of {partition} into {state['final_file']}"
+        )
+
+
+    def finish(self) -> int:
+        """Close every open file and check the dataset against the manifest."""
+        for partition in list(self.open_files):
+            self.close_file(partition)
+
+        expected = sum(entry['row_count'] for entry in self.checkpoints.manifest(self.run_id))
+        written = sum(pq.ParquetFile(path).metadata.num_rows for path in self.dataset_files())
+        if written != expected:
+            raise FileCompactionError(
+                f"dataset at {self.dataset_dir} holds {written} rows but the manifest recorded {expected}"
+            )
+
+        progress_logger.info(f"Incremental compaction complete: {written} studies in {self.dataset_dir}")
+        return written
+
+
+    def abandon(self):
+        """Drop this run's dataset files so a final compaction can replace them."""
+        for state in self.open_files.values():
+            if state['writer'] is not None:
+                state['writer'].close()
+        self.open_files = {}
+
+        for path in self.dataset_files():
+            os.remove(path)
+        self.checkpoints.reset_compacted(self.run_id)
+
+
+    def dataset_files(self) -> List[str]:
+        return [
+            os.path.join(root, name)
+            for root, _, files in os.walk(self.dataset_dir)
+            for name in files if name.endswith((".parquet", ".inprogress"))
+        ]
@@ -1,37 +1,85 @@
-from datetime import datetime, date
-import requests
+from datetime import date
+import io
+import json
 import os
 import pandas as pd
 import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.json as pajson
 import pyarrow.parquet as pq
-from typing import Dict
+from typing import Dict, List, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
 
 from etl.utils.exceptions import NextPageError, FailedRequestError, MissingStateError, FileCompactionError
 from etl.utils.rate_limit import RateLimiterHandler
+from etl.utils.http_client import HttpClient
+from etl.utils.shard_writer import ShardWriter
+from etl.utils.page_schema import PAGE_SCHEMA, SHARD_SCHEMA
 from etl.utils.log_service import progress_logger, error_logger
 from config import config
-from etl.states import last_token, last_shard_path, last_extraction_result
+from etl.checkpoints import CheckpointStore, REGISTRY
+from etl.compaction import Compactor, page_order
 
 
+# watermark advanced after each successful run; delta runs ask for studies updated since it
+WATERMARK = "last_update_post_date"
+
+
+def updated_since(since: str) -> str:
+    """filter.advanced expression for studies updated on or after since."""
+    return f"AREA[LastUpdatePostDate]RANGE[{since},MAX]"
+
+
+def with_query(url: str, params: Dict[str, str]) -> str:
+    """url with params merged into its query string, whether or not it already has one."""
+    parts = urlsplit(url)
+    query = dict(parse_qsl(parts.query, keep_blank_values=True))
+    query.update(params)
+    return urlunsplit(parts._replace(query=urlencode(query)))
 
 
 class Extractor:
-    def __init__(self, timeout, max_retries,pages_to_load):
-        self.current_page = self.determine_starting_point()
-        #technically current page should be  last saved + 1 but the val is incremented
-        #by one in the make_requests func so no need to do it here
+    def __init__(self, timeout, max_retries, pages_to_load, checkpoints: CheckpointStore):
+        self.checkpoints = checkpoints
+        self.run = None
 
-        self.last_saved_page = self.determine_starting_point()
+        self.current_page = 0
+        self.last_saved_page = 0
+        self.done = False
 
         self.url = config.BASE_URL
-        self.token = last_token.last_saved_token
-
-        self.next_page_url = f"{config.PAGES_BASE_URL}{self.token}"
+        self.next_page_url = None
         self.timeout = timeout
         self.max_retries = max_retries
 
+        # None follows the token chain to its last page
         self.pages_to_load = pages_to_load
-        self.rate_limit_handler = RateLimiterHandler()
+        # filter.advanced sent with every page of a delta run
+        self.advanced_filter = None
+        self.rate_limit_handler = RateLimiterHandler(
+            config.RATE_LIMIT_MAX_REQUESTS, config.RATE_LIMIT_WINDOW_SECONDS,
+            state_file=f"{config.STATE_MGT_DIR}/rate_limit.json"
+        )
+        self.http_client = HttpClient(self.rate_limit_handler, timeout, max_retries)
+        self.shard_writer = ShardWriter(self.write_shard, config.SHARD_WRITER_QUEUE_SIZE)
+        # IncrementalCompactor, set by the ETL when COMPACTION_MODE is "incremental"
+        self.compactor = None
+
+
+    def determine_starting_point(self, run: Dict) -> int:
+        """Pick up the run's token chain after its last shard recorded in the manifest."""
+        self.run = run
+        self.advanced_filter = updated_since(run["since"]) if run.get("since") else None
+        self.url = self.page_url()
+        resume = self.checkpoints.resume_point(run["run_id"], REGISTRY)
+
+        #technically current page should be  last saved + 1 but the val is incremented
+        #by one in the make_requests func so no need to do it here
+        self.current_page = resume["page"]
+        self.last_saved_page = resume["page"]
+        self.done = resume["done"]
+        if resume["token"]:
+            self.next_page_url = self.page_url(resume["token"])
 
         progress_logger.info(
             f"Initializing Extractor \n \n"
@@ -39,28 +87,14 @@ class Extractor:
             f"\n URL is {self.url}"
             f"\n Next URL is {self.next_page_url}"
             )
+        return self.last_saved_page
 
 
-    @staticmethod
-    def determine_starting_point():
-        state_file = f"{config.STATE_MGT_DIR}/last_extraction_result.py"
-
-        if not os.path.exists(state_file):
-            with open("etl/states/last_extraction_result.py", "w") as f:
-                f.write(
-                    f'result = "SUCCESS"\n'
-                )
-            return 0 #start all over since state cannot be determined
-
-        if last_extraction_result.result == "SUCCESS":
-            return 0 #start fresh extraction as last one was successful
-
-        output_dir = f"{last_shard_path.shard_path}"
-
-        files = os.listdir(output_dir)
-        parquet_files = [f for f in files if f.endswith(".parquet")]
-
-        return len(parquet_files) if parquet_files else 0
+    def page_url(self, token: str | None = None) -> str:
+        url = f"{config.PAGES_BASE_URL}{token}" if token else config.BASE_URL
+        if self.advanced_filter:
+            url = with_query(url, {'filter.advanced': self.advanced_filter})
+        return url
 
 
     def make_request(self):
@@ -69,128 +103,146 @@ class Extractor:
         self.current_page += 1
         progress_logger.info(f"Starting from page {self.current_page}")
 
-        with open("etl/states/last_extraction_result.py", "w") as f:
-            f.write(
-                f'result = "IN PROGRESS"\n'
-            )
-
-        self.rate_limit_handler.wait_if_needed()
-
-        for attempt in range(self.max_retries):
-            try:
-                response = requests.get(url, timeout=self.timeout)
-                if response.status_code == 200:
-                    data = response.json()
-                    next_page_token = data.get("nextPageToken")
-
-                    if not next_page_token:
-                        progress_logger.info(
-                            f"Next page not found on page {self.current_page}"
-                            f"Check state directory for token to this page")
-
-                        return self.save_response(data)
-
-                    with open("etl/states/last_token.py", "w") as f:
-                        f.write(
-                            f'last_saved_token = "{next_page_token}"\n'
-                        )
-
-                    self.next_page_url = f"{config.PAGES_BASE_URL}{next_page_token}"
+        try:
+            data, next_page_token = self.http_client.get(url, self.current_page, self.read_page)
 
-                    progress_logger.info(
-                        f'Successfully made request to {url} \n Last loaded page is page {self.current_page}'
-                        f'\n Next page token is {next_page_token}'
-                        f'\n Next page is {self.next_page_url}'
-                    )
+        except FailedRequestError as e:
+            self.checkpoints.finish_run(self.run["run_id"], "FAILURE")
+            error_logger.warning(e.log)
+            raise
 
-                    return self.save_response(data)
+        if not next_page_token:
+            progress_logger.info(f"Next page not found on page {self.current_page}, reached the last page")
+            self.done = True
 
-            except Exception as e:
-                with open("etl/states/last_extraction_result.py", "w") as f:
-                    f.write(
-                         f'result = "FAILURE"\n'
-                    )
+            return self.save_response(data)
 
-                error_logger.warning(
-                    f"Request exception on attempt {attempt + 1}/{self.max_retries}: {e}"
-                )
-
-                raise FailedRequestError(self.current_page, str(e))
-
-        error_logger.warning(
-                f"Request exception FAILED AFTER 3 attempts on page {self.current_page}"
-            )
+        self.next_page_url = self.page_url(next_page_token)
 
+        progress_logger.info(
+            f'Successfully made request to {url} \n Last loaded page is page {self.current_page}'
+            f'\n Next page token is {next_page_token}'
+            f'\n Next page is {self.next_page_url}'
+        )
 
-    def save_response(self, data: Dict):
-        df = pd.DataFrame(data)
-        table = pa.Table.from_pandas(df)
+        return self.save_response(data, next_page_token)
 
-        file_date = datetime.today().strftime("%Y-%m-%d")
 
-        output_dir = f"{config.SHARD_STORAGE_DIR}/{file_date}"
+    def save_response(self, data: pa.Table | Dict, next_page_token: str | None = None):
+        """Hand the page to the background shard writer."""
+        output_dir = self.run["shard_dir"]
         os.makedirs(output_dir, exist_ok=True)
 
-        with open("etl/states/last_shard_path.py", "w") as f:
-            f.write(
-                f'shard_path = "{output_dir}"\n'
-            )
         page_number = self.current_page
         file_to_write = f"{output_dir}/{page_number}.parquet"
 
-        pq.write_table(table, file_to_write)
+        self.shard_writer.submit(
+            data, file_to_write,
+            on_durable=lambda: self.mark_durable(page_number, file_to_write, next_page_token)
+        )
 
-        self.last_saved_page += 1
 
+    def mark_durable(self, page_number: int, file_to_write: str, next_page_token: str | None):
+        """Runs on the writer thread once a shard has been written."""
+        self.checkpoints.record_page(self.run["run_id"], REGISTRY, page_number, next_page_token, file_to_write)
+        self.last_saved_page = page_number
+        if self.compactor:
+            self.compactor.add(REGISTRY, page_number, file_to_write, next_page_token is None)
 
         progress_logger.info(
-            f"Successfully saved page {self.current_page} at {file_to_write}"
+            f"Successfully saved page {page_number} at {file_to_write}"
         )
 
 
+    def close(self):
+        """Wait for queued shards to reach disk."""
+        self.shard_writer.close()
 
-    @staticmethod
-    def compact_shards(path_to_read: str, path_to_write: str):
-        try:
-            files = os.listdir(path_to_read)
-
-            file_name = f"studies - {date.today().strftime("%Y-%m-%d")}"
-            file_to_write = f"{path_to_write}/{file_name}.parquet"
 
-            parquet_shards = [f for f in files if f.endswith(".parquet")]
-            num_of_files = len(parquet_shards)
+    @staticmethod
+    def read_page(body: bytes) -> Tuple[pa.Table | Dict, str | None]:
+        """Parse a response body into a shard table."""
+        if config.PAGE_INGESTION == "arrow":
+            try:
+                page = pajson.read_json(
+                    io.BytesIO(body),
+                    read_options=pajson.ReadOptions(use_threads=False, block_size=max(len(body) + 1, 1 << 20)),
+                    parse_options=pajson.ParseOptions(
+                        explicit_schema=PAGE_SCHEMA,
+                        unexpected_field_behavior="ignore",
+                        newlines_in_values=True
+                    )
+                )
+                if page.num_rows != 1:
+                    raise pa.ArrowInvalid(f"expected one page object, got {page.num_rows} rows")
 
-            if num_of_files == 0:
-                progress_logger.info("No parquet files to compact.")
-                return
+                next_page_token = page.column("nextPageToken")[0].as_py()
+                studies = pc.list_flatten(page.column("studies").combine_chunks())
+                tokens = pa.array([next_page_token] * len(studies), pa.string())
+                return pa.Table.from_arrays([studies, tokens], schema=SHARD_SCHEMA), next_page_token
 
-            writer = None
-            try:
-                for file in parquet_shards:
-                    table = pq.read_table(f"{path_to_read}/{file}")
+            except pa.ArrowInvalid as e:
+                error_logger.warning(f"Page did not match the pinned schema, falling back to JSON: {e}")
 
-                    if writer is None:
-                        writer = pq.ParquetWriter(file_to_write, table.schema)
+        data = json.loads(body)
+        return data, data.get("nextPageToken")
 
-                    if table.schema != writer.schema:
-                        table = table.cast(writer.schema)
 
-                    writer.write_table(table)
+    @staticmethod
+    def write_shard(data: pa.Table | Dict, file_to_write: str):
+        """Write one API page as a parquet shard."""
+        if isinstance(data, pa.Table):
+            pq.write_table(data, file_to_write)
+            return
 
-            except Exception as e:
-                if writer and writer.is_open:
-                    writer.close()
-                progress_logger.error(f"Compaction failed. Shards preserved at: {path_to_read}\n Error: {str(e)}")
+        df = pd.DataFrame(data)
+        table = pa.Table.from_pandas(df)
+        pq.write_table(table, file_to_write)
 
-            finally:
-                if writer and writer.is_open:
-                    writer.close()
 
-            progress_logger.info(
-                f"{num_of_files} pages compacted at {file_to_write}"
+    @staticmethod
+    def list_shards(path_to_read: str) -> List[str]:
+        """Shard paths relative to path_to_read, including partition subdirectories."""
+        shards = []
+        for root, _, files in os.walk(path_to_read):
+            relative_dir = os.path.relpath(root, path_to_read)
+            shards.extend(
+                f if relative_dir == "." else f"{relative_dir}/{f}"
+                for f in files if f.endswith(".parquet")
             )
-        except Exception as e:
-            raise FileCompactionError(str(e))
+        return shards
 
 
+    @staticmethod
+    def compact_shards(path_to_read: str, path_to_write: str, shards: List[Tuple[str, int | None]] | None = None):
+        """Compact shards, (path, expected rows) in page order, into one file."""
+        file_name = f"studies - {date.today().strftime("%Y-%m-%d")}"
+        file_to_write = f"{path_to_write}/{file_name}.parquet"
+
+        if shards is None:
+            shards = [
+                (f"{path_to_read}/{shard}", None)
+                for shard in sorted(Extractor.list_shards(path_to_read), key=page_order)
+            ]
+
+        if not shards:
+            progress_logger.info("No parquet files to compact.")
+            return
+
+        compactor = Compactor(
+            row_group_size=config.COMPACTION_ROW_GROUP_SIZE,
+            compression=config.COMPACTION_COMPRESSION,
+            workers=config.COMPACTION_WORKERS,
+            cluster=config.COMPACTION_CLUSTER,
+            sort_run_rows=config.COMPACTION_SORT_RUN_ROWS,
+        )
+        try:
+            compactor.compact(shards, file_to_write)
 
+        except FileCompactionError as e:
+            progress_logger.error(f"Compaction failed. Shards preserved at: {path_to_read}\n Error: {e.log}")
+            raise
+
+        except Exception as e:
+            progress_logger.error(f"Compaction failed. Shards preserved at: {path_to_read}\n Error: {str(e)}")
+            raise FileCompactionError(str(e))
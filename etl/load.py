@@ -1,45 +1,86 @@
-from sqlalchemy import create_engine
+import json
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+from sqlalchemy import create_engine, inspect, text
 from config import config
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from etl.study_spec import TEXT_COLUMNS
+from etl.utils.copy_stream import CsvCopyStream, to_arrow
 from etl.utils.log_service import progress_logger, error_logger
 
+
+load_order = [
+    'studies',
+    'study_texts',
+    'sponsors',
+    'conditions',
+    'interventions',
+    'sites',
+    'study_sponsors',
+    'study_conditions',
+    'study_interventions',
+    'study_sites'
+]
+
+# tables within a stage have no dependencies on each other and can load side by side
+load_stages = [load_order[:6], load_order[6:]]
+
+# surrogate key generated by the Transformer for each staging table, used to upsert
+table_keys = {
+    'studies': 'study_key',
+    'study_texts': 'text_hash',
+    'sponsors': 'sponsor_key',
+    'conditions': 'condition_key',
+    'interventions': 'intervention_key',
+    'sites': 'site_key',
+    'study_sponsors': 'study_sponsor_key',
+    'study_conditions': 'study_condition_key',
+    'study_interventions': 'study_intervention_key',
+    'study_sites': 'study_site_key',
+}
+
+# keyed by a hash of their content: a row whose hash staging already holds is never sent again
+content_addressed = {'study_texts'}
+
+# not compared when deciding whether an upserted row actually changed
+audit_columns = {'etl_created_at'}
+
+
 class Loader:
-    def __init__(self):
+    def __init__(self, load_method: str = None, workers: int = None, load_mode: str = None):
         self.conn_str = config.DATABASE_URL
+        self.load_method = load_method or config.LOAD_METHOD
+        self.load_mode = load_mode or config.LOAD_MODE
+        self.copy_batch_rows = config.LOAD_COPY_BATCH_ROWS
+        self.workers = workers or config.LOAD_WORKERS
+        self.chunk_rows = config.LOAD_CHUNK_ROWS
+        self.abandoned_after_hours = config.LOAD_ABANDONED_AFTER_HOURS
+
+        # one engine for the Loader's lifetime, sized so every worker gets a connection; concurrent
+        # loads keep each table's connection open until all of them commit, hence the overflow
+        self.engine = create_engine(
+            self.conn_str, pool_size=self.workers, max_overflow=len(load_order), pool_pre_ping=True
+        )
+
+    def close(self):
+        self.engine.dispose()
 
-    def load_to_postgres(self, dataframes: pd.DataFrame):
-        engine = create_engine(self.conn_str)
-
-        load_order = [
-            'studies',
-            'sponsors',
-            'conditions',
-            'interventions',
-            'sites',
-            'study_sponsors',
-            'study_conditions',
-            'study_interventions',
-            'study_sites'
-        ]
+    def load_to_postgres(self, dataframes: Dict[str, pd.DataFrame | pa.Table]):
+        self.backfill_study_texts()
+        dataframes = self.drop_known_content(dataframes)
+        if self.workers > 1:
+            return self.load_concurrently(dataframes)
 
+        run = uuid.uuid4().hex[:8]
         try:
-            with engine.begin() as conn:
+            with self.engine.begin() as conn:
                 for table_name in load_order:
-                    if table_name in dataframes and not dataframes[table_name].empty:
-                        df = dataframes[table_name]
-                        progress_logger.info(f"Loading {table_name}: {len(df)} rows")
-
-                        df.to_sql(
-                            name=table_name,
-                            schema='staging',
-                            con=conn,
-                            if_exists='append',
-                            index=False,
-                            method='multi',
-                            chunksize=1000
-                        )
-
-                        progress_logger.info(f" {table_name} loaded: {len(df)} rows")
+                    if table_name in dataframes and self.num_rows(dataframes[table_name]):
+                        self.load_table(conn, table_name, dataframes[table_name], run)
 
             progress_logger.info("All tables loaded successfully!")
 
@@ -47,11 +88,470 @@ class Loader:
             error_logger.error(f"Load failed, rolling back: {str(e)}")
             raise
 
+
+    def load_concurrently(self, dataframes: Dict[str, pd.DataFrame | pa.Table]):
+        """Load tables side by side, each on its own connection; appends commit together once all have loaded."""
+        tables = [t for t in load_order if t in dataframes and self.num_rows(dataframes[t])]
+        run = uuid.uuid4().hex[:8]
+        started = time.perf_counter()
+        pending = []
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                for stage in load_stages:
+                    futures = [
+                        pool.submit(self.load_on_connection, table_name, dataframes[table_name], run)
+                        for table_name in stage if table_name in tables
+                    ]
+                    errors = []
+                    for future in futures:
+                        try:
+                            opened = future.result()
+                        except Exception as e:
+                            errors.append(e)
+                            continue
+                        if opened:
+                            pending.append(opened)
+                    if errors:
+                        raise errors[0]
+
+            while pending:
+                conn, transaction = pending.pop(0)
+                try:
+                    transaction.commit()
+                finally:
+                    conn.close()
+
+            progress_logger.info(
+                f"All tables loaded successfully in {time.perf_counter() - started:.1f}s "
+                f"using {self.workers} connections!"
+            )
+
+        except Exception as e:
+            error_logger.error(f"Load failed, rolling back the tables not yet committed: {str(e)}")
+            raise
+
         finally:
-            engine.dispose()
+            for conn, transaction in pending:
+                transaction.rollback()
+                conn.close()
+
+
+    def load_resumable(self, dataframes: Dict[str, pd.DataFrame | pa.Table], load_id: str):
+        """Load in checkpointed chunks, then publish every table in one transaction."""
+        self.backfill_study_texts()
+        dataframes = self.drop_known_content(dataframes)
+        tables = [t for t in load_order if t in dataframes and self.num_rows(dataframes[t])]
+        run_tables = {table_name: f"_load_{load_id}_{table_name}" for table_name in tables}
+        sizes = {table_name: self.num_rows(dataframes[table_name]) for table_name in tables}
+        started = time.perf_counter()
+
+        with self.engine.begin() as conn:
+            committed = self.open_load(conn, load_id, sizes)
+            if committed is None:
+                return
+            for table_name in tables:
+                self.ensure_table(conn, table_name, dataframes[table_name])
+                if self.load_mode == "upsert":
+                    self.ensure_unique_key(conn, table_name)
+                conn.execute(text(
+                    f'CREATE TABLE IF NOT EXISTS staging."{run_tables[table_name]}" '
+                    f'(LIKE staging."{table_name}" INCLUDING DEFAULTS)'
+                ))
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for stage in load_stages:
+                futures = [
+                    pool.submit(
+                        self.load_chunks, load_id, table_name, run_tables[table_name],
+                        dataframes[table_name], committed.get(table_name, -1)
+                    )
+                    for table_name in stage if table_name in run_tables
+                ]
+                for future in futures:
+                    future.result()
+
+        with self.engine.begin() as conn:
+            for table_name in tables:
+                self.publish_shadow(conn, table_name, run_tables[table_name], self.columns(dataframes[table_name]))
+            conn.execute(
+                text("UPDATE staging._load_runs SET status = 'published', published_at = now() WHERE load_id = :id"),
+                {"id": load_id}
+            )
+            conn.execute(text("DELETE FROM staging._load_chunks WHERE load_id = :id"), {"id": load_id})
+
+        progress_logger.info(f"Load {load_id} published in {time.perf_counter() - started:.1f}s")
+
+
+    def open_load(self, conn, load_id: str, sizes: Dict[str, int]) -> Dict[str, int] | None:
+        """Last committed chunk per table, or None if the load was already published."""
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS staging._load_runs ("
+            "load_id TEXT PRIMARY KEY, table_rows TEXT NOT NULL, status TEXT NOT NULL, "
+            "started_at TIMESTAMPTZ NOT NULL DEFAULT now(), published_at TIMESTAMPTZ)"
+        ))
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS staging._load_chunks ("
+            "load_id TEXT NOT NULL, table_name TEXT NOT NULL, chunk INTEGER NOT NULL, rows INTEGER NOT NULL, "
+            "committed_at TIMESTAMPTZ NOT NULL DEFAULT now(), PRIMARY KEY (load_id, table_name, chunk))"
+        ))
+        self.drop_abandoned_loads(conn, load_id)
+
+        table_rows = json.dumps(sizes, sort_keys=True)
+        row = conn.execute(
+            text("SELECT table_rows, status FROM staging._load_runs WHERE load_id = :id"), {"id": load_id}
+        ).first()
+        if row and row.status == 'published':
+            progress_logger.info(
+                f"Load {load_id} was already published; delete its row in staging._load_runs to load it again"
+            )
+            return None
+
+        if row and row.table_rows != table_rows:
+            progress_logger.info(f"Load {load_id} was started on different data, starting it over")
+            self.drop_load(conn, load_id, row.table_rows)
+            row = None
+
+        if row is None:
+            conn.execute(
+                text("INSERT INTO staging._load_runs (load_id, table_rows, status) VALUES (:id, :rows, 'loading')"),
+                {"id": load_id, "rows": table_rows}
+            )
+            return {}
+
+        committed = dict(conn.execute(
+            text("SELECT table_name, max(chunk) FROM staging._load_chunks WHERE load_id = :id GROUP BY table_name"),
+            {"id": load_id}
+        ).all())
+        progress_logger.info(f"Resuming load {load_id}, last committed chunks: {committed}")
+        return committed
+
+
+    def drop_abandoned_loads(self, conn, load_id: str):
+        """Drop other unfinished loads that have not committed a chunk for abandoned_after_hours."""
+        abandoned = conn.execute(
+            text(
+                "SELECT runs.load_id, runs.table_rows FROM staging._load_runs runs "
+                "WHERE runs.status = 'loading' AND runs.load_id <> :id AND greatest(runs.started_at, ("
+                "SELECT max(chunks.committed_at) FROM staging._load_chunks chunks WHERE chunks.load_id = runs.load_id"
+                ")) < now() - make_interval(hours => :hours)"
+            ),
+            {"id": load_id, "hours": self.abandoned_after_hours}
+        ).all()
+        for row in abandoned:
+            progress_logger.info(f"Dropping load {row.load_id}, abandoned for over {self.abandoned_after_hours}h")
+            self.drop_load(conn, row.load_id, row.table_rows)
+
+
+    @staticmethod
+    def drop_load(conn, load_id: str, table_rows: str):
+        for table_name in json.loads(table_rows):
+            conn.execute(text(f'DROP TABLE IF EXISTS staging."_load_{load_id}_{table_name}"'))
+        conn.execute(text("DELETE FROM staging._load_chunks WHERE load_id = :id"), {"id": load_id})
+        conn.execute(text("DELETE FROM staging._load_runs WHERE load_id = :id"), {"id": load_id})
+
+
+    def stream_batch_sizes(self, load_id: str) -> set:
+        """Batch sizes of the stream loads recorded for load_id."""
+        with self.engine.begin() as conn:
+            if not inspect(conn).has_table('_load_runs', schema='staging'):
+                return set()
+            prefix = f"{load_id}_s"
+            stream_ids = conn.execute(
+                text("SELECT load_id FROM staging._load_runs WHERE left(load_id, :length) = :prefix"),
+                {"length": len(prefix), "prefix": prefix}
+            ).scalars().all()
+        return {int(stream_id[len(prefix):].split('_b')[0]) for stream_id in stream_ids}
+
+
+    def load_chunks(self, load_id: str, table_name: str, run_table: str, data: pd.DataFrame | pa.Table, last_chunk: int):
+        """Copy the chunks after last_chunk, each committed with its checkpoint row."""
+        rows = self.num_rows(data)
+        chunks = -(-rows // self.chunk_rows)
+        if last_chunk + 1 >= chunks:
+            progress_logger.info(f" {table_name}: all {chunks} chunks already committed")
+            return
+
+        for chunk in range(last_chunk + 1, chunks):
+            start = chunk * self.chunk_rows
+            part = data.slice(start, self.chunk_rows) if isinstance(data, pa.Table) else data.iloc[start:start + self.chunk_rows]
+            with self.engine.begin() as conn:
+                self.write_table(conn, run_table, part)
+                conn.execute(
+                    text(
+                        "INSERT INTO staging._load_chunks (load_id, table_name, chunk, rows) "
+                        "VALUES (:id, :table_name, :chunk, :rows)"
+                    ),
+                    {"id": load_id, "table_name": table_name, "chunk": chunk, "rows": self.num_rows(part)}
+                )
+            progress_logger.info(f" {table_name}: chunk {chunk + 1}/{chunks} committed ({self.num_rows(part)} rows)")
+
+
+    def backfill_study_texts(self):
+        """One-time move of texts from pre-study_texts rows into study_texts."""
+        with self.engine.begin() as conn:
+            if not inspect(conn).has_table('studies', schema='staging'):
+                return
+            # overlapping loads would otherwise race to create _migrations and to backfill
+            conn.execute(text("SELECT pg_advisory_xact_lock(hashtext('staging._migrations'))"))
+            conn.execute(text(
+                "CREATE TABLE IF NOT EXISTS staging._migrations ("
+                "name TEXT PRIMARY KEY, applied_at TIMESTAMPTZ NOT NULL DEFAULT now())"
+            ))
+            if conn.execute(text("SELECT 1 FROM staging._migrations WHERE name = 'study_texts_backfill'")).first():
+                return
+
+            existing = {column['name'] for column in inspect(conn).get_columns('studies', schema='staging')}
+            conn.execute(text(
+                'CREATE TABLE IF NOT EXISTS staging.study_texts (text_hash TEXT, content TEXT, etl_created_at TEXT)'
+            ))
+            for column in (name for name in TEXT_COLUMNS if name in existing):
+                hash_column = f"{column}_hash"
+                if hash_column not in existing:
+                    conn.execute(text(f'ALTER TABLE staging.studies ADD COLUMN "{hash_column}" TEXT'))
+                hashed = conn.execute(text(
+                    f'UPDATE staging.studies SET "{hash_column}" = left(md5("{column}"), 16) '
+                    f'WHERE "{column}" IS NOT NULL AND "{hash_column}" IS NULL'
+                )).rowcount
+                added = conn.execute(text(
+                    f'INSERT INTO staging.study_texts (text_hash, content, etl_created_at) '
+                    f'SELECT DISTINCT ON ("{hash_column}") "{hash_column}", "{column}", etl_created_at '
+                    f'FROM staging.studies studies WHERE "{column}" IS NOT NULL AND NOT EXISTS ('
+                    f'SELECT 1 FROM staging.study_texts texts WHERE texts.text_hash = studies."{hash_column}") '
+                    f'ORDER BY "{hash_column}", etl_created_at'
+                )).rowcount
+                progress_logger.info(f" studies: backfilled {column} for {hashed} rows, {added} new texts")
+
+            conn.execute(text("INSERT INTO staging._migrations (name) VALUES ('study_texts_backfill')"))
+
+
+    def drop_known_content(self, dataframes: Dict[str, pd.DataFrame | pa.Table]) -> Dict[str, pd.DataFrame | pa.Table]:
+        """Leave out content-addressed rows whose hash staging already holds."""
+        dataframes = dict(dataframes)
+        for table_name in content_addressed:
+            data = dataframes.get(table_name)
+            if data is None or not self.num_rows(data):
+                continue
+
+            key = table_keys[table_name]
+            with self.engine.begin() as conn:
+                if not inspect(conn).has_table(table_name, schema='staging'):
+                    continue
+                self.ensure_unique_key(conn, table_name)
+                hashes = data.column(key).to_pylist() if isinstance(data, pa.Table) else data[key].tolist()
+                known = conn.execute(
+                    text(f'SELECT "{key}" FROM staging."{table_name}" WHERE "{key}" = ANY(:hashes)'),
+                    {"hashes": hashes}
+                ).scalars().all()
+
+            if isinstance(data, pa.Table):
+                dataframes[table_name] = data.filter(pc.invert(pc.is_in(data.column(key), pa.array(known, pa.string()))))
+            else:
+                dataframes[table_name] = data[~data[key].isin(known)]
+            progress_logger.info(
+                f" {table_name}: {len(known)} of {len(hashes)} rows already in staging, "
+                f"{self.num_rows(dataframes[table_name])} new"
+            )
+        return dataframes
+
+
+    def load_on_connection(self, table_name: str, data: pd.DataFrame | pa.Table, run: str):
+        """Load one table; an append's transaction is returned open for load_concurrently to commit."""
+        conn = self.engine.connect()
+        transaction = conn.begin()
+        try:
+            self.load_table(conn, table_name, data, run)
+            if self.load_mode == "upsert":
+                # an upsert reruns safely, and committing it now means an overlapping load
+                # waiting on its row locks is never also waiting on this load's other tables
+                transaction.commit()
+                conn.close()
+                return None
+        except Exception:
+            transaction.rollback()
+            conn.close()
+            raise
+        return conn, transaction
+
+
+    def load_table(self, conn, table_name: str, data: pd.DataFrame | pa.Table, run: str):
+        """COPY a table into staging, or merge it through a shadow table named for the run when upserting."""
+        started = time.perf_counter()
+        progress_logger.info(f"Loading {table_name}: {self.num_rows(data)} rows")
+
+        if self.load_mode == "upsert":
+            self.ensure_table(conn, table_name, data)
+            shadow = f"_shadow_{run}_{table_name}"
+            self.create_shadow(conn, table_name, shadow)
+            self.write_table(conn, shadow, data)
+            self.publish_shadow(conn, table_name, shadow, self.columns(data))
+        else:
+            self.write_table(conn, table_name, data)
+
+        progress_logger.info(
+            f" {table_name} loaded: {self.num_rows(data)} rows in {time.perf_counter() - started:.1f}s"
+        )
+
+
+    def create_shadow(self, conn, table_name: str, shadow: str):
+        if self.load_mode == "upsert":
+            self.ensure_unique_key(conn, table_name)
+
+        conn.execute(text(
+            f'CREATE UNLOGGED TABLE staging."{shadow}" (LIKE staging."{table_name}" INCLUDING DEFAULTS)'
+        ))
+
+
+    def publish_shadow(self, conn, table_name: str, shadow: str, columns: List[str]):
+        column_list = ', '.join(f'"{name}"' for name in columns)
+
+        if self.load_mode == "upsert":
+            result = conn.execute(text(self.upsert_sql(table_name, shadow, columns)))
+            progress_logger.info(f" {table_name}: {result.rowcount} rows inserted or changed")
+        else:
+            conn.execute(text(
+                f'INSERT INTO staging."{table_name}" ({column_list}) '
+                f'SELECT {column_list} FROM staging."{shadow}"'
+            ))
+        conn.execute(text(f'DROP TABLE staging."{shadow}"'))
+
+
+    @staticmethod
+    def upsert_sql(table_name: str, shadow: str, columns: List[str]) -> str:
+        """Merge a shadow table into staging on its surrogate key, skipping unchanged rows."""
+        key = table_keys[table_name]
+        column_list = ', '.join(f'"{name}"' for name in columns)
+        updates = ', '.join(f'"{name}" = EXCLUDED."{name}"' for name in columns if name != key)
+        compared = [name for name in columns if name != key and name not in audit_columns]
+        current = ', '.join(f'target."{name}"' for name in compared)
+        incoming = ', '.join(f'EXCLUDED."{name}"' for name in compared)
+
+        sql = (
+            f'INSERT INTO staging."{table_name}" AS target ({column_list}) '
+            f'SELECT DISTINCT ON ("{key}") {column_list} FROM staging."{shadow}" '
+            f'ON CONFLICT ("{key}") '
+        )
+        if not compared:
+            return sql + 'DO NOTHING'
+        return sql + f'DO UPDATE SET {updates} WHERE ROW({current}) IS DISTINCT FROM ROW({incoming})'
+
+
+    @staticmethod
+    def ensure_unique_key(conn, table_name: str):
+        """Add the unique index ON CONFLICT needs, dropping older duplicates first."""
+        key = table_keys[table_name]
+        index_name = f"ux_{table_name}_{key}"
+        exists = conn.execute(
+            text("SELECT 1 FROM pg_indexes WHERE schemaname = 'staging' AND indexname = :name"),
+            {"name": index_name}
+        ).first()
+        if exists:
+            return
+
+        removed = conn.execute(text(
+            f'DELETE FROM staging."{table_name}" older USING staging."{table_name}" newer '
+            f'WHERE older."{key}" = newer."{key}" AND older.ctid < newer.ctid'
+        )).rowcount
+        if removed:
+            progress_logger.info(f" {table_name}: removed {removed} duplicate rows before adding unique key")
+
+        conn.execute(text(f'CREATE UNIQUE INDEX "{index_name}" ON staging."{table_name}" ("{key}")'))
+
+
+    def write_table(self, conn, table_name: str, data: pd.DataFrame | pa.Table):
+        if self.load_method == "copy":
+            self.copy_table(conn, table_name, data)
+        else:
+            self.insert_table(conn, table_name, data)
+
+
+    @staticmethod
+    def num_rows(data: pd.DataFrame | pa.Table) -> int:
+        return data.num_rows if isinstance(data, pa.Table) else len(data)
+
+
+    @staticmethod
+    def columns(data: pd.DataFrame | pa.Table) -> List[str]:
+        return data.column_names if isinstance(data, pa.Table) else list(data.columns)
+
+
+    @staticmethod
+    def insert_table(conn, table_name: str, data: pd.DataFrame | pa.Table):
+        """Fallback path: parameterised multi-row INSERTs through pandas."""
+        df = data.to_pandas() if isinstance(data, pa.Table) else data
+        df.to_sql(
+            name=table_name,
+            schema='staging',
+            con=conn,
+            if_exists='append',
+            index=False,
+            method='multi',
+            chunksize=1000
+        )
+
+
+    def copy_table(self, conn, table_name: str, data: pd.DataFrame | pa.Table):
+        """COPY a table into staging within the connection's transaction."""
+        table = to_arrow(data)
+        self.ensure_table(conn, table_name, table)
+
+        columns = ', '.join(f'"{name}"' for name in table.column_names)
+        copy_sql = f'COPY staging."{table_name}" ({columns}) FROM STDIN WITH (FORMAT csv)'
+
+        cursor = conn.connection.cursor()
+        try:
+            cursor.copy_expert(copy_sql, CsvCopyStream(table, self.copy_batch_rows))
+        finally:
+            cursor.close()
+
+
+    @staticmethod
+    def ensure_table(conn, table_name: str, data: pd.DataFrame | pa.Table):
+        """Create the table, or add new columns, with the types to_sql would infer."""
+        schema = Loader.arrow_schema(data)
+        if inspect(conn).has_table(table_name, schema='staging'):
+            existing = {column['name'] for column in inspect(conn).get_columns(table_name, schema='staging')}
+            for field in schema:
+                if field.name not in existing:
+                    conn.execute(text(
+                        f'ALTER TABLE staging."{table_name}" ADD COLUMN "{field.name}" {Loader.sql_type(field.type)}'
+                    ))
+                    progress_logger.info(f" {table_name}: added column {field.name}")
+            return
+
+        conn.execute(text(Loader.create_table_sql(table_name, schema)))
 
 
+    @staticmethod
+    def arrow_schema(data: pd.DataFrame | pa.Table) -> pa.Schema:
+        """Column types as pandas holds them, without converting the data."""
+        if not isinstance(data, pa.Table):
+            return pa.Schema.from_pandas(data, preserve_index=False)
+        return pa.schema([
+            field.with_type(pa.float64()) if pa.types.is_integer(field.type) and column.null_count else field
+            for field, column in zip(data.schema, data.columns)
+        ])
 
 
+    @staticmethod
+    def create_table_sql(table_name: str, schema: pa.Schema) -> str:
+        columns = ', '.join(f'"{field.name}" {Loader.sql_type(field.type)}' for field in schema)
+        return f'CREATE TABLE staging."{table_name}" ({columns})'
 
 
+    @staticmethod
+    def sql_type(arrow_type: pa.DataType) -> str:
+        """The Postgres type to_sql creates for a non-empty column of this type."""
+        if pa.types.is_dictionary(arrow_type):
+            return Loader.sql_type(arrow_type.value_type)
+        if pa.types.is_boolean(arrow_type):
+            return 'BOOLEAN'
+        if pa.types.is_integer(arrow_type):
+            return {8: 'SMALLINT', 16: 'SMALLINT', 32: 'INTEGER'}.get(arrow_type.bit_width, 'BIGINT')
+        if pa.types.is_floating(arrow_type):
+            return 'REAL' if arrow_type.bit_width == 32 else 'FLOAT(53)'
+        if pa.types.is_timestamp(arrow_type):
+            return 'TIMESTAMP WITH TIME ZONE' if arrow_type.tz else 'TIMESTAMP WITHOUT TIME ZONE'
+        if pa.types.is_date(arrow_type):
+            return 'DATE'
+        return 'TEXT'
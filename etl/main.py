@@ -1,12 +1,26 @@
+import argparse
 from datetime import date
+import hashlib
+import json
 import os
 import subprocess
+from typing import List
 from etl.load import Loader
-from etl.transform import Transformer
+from etl.transform import Transformer, TRANSFORMER_VERSION
+from etl.transform_cache import TransformCache
+from etl.parallel_transform import ParallelTransformer
+from etl.arrow_transform import ArrowTransformer
+from etl.change_detection import ChangeDetector
+from etl.checkpoints import CheckpointStore
+from etl.compaction import IncrementalCompactor
+from etl.study_index import StudyIndex
+from etl.study_spec import STUDY_SPEC
 from etl.utils.exceptions import NoProcessToRun
 from etl.utils.log_service import progress_logger, error_logger
 from config import config
-from etl.extract import Extractor
+from etl.extract import Extractor, WATERMARK
+from etl.utils.page_schema import SHARD_SCHEMA
+from etl.partitioned_extract import PartitionedExtractor, build_partitions
 
 
 class ETL:
@@ -21,40 +35,254 @@ class ETL:
         self.compact_dir = f"{config.COMPACTED_STORAGE_DIR}/{self.file_date}"
 
         self.dbt_dir = config.DBT_DIR
-        self.columns_to_read = config.COLUMNS_TO_READ
-
-        self.extractor = Extractor(timeout=10, max_retries=3, pages_to_load=100)#test run
-        self.transformer = Transformer(self.compact_dir)
+        # only the parquet leaves behind the staging columns are read, unless pruning is off
+        self.columns_to_read = (
+            STUDY_SPEC.leaf_columns(config.COLUMNS_TO_READ[0]) if config.PRUNE_COLUMNS else config.COLUMNS_TO_READ
+        )
+
+        self.checkpoints = CheckpointStore(f"{config.STATE_MGT_DIR}/checkpoints.db")
+        self.run = None
+        self.incremental_compactor = None
+        self.extraction_mode = config.EXTRACTION_MODE
+        self.extractor = Extractor(
+            timeout=10, max_retries=3, pages_to_load=config.EXTRACTION_MAX_PAGES, checkpoints=self.checkpoints
+        )
+        self.change_detector = (
+            ChangeDetector(f"{config.STATE_MGT_DIR}/study_index.db") if config.CHANGE_DETECTION else None
+        )
+        self.transformer = Transformer(self.compact_dir, self.change_detector, config.SURROGATE_KEY_SCHEME)
+        self.flattener = self.select_flattener()
+        self.transform_cache = (
+            TransformCache(
+                f"{config.COMPACTED_STORAGE_DIR}/_transform_cache",
+                max_entries=config.TRANSFORM_CACHE_MAX_ENTRIES,
+                max_bytes=config.TRANSFORM_CACHE_MAX_MB * 1024 ** 2,
+            ) if config.TRANSFORM_CACHE else None
+        )
         self.loader = Loader()
 
+    def select_flattener(self):
+        """Pick the engine used to flatten the compacted file in full mode."""
+        if config.TRANSFORM_ENGINE == "arrow":
+            return ArrowTransformer(self.compact_dir, self.change_detector, config.SURROGATE_KEY_SCHEME)
+
+        if config.TRANSFORM_ENGINE != "python":
+            raise ValueError(f"Unknown TRANSFORM_ENGINE {config.TRANSFORM_ENGINE!r}")
+
+        if config.TRANSFORM_WORKERS > 1:
+            return ParallelTransformer(self.transformer, config.TRANSFORM_WORKERS)
+        return self.transformer
+
+    def open_run(self):
+        """Resume the unfinished extraction run or start a new one."""
+        # in Docker the old state modules sit in the volume mounted at STATE_MGT_DIR,
+        # in a local checkout they are still under etl/states
+        self.checkpoints.import_legacy_state([config.STATE_MGT_DIR, "etl/states"])
+        if self.extraction_mode not in ("full", "delta"):
+            raise ValueError(f"Unknown EXTRACTION_MODE {self.extraction_mode!r}")
+
+        since = self.checkpoints.watermark(WATERMARK) if self.extraction_mode == "delta" else None
+        if self.extraction_mode == "delta" and since is None:
+            progress_logger.info("No watermark from an earlier successful run yet, extracting in full")
+        self.run = self.checkpoints.open_run(self.shard_dir, "delta" if since else "full", since)
+        self.shard_dir = self.run["shard_dir"]
+        self.compact_dir = f"{config.COMPACTED_STORAGE_DIR}/{os.path.basename(self.shard_dir)}"
+        if self.change_detector:
+            # studies missing from a delta run have not disappeared, they just did not change
+            self.change_detector.full_snapshot = self.run["mode"] == "full"
+
+    def start_incremental_compaction(self):
+        """In incremental mode, fold each shard into the compacted dataset as soon as it is durable."""
+        if config.COMPACTION_MODE == "final":
+            return
+        if config.COMPACTION_MODE != "incremental":
+            raise ValueError(f"Unknown COMPACTION_MODE {config.COMPACTION_MODE!r}")
+        if config.PAGE_INGESTION != "arrow":
+            raise ValueError("COMPACTION_MODE=incremental writes the pinned shard schema, it needs PAGE_INGESTION=arrow")
+
+        self.incremental_compactor = IncrementalCompactor(
+            self.compact_dir, self.run["run_id"], self.checkpoints, SHARD_SCHEMA,
+            row_group_size=config.COMPACTION_ROW_GROUP_SIZE,
+            row_groups_per_file=config.COMPACTION_ROW_GROUPS_PER_FILE,
+            compression=config.COMPACTION_COMPRESSION,
+        )
+        self.incremental_compactor.start()
+        self.extractor.compactor = self.incremental_compactor
+
+    def finish_run(self):
+        self.checkpoints.finish_run(self.run["run_id"], "SUCCESS")
+
+    def advance_watermark(self):
+        """Once the run's studies are loaded, the next delta run starts from the day this one started."""
+        self.checkpoints.set_watermark(WATERMARK, self.run["started_at"][:10])
+
+    def compact(self):
+        """Compact this run's shards and index the result by nct_id."""
+        if self.incremental_compactor and not self.incremental_compactor.error:
+            self.incremental_compactor.finish()
+        else:
+            shards = self.checkpoints.compaction_inputs(self.run["run_id"])
+            self.extractor.compact_shards(self.shard_dir, self.compact_dir, shards)
+
+        StudyIndex(self.compact_dir).build(Transformer.list_parquet_files(self.compact_dir))
+
+    def reload_studies(self, nct_ids: List[str]):
+        """Flatten and load just these studies from the compacted data."""
+        progress_logger.info(f"Reloading {len(nct_ids)} studies from {self.compact_dir}")
+        try:
+            dataframes = Transformer(self.compact_dir, key_scheme=config.SURROGATE_KEY_SCHEME).flatten_studies(
+                self.compact_dir, nct_ids, self.columns_to_read
+            )
+            self.loader.load_to_postgres(dataframes)
+            progress_logger.info(f"Reloaded {len(dataframes['studies'])} studies")
+        finally:
+            self.loader.close()
+
     def extract(self):
-        pages_extracted = self.extractor.determine_starting_point()
+        self.open_run()
+        self.start_incremental_compaction()
+        if config.EXTRACTION_CONCURRENCY > 1:
+            return self.extract_partitions()
+
+        pages_extracted = self.extractor.determine_starting_point(self.run)
 
-        if pages_extracted >= self.extractor.pages_to_load:
+        pages_to_load = self.extractor.pages_to_load
+        if (pages_to_load is not None and pages_extracted >= pages_to_load) or self.extractor.done:
             progress_logger.info(
                 f"Already have {pages_extracted} pages, no further extraction needed."
             )
             return
 
-        while pages_extracted < self.extractor.pages_to_load:
-            self.extractor.make_request()
-            pages_extracted += 1
+        try:
+            while (pages_to_load is None or pages_extracted < pages_to_load) and not self.extractor.done:
+                self.extractor.make_request()
+                pages_extracted += 1
+        finally:
+            self.extractor.close()
 
         progress_logger.info(f"Extracted {pages_extracted} pages")
 
+    def extract_partitions(self):
+        """Follow one token chain per query partition, several at a time."""
+        partitioned_extractor = PartitionedExtractor(
+            partitions=build_partitions(self.run["since"]),
+            checkpoints=self.checkpoints,
+            run=self.run,
+            concurrency=config.EXTRACTION_CONCURRENCY,
+            timeout=self.extractor.timeout,
+            max_retries=self.extractor.max_retries,
+            pages_to_load=self.extractor.pages_to_load,
+            compactor=self.incremental_compactor,
+        )
+        pages_extracted = partitioned_extractor.run()
+        progress_logger.info(f"Extracted {pages_extracted} pages")
+
     def transform_and_load(self):
-        progress_logger.info(f"Transforming {self.extractor.pages_to_load} pages")
+        if config.TRANSFORM_MODE == "stream":
+            return self.stream_transform_and_load()
+
+        progress_logger.info(f"Transforming {self.compact_dir}")
         try:
-            df = self.transformer.read_selective_parquet_columns(self.compact_dir, self.columns_to_read)
+            df = self.flatten()
             progress_logger.info(f"TRANSFORMATION COMPLETE!")
 
-            self.loader.load_to_postgres(df)
+            if config.LOAD_RESUMABLE:
+                self.loader.load_resumable(df, self.load_id())
+            else:
+                self.loader.load_to_postgres(df)
             progress_logger.info(f"LOADING COMPLETE!")
 
+            if self.change_detector:
+                self.change_detector.commit()
+
         except Exception as e:
             error_logger.error(f"Transformation failed with error: {str(e)}")
             raise
 
+        finally:
+            self.loader.close()
+
+
+    def load_id(self) -> str:
+        """Resumable load id from the input files and the settings that shape the rows."""
+        files = Transformer.list_parquet_files(self.compact_dir)
+        fingerprint = json.dumps(
+            [
+                TRANSFORMER_VERSION, config.TRANSFORM_ENGINE, config.SURROGATE_KEY_SCHEME, config.LOAD_MODE,
+                StudyIndex(self.compact_dir).fingerprints(files),
+            ],
+            sort_keys=True
+        )
+        return hashlib.sha1(fingerprint.encode()).hexdigest()[:16]
+
+
+    def flatten(self):
+        """Flatten the compacted data, or reuse cached tables."""
+        if not self.transform_cache or self.change_detector:
+            return self.flattener.read_selective_parquet_columns(self.compact_dir, self.columns_to_read)
+
+        key = self.transform_cache.key(
+            Transformer.list_parquet_files(self.compact_dir),
+            TRANSFORMER_VERSION, config.TRANSFORM_ENGINE, config.SURROGATE_KEY_SCHEME, *self.columns_to_read
+        )
+        dataframes = self.transform_cache.get(key)
+        if dataframes is None:
+            dataframes = self.flattener.read_selective_parquet_columns(self.compact_dir, self.columns_to_read)
+            self.transform_cache.put(key, dataframes)
+        return dataframes
+
+
+    def stream_transform_and_load(self):
+        """Flatten and load the compacted file batch by batch, each batch committed on its own."""
+        if self.loader.load_mode != "upsert" and not config.LOAD_RESUMABLE:
+            raise ValueError(
+                "TRANSFORM_MODE=stream commits every batch separately; set LOAD_MODE=upsert or "
+                "LOAD_RESUMABLE=true so rerunning a failed load does not append its batches twice"
+            )
+
+        progress_logger.info(f"Streaming transformation in batches of {config.TRANSFORM_BATCH_SIZE} studies")
+        load_id = self.load_id() if config.LOAD_RESUMABLE else None
+        try:
+            if load_id:
+                self.check_stream_batch_size(load_id)
+            batches = self.transformer.stream_parquet_batches(
+                self.compact_dir, self.columns_to_read, config.TRANSFORM_BATCH_SIZE
+            )
+            for batch_number, dataframes in enumerate(batches, start=1):
+                if load_id:
+                    # batches already published by a failed run are skipped; which studies
+                    # land in batch N depends on the batch size, so it is part of the id
+                    self.loader.load_resumable(
+                        dataframes, f"{load_id}_s{config.TRANSFORM_BATCH_SIZE}_b{batch_number}"
+                    )
+                else:
+                    self.loader.load_to_postgres(dataframes)
+                progress_logger.info(f"Batch {batch_number} loaded")
+                del dataframes
+
+            progress_logger.info(f"STREAMED TRANSFORMATION AND LOADING COMPLETE!")
+
+            if self.change_detector:
+                self.change_detector.commit()
+
+        except Exception as e:
+            error_logger.error(f"Streaming transformation failed with error: {str(e)}")
+            raise
+
+        finally:
+            self.loader.close()
+
+
+    def check_stream_batch_size(self, load_id: str):
+        """Refuse to append a stream the batches of an earlier run over the same data cut differently."""
+        if self.loader.load_mode == "upsert":
+            return
+        earlier = self.loader.stream_batch_sizes(load_id) - {config.TRANSFORM_BATCH_SIZE}
+        if earlier:
+            raise ValueError(
+                f"Load {load_id} was already streamed in batches of {sorted(earlier)}; rerun with that "
+                f"TRANSFORM_BATCH_SIZE, or LOAD_MODE=upsert, so its published batches are not appended again"
+            )
 
 
     @staticmethod
@@ -104,7 +332,18 @@ class ETL:
 etl = ETL(run_extraction=True, run_transformation_and_load=True, run_dbt=False)
 
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Extract, transform and load ClinicalTrials.gov studies")
+    parser.add_argument(
+        "--mode", choices=("full", "delta"), default=config.EXTRACTION_MODE,
+        help="full pages through the whole registry (weekly reconciliation), delta only fetches "
+             "studies updated since the last successful run"
+    )
+    return parser.parse_args()
+
+
 if __name__ == "__main__":
+    etl.extraction_mode = parse_args().mode
     try:
         if (not etl.run_extraction and not
             etl.run_transformation_and_load and not etl.run_dbt
@@ -117,16 +356,16 @@ if __name__ == "__main__":
             os.makedirs(etl.shard_dir, exist_ok=True)
             os.makedirs(etl.compact_dir, exist_ok=True)
 
-            with open("etl/states/last_extraction_result.py", "w") as f:
-                f.write(
-                    f'result = "SUCCESS"\n'
-                )
-
-            etl.extractor.compact_shards(etl.shard_dir, etl.compact_dir)
+            etl.compact()
+            etl.finish_run()
 
         if etl.run_transformation_and_load:
             etl.transform_and_load()
 
+        # only once its studies are loaded, so a failed load is fetched again next time
+        if etl.run_extraction:
+            etl.advance_watermark()
+
 
         if etl.run_dbt:
             etl.run_dbt_models(etl.dbt_dir)
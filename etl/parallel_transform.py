@@ -0,0 +1,126 @@
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple
+import pandas as pd
+import pyarrow.parquet as pq
+
+from etl.change_detection import ChangeDetector
+from etl.transform import Transformer
+from etl.utils.log_service import progress_logger
+
+
+# registry attribute on Transformer -> key column of its rows
+DIMENSION_KEYS = {
+    'sponsors': 'sponsor_key',
+    'conditions': 'condition_key',
+    'interventions': 'intervention_key',
+    'sites': 'site_key',
+}
+
+ROW_BUFFERS = [
+    'studies_data',
+    'study_sponsors_data',
+    'study_conditions_data',
+    'study_interventions_data',
+    'study_sites_data',
+]
+
+# (file, row group indices, index of the first study in the task)
+Task = Tuple[str, List[int], int]
+
+
+def flatten_row_groups(
+        file: str, row_groups: List[int], columns: List[str], start_idx: int, change_index: str | None
+) -> Dict:
+    """Worker entry point: flatten a contiguous run of row groups into partial tables."""
+    change_detector = ChangeDetector(change_index) if change_index else None
+    transformer = Transformer(file, change_detector)
+    transformer.studies_processed = start_idx
+
+    table = transformer.read_columns(file, columns, row_groups)
+    protocols = transformer.select_nested(table, transformer.nested_root(columns)).to_pylist()
+    del table
+
+    transformer.flatten_protocols(protocols, start_idx + len(protocols))
+
+    partial = {name: getattr(transformer, name) for name in ROW_BUFFERS}
+    for name in DIMENSION_KEYS:
+        registry = getattr(transformer, name)
+        partial[name] = (registry.rows(), registry.hits)
+
+    if change_detector:
+        partial['changes'] = change_detector.state()
+    return partial
+
+
+class ParallelTransformer:
+    """Flattens the compacted parquet across a process pool."""
+
+    def __init__(self, transformer: Transformer, workers: int, tasks_per_worker: int = 4):
+        self.transformer = transformer
+        self.workers = workers
+        self.tasks_per_worker = tasks_per_worker
+
+
+    def read_selective_parquet_columns(self, file_to_read: str, columns_to_read: List[str]) -> Dict[str, pd.DataFrame]:
+        """Same contract as Transformer.read_selective_parquet_columns."""
+        tasks = self.plan_tasks(file_to_read)
+        change_detector = self.transformer.change_detector
+        change_index = change_detector.index_path if change_detector else None
+        progress_logger.info(
+            f"Flattening {file_to_read} with {self.workers} workers across {len(tasks)} tasks"
+        )
+
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            partials = executor.map(
+                flatten_row_groups,
+                [file for file, _, _ in tasks],
+                [row_groups for _, row_groups, _ in tasks],
+                [columns_to_read] * len(tasks),
+                [start_idx for _, _, start_idx in tasks],
+                [change_index] * len(tasks),
+            )
+            for partial in partials:
+                self.merge(partial)
+
+        progress_logger.info(f"Extracted {len(self.transformer.studies_data)} studies")
+        return self.transformer.transform_to_dataframes()
+
+
+    def plan_tasks(self, file_to_read: str) -> List[Task]:
+        """Group row groups into contiguous tasks of roughly equal row counts."""
+        files = self.transformer.list_parquet_files(file_to_read)
+        metadata = {file: pq.ParquetFile(file).metadata for file in files}
+        total_rows = sum(meta.num_rows for meta in metadata.values())
+        target_rows = max(1, total_rows // (self.workers * self.tasks_per_worker))
+
+        tasks = []
+        start_idx = 0
+        for file, meta in metadata.items():
+            row_groups, rows = [], 0
+            for rg in range(meta.num_row_groups):
+                row_groups.append(rg)
+                rows += meta.row_group(rg).num_rows
+
+                if rows >= target_rows:
+                    tasks.append((file, row_groups, start_idx))
+                    start_idx += rows
+                    row_groups, rows = [], 0
+
+            if row_groups:
+                tasks.append((file, row_groups, start_idx))
+                start_idx += rows
+
+        return tasks
+
+
+    def merge(self, partial: Dict):
+        """Append a worker's partial tables to the parent transformer."""
+        for name in ROW_BUFFERS:
+            getattr(self.transformer, name).extend(partial[name])
+
+        for name, key_field in DIMENSION_KEYS.items():
+            rows, hits = partial[name]
+            getattr(self.transformer, name).merge(key_field, rows, hits)
+
+        if 'changes' in partial:
+            self.transformer.change_detector.merge(partial['changes'])
@@ -0,0 +1,153 @@
+import asyncio
+import os
+from datetime import date
+from functools import partial
+from typing import Dict, List, Tuple
+
+import pyarrow as pa
+
+from etl.extract import Extractor, updated_since, with_query
+from etl.checkpoints import CheckpointStore
+from etl.utils.exceptions import FailedRequestError
+from etl.utils.rate_limit import RateLimiterHandler
+from etl.utils.http_client import HttpClient
+from etl.utils.shard_writer import ShardWriter
+from etl.utils.log_service import progress_logger, error_logger
+from config import config
+
+
+class QueryPartition:
+    """An independent slice of the registry with its own nextPageToken chain."""
+
+    def __init__(self, name: str, advanced_filter: str):
+        self.name = name
+        self.advanced_filter = advanced_filter
+
+    @property
+    def url(self) -> str:
+        return with_query(config.BASE_URL, {'filter.advanced': self.advanced_filter})
+
+    def page_url(self, token: str) -> str:
+        return with_query(f"{config.PAGES_BASE_URL}{token}", {'filter.advanced': self.advanced_filter})
+
+
+def yearly_partitions(first_year: int, last_year: int) -> List[QueryPartition]:
+    """Disjoint LastUpdatePostDate ranges, one per year."""
+    partitions = [
+        QueryPartition(f"before-{first_year}", f"AREA[LastUpdatePostDate]RANGE[MIN,{first_year - 1}-12-31]")
+    ]
+    for year in range(first_year, last_year):
+        partitions.append(
+            QueryPartition(str(year), f"AREA[LastUpdatePostDate]RANGE[{year}-01-01,{year}-12-31]")
+        )
+    partitions.append(
+        QueryPartition(f"from-{last_year}", f"AREA[LastUpdatePostDate]RANGE[{last_year}-01-01,MAX]")
+    )
+    return partitions
+
+
+class PartitionedExtractor:
+    """Runs several partition chains concurrently under one shared rate limit."""
+
+    def __init__(self, partitions: List[QueryPartition], checkpoints: CheckpointStore, run: Dict,
+                 concurrency: int, timeout: int, max_retries: int, pages_to_load: int | None = None,
+                 compactor=None):
+        self.partitions = partitions
+        self.checkpoints = checkpoints
+        self.run_id = run["run_id"]
+        self.shard_dir = run["shard_dir"]
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.max_retries = max_retries
+        # per-partition cap, None follows each chain to its last page
+        self.pages_to_load = pages_to_load
+        # IncrementalCompactor fed from the writer thread, None compacts after extraction
+        self.compactor = compactor
+
+        self.rate_limit_handler = RateLimiterHandler(
+            config.RATE_LIMIT_MAX_REQUESTS, config.RATE_LIMIT_WINDOW_SECONDS,
+            state_file=f"{config.STATE_MGT_DIR}/rate_limit.json"
+        )
+        # one pooled session shared by every chain, a connection per concurrent chain
+        self.http_client = HttpClient(self.rate_limit_handler, timeout, max_retries, pool_size=concurrency)
+        self.shard_writer = ShardWriter(Extractor.write_shard, config.SHARD_WRITER_QUEUE_SIZE)
+
+
+    def run(self) -> int:
+        try:
+            return asyncio.run(self.extract_all())
+        finally:
+            self.http_client.close()
+            self.shard_writer.close()
+
+
+    async def extract_all(self) -> int:
+        semaphore = asyncio.Semaphore(self.concurrency)
+        progress_logger.info(
+            f"Extracting {len(self.partitions)} partitions with {self.concurrency} concurrent chains"
+        )
+
+        async def bounded(partition):
+            async with semaphore:
+                return await self.extract_partition(partition)
+
+        pages = await asyncio.gather(*(bounded(partition) for partition in self.partitions))
+        total = sum(pages)
+        progress_logger.info(
+            f"Extracted {total} pages across {len(self.partitions)} partitions, "
+            f"rate limiter: {self.rate_limit_handler.stats()}"
+        )
+        return total
+
+
+    async def extract_partition(self, partition: QueryPartition) -> int:
+        checkpoint = await asyncio.to_thread(self.checkpoints.resume_point, self.run_id, partition.name)
+        if checkpoint["done"]:
+            progress_logger.info(f"Partition {partition.name} already complete ({checkpoint['page']} pages)")
+            return checkpoint["page"]
+
+        output_dir = f"{self.shard_dir}/{partition.name}"
+        os.makedirs(output_dir, exist_ok=True)
+
+        while self.pages_to_load is None or checkpoint["page"] < self.pages_to_load:
+            token = checkpoint["token"]
+            url = partition.page_url(token) if token else partition.url
+            page = checkpoint["page"] + 1
+
+            data, next_page_token = await self.fetch(url, partition, page)
+
+            checkpoint = {"page": page, "token": next_page_token, "done": not next_page_token}
+            shard_file = f"{output_dir}/{page}.parquet"
+            # blocks (off the event loop) while the writer is backed up
+            await asyncio.to_thread(
+                self.shard_writer.submit, data, shard_file,
+                partial(self.mark_durable, partition, page, next_page_token, shard_file)
+            )
+
+            if checkpoint["done"]:
+                break
+
+        return checkpoint["page"]
+
+
+    async def fetch(self, url: str, partition: QueryPartition, page: int) -> Tuple[pa.Table | Dict, str | None]:
+        try:
+            return await asyncio.to_thread(self.http_client.get, url, page, Extractor.read_page)
+        except FailedRequestError as e:
+            error_logger.warning(f"Partition {partition.name}: {e.log}")
+            raise
+
+
+    def mark_durable(self, partition: QueryPartition, page: int, next_page_token: str | None, shard_file: str):
+        """Runs on the writer thread once a page's shard is on disk."""
+        self.checkpoints.record_page(self.run_id, partition.name, page, next_page_token, shard_file)
+        if self.compactor:
+            self.compactor.add(partition.name, page, shard_file, next_page_token is None)
+        progress_logger.info(f"Partition {partition.name}: saved page {page}")
+
+
+def build_partitions(since: str | None = None) -> List[QueryPartition]:
+    """Yearly partitions for a full run, a single chain for a delta run."""
+    if since:
+        return [QueryPartition(f"since-{since}", updated_since(since))]
+    return yearly_partitions(config.PARTITION_START_YEAR, date.today().year)
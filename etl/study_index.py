@@ -0,0 +1,117 @@
+import json
+import os
+import time
+from typing import Dict, Iterable, List, Tuple
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from etl.compaction import NCT_ID_PATH
+from etl.utils.log_service import progress_logger
+
+
+# leading underscore keeps the index out of dataset reads and list_parquet_files
+INDEX_FILE = "_nct_index.parquet"
+NCT_ID_COLUMN = '.'.join(('studies',) + NCT_ID_PATH)
+
+
+class StudyIndex:
+    """Sidecar index from nct_id to file, row group and offset in the compacted data."""
+
+    def __init__(self, dataset_dir: str):
+        self.dataset_dir = dataset_dir
+        self.index_file = f"{dataset_dir}/{INDEX_FILE}"
+        self.row_groups: List[Dict] = []
+
+
+    def build(self, files: List[str]) -> int:
+        """Index every study in files, reading only the nct_id column."""
+        started = time.perf_counter()
+        tables, row_groups = [], []
+
+        for file in files:
+            relative = os.path.relpath(file, self.dataset_dir)
+            parquet_file = pq.ParquetFile(file)
+            for row_group in range(parquet_file.metadata.num_row_groups):
+                table = parquet_file.read_row_group(row_group, columns=[NCT_ID_COLUMN])
+                nct_ids = pc.struct_field(table.column('studies'), list(NCT_ID_PATH))
+                bounds = pc.min_max(nct_ids).as_py()
+                row_groups.append({
+                    'file': relative, 'row_group': row_group, 'rows': len(nct_ids),
+                    'min': bounds['min'], 'max': bounds['max'],
+                })
+                tables.append(pa.table({
+                    'nct_id': nct_ids,
+                    'file': pa.array([relative] * len(nct_ids), pa.string()),
+                    'row_group': pa.array([row_group] * len(nct_ids), pa.int32()),
+                    'row_offset': pa.array(range(len(nct_ids)), pa.int32()),
+                }))
+
+        schema = pa.schema([
+            ('nct_id', pa.string()), ('file', pa.string()), ('row_group', pa.int32()), ('row_offset', pa.int32())
+        ])
+        index = pa.concat_tables(tables) if tables else schema.empty_table()
+        index = index.filter(pc.is_valid(index.column('nct_id'))).sort_by('nct_id')
+
+        metadata = {'files': self.fingerprints(files), 'row_groups': row_groups}
+        index = index.replace_schema_metadata({b'nct_index': json.dumps(metadata).encode()})
+
+        temp_file = f"{self.dataset_dir}/.{INDEX_FILE}.tmp"
+        pq.write_table(index, temp_file, row_group_size=50_000, compression="zstd")
+        os.replace(temp_file, self.index_file)
+        self.row_groups = row_groups
+
+        progress_logger.info(
+            f"Indexed {index.num_rows} studies across {len(row_groups)} row groups "
+            f"in {time.perf_counter() - started:.2f}s at {self.index_file}"
+        )
+        return index.num_rows
+
+
+    def load(self, files: List[str]) -> bool:
+        """Use the index on disk if it was built from exactly these files."""
+        if not os.path.exists(self.index_file):
+            return False
+
+        metadata = json.loads(pq.read_schema(self.index_file).metadata[b'nct_index'])
+        if metadata['files'] != self.fingerprints(files):
+            progress_logger.info(f"nct_id index at {self.index_file} is stale")
+            return False
+
+        self.row_groups = metadata['row_groups']
+        return True
+
+
+    def ensure(self, files: List[str]) -> "StudyIndex":
+        if not self.load(files):
+            self.build(files)
+        return self
+
+
+    def locate(self, nct_ids: Iterable[str]) -> Tuple[Dict[Tuple[str, int], List[int]], List[str]]:
+        """Row offsets per (file, row group) for the studies, and the ids not found."""
+        wanted = sorted(set(nct_ids))
+        # row group bounds rule out ids that cannot be anywhere before the index is read
+        candidates = [
+            nct_id for nct_id in wanted
+            if any(rg['min'] is not None and rg['min'] <= nct_id <= rg['max'] for rg in self.row_groups)
+        ]
+
+        locations: Dict[Tuple[str, int], List[int]] = {}
+        found = set()
+        if candidates:
+            hits = pq.read_table(self.index_file, filters=[('nct_id', 'in', candidates)])
+            for nct_id, file, row_group, row_offset in zip(*(hits.column(name).to_pylist() for name in hits.column_names)):
+                locations.setdefault((file, row_group), []).append(row_offset)
+                found.add(nct_id)
+
+        return locations, [nct_id for nct_id in wanted if nct_id not in found]
+
+
+    def fingerprints(self, files: List[str]) -> Dict[str, List[int]]:
+        fingerprints = {}
+        for file in files:
+            stat = os.stat(file)
+            fingerprints[os.path.relpath(file, self.dataset_dir)] = [stat.st_size, stat.st_mtime_ns]
+        return fingerprints
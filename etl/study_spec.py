@@ -0,0 +1,142 @@
+from typing import Callable, Dict, List, Tuple
+
+import pyarrow as pa
+
+
+class FieldSpec:
+    """One staging.studies column: its path under protocolSection and optional converter."""
+
+    def __init__(self, column: str, path: str, convert: str | None = None):
+        self.column = column
+        self.path: Tuple[str, ...] = tuple(path.split('.'))
+        self.convert = convert
+
+
+# staging.studies columns after study_key and nct_id, in table order, for both engines
+STUDY_FIELDS: List[FieldSpec] = [
+    FieldSpec('brief_title', 'identificationModule.briefTitle'),
+    FieldSpec('official_title', 'identificationModule.officialTitle'),
+    FieldSpec('acronym', 'identificationModule.acronym'),
+    FieldSpec('org_study_id', 'identificationModule.orgStudyIdInfo.id'),
+    FieldSpec('brief_summary', 'descriptionModule.briefSummary'),
+    FieldSpec('detailed_description', 'descriptionModule.detailedDescription'),
+    FieldSpec('overall_status', 'statusModule.overallStatus', convert='category'),
+    FieldSpec('status_verified_date', 'statusModule.statusVerifiedDate'),
+    FieldSpec('start_date', 'statusModule.startDateStruct.date'),
+    FieldSpec('start_date_type', 'statusModule.startDateStruct.type', convert='category'),
+    FieldSpec('completion_date', 'statusModule.completionDateStruct.date'),
+    FieldSpec('completion_date_type', 'statusModule.completionDateStruct.type', convert='category'),
+    FieldSpec('primary_completion_date', 'statusModule.primaryCompletionDateStruct.date'),
+    FieldSpec('primary_completion_date_type', 'statusModule.primaryCompletionDateStruct.type', convert='category'),
+    FieldSpec('why_stopped', 'statusModule.whyStopped'),
+    FieldSpec('has_expanded_access', 'statusModule.expandedAccessInfo.hasExpandedAccess'),
+    FieldSpec('source_last_updated_date', 'statusModule.lastUpdatePostDateStruct.date'),
+    FieldSpec('source_last_updated_date_type', 'statusModule.lastUpdatePostDateStruct.type', convert='category'),
+    FieldSpec('study_type', 'designModule.studyType', convert='category'),
+    FieldSpec('enrollment_count', 'designModule.enrollmentInfo.count'),
+    FieldSpec('enrollment_type', 'designModule.enrollmentInfo.type', convert='category'),
+    FieldSpec('allocation', 'designModule.designInfo.allocation', convert='category'),
+    FieldSpec('intervention_model', 'designModule.designInfo.interventionModel', convert='category'),
+    FieldSpec('primary_purpose', 'designModule.designInfo.primaryPurpose', convert='category'),
+    FieldSpec('masking', 'designModule.designInfo.maskingInfo.masking', convert='category'),
+    FieldSpec('masking_description', 'designModule.designInfo.maskingInfo.maskingDescription'),
+    FieldSpec('patient_registry', 'designModule.patientRegistry'),
+    FieldSpec('target_duration', 'designModule.targetDuration'),
+    FieldSpec('eligibility_criteria', 'eligibilityModule.eligibilityCriteria'),
+    FieldSpec('healthy_volunteers', 'eligibilityModule.healthyVolunteers'),
+    FieldSpec('sex', 'eligibilityModule.sex', convert='category'),
+    FieldSpec('minimum_age_years', 'eligibilityModule.minimumAge', convert='age_years'),
+    FieldSpec('maximum_age_years', 'eligibilityModule.maximumAge', convert='age_years'),
+    FieldSpec('has_dmc', 'oversightModule.oversightHasDmc'),
+    FieldSpec('is_fda_regulated_drug', 'oversightModule.isFdaRegulatedDrug'),
+    FieldSpec('is_fda_regulated_device', 'oversightModule.isFdaRegulatedDevice'),
+]
+
+# long free text that rarely changes: stored once per distinct text in study_texts, keyed
+# by content hash, while studies carries <column>_hash in its place
+TEXT_COLUMNS: List[str] = ['brief_summary', 'detailed_description', 'eligibility_criteria']
+
+# every other protocolSection path the transform reads: the study id and the fields
+# behind the sponsor, condition, intervention and site tables
+RELATED_PATHS: List[str] = [
+    'identificationModule.nctId',
+    'sponsorCollaboratorsModule.leadSponsor.name',
+    'sponsorCollaboratorsModule.leadSponsor.class',
+    'sponsorCollaboratorsModule.collaborators.name',
+    'sponsorCollaboratorsModule.collaborators.class',
+    'conditionsModule.conditions',
+    'armsInterventionsModule.interventions.type',
+    'armsInterventionsModule.interventions.name',
+    'armsInterventionsModule.interventions.description',
+    'contactsLocationsModule.locations.facility',
+    'contactsLocationsModule.locations.city',
+    'contactsLocationsModule.locations.state',
+    'contactsLocationsModule.locations.zip',
+    'contactsLocationsModule.locations.country',
+    'contactsLocationsModule.locations.geoPoint',
+]
+
+
+class StudySpec:
+    """Field specs compiled per engine: a Python row builder, an Arrow projection and parquet leaves."""
+
+    def __init__(self, fields: List[FieldSpec], related: List[str] = ()):
+        self.fields = fields
+        self.related = list(related)
+
+
+    @property
+    def columns(self) -> List[str]:
+        return [field.column for field in self.fields]
+
+
+    def compile_rows(self, converters: Dict[str, Callable], leading: Tuple[str, ...] = ()) -> Callable[..., Dict]:
+        """Generate build_row(protocol, *leading) returning a row dict."""
+        lines = [f"def build_row({', '.join(('protocol',) + leading)}):"]
+        namespace: Dict = {'_EMPTY': {}}
+        nodes = {(): 'protocol'}
+
+        def node(path: Tuple[str, ...]) -> str:
+            if path not in nodes:
+                parent = node(path[:-1])
+                name = f"n{len(nodes)}"
+                lines.append(f"    {name} = {parent}.get({path[-1]!r})")
+                lines.append(f"    if not isinstance({name}, dict): {name} = _EMPTY")
+                nodes[path] = name
+            return nodes[path]
+
+        values = [f"        {column!r}: {column}," for column in leading]
+        for position, field in enumerate(self.fields):
+            value = f"{node(field.path[:-1])}.get({field.path[-1]!r})"
+            if field.convert:
+                namespace[f"_convert{position}"] = converters[field.convert]
+                value = f"_convert{position}({value})"
+            values.append(f"        {field.column!r}: {value},")
+
+        lines += ["    return {", *values, "    }"]
+        exec("\n".join(lines), namespace)
+        return namespace['build_row']
+
+
+    def project(self, protocols: pa.StructArray, field: Callable[..., pa.Array],
+                converters: Dict[str, Callable]) -> Dict[str, pa.Array]:
+        """Column arrays from a protocolSection struct array; field(array, *path) does the access."""
+        columns = {}
+        for spec in self.fields:
+            values = field(protocols, *spec.path)
+            columns[spec.column] = converters[spec.convert](values) if spec.convert else values
+        return columns
+
+
+    @property
+    def paths(self) -> List[str]:
+        """Dotted protocolSection paths the transform reads, without duplicates."""
+        return list(dict.fromkeys(['.'.join(field.path) for field in self.fields] + self.related))
+
+
+    def leaf_columns(self, root: str) -> List[str]:
+        """Dotted parquet paths under root that the transform reads."""
+        return [f"{root}.{path}" for path in self.paths]
+
+
+STUDY_SPEC = StudySpec(STUDY_FIELDS, RELATED_PATHS)
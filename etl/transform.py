@@ -1,30 +1,77 @@
+import os
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
 import json
-from typing import Dict, List, Any, Hashable
-import hashlib
+from typing import Dict, List, Any, Hashable, Iterator
 from etl.utils.log_service import progress_logger, error_logger
+from etl.utils.registry import EntityRegistry
+from etl.utils.keys import KeyGenerator
+from etl.utils.vocabulary import Vocabulary
+from etl.study_index import StudyIndex
+from etl.study_spec import STUDY_SPEC, TEXT_COLUMNS
 from datetime import datetime
 
+
+# bump whenever a change to either flattening engine changes its output, so cached
+# tables from the old code are not reused
+TRANSFORMER_VERSION = "3"
+
+# table -> its own key column, hashed from the key source buffered in that column
+SOURCE_KEY_COLUMNS = {
+    'studies': 'study_key',
+    'sponsors': 'sponsor_key',
+    'conditions': 'condition_key',
+    'interventions': 'intervention_key',
+    'sites': 'site_key',
+}
+
+# bridge table -> (bridge key column, dimension key column); the bridge key hashes the
+# study key and the dimension key (plus the sponsor role for study_sponsors)
+BRIDGE_KEY_COLUMNS = {
+    'study_sponsors': ('study_sponsor_key', 'sponsor_key'),
+    'study_conditions': ('study_condition_key', 'condition_key'),
+    'study_interventions': ('study_intervention_key', 'intervention_key'),
+    'study_sites': ('study_site_key', 'site_key'),
+}
+
+# low-cardinality columns carried as categoricals over the transformer's shared Vocabulary
+CATEGORICAL_COLUMNS = {
+    'studies': [field.column for field in STUDY_SPEC.fields if field.convert == 'category'],
+    'sponsors': ['sponsor_class'],
+    'interventions': ['intervention_type'],
+    'sites': ['country'],
+}
+
 class Transformer:
-    def __init__(self, parquet_path):
+    def __init__(self, parquet_path, change_detector=None, key_scheme: str = "md5"):
         self.parquet_path = parquet_path
+        self.change_detector = change_detector
+        self.keys = KeyGenerator(key_scheme)
+        self.vocabulary = Vocabulary()
+        self.build_study_row = STUDY_SPEC.compile_rows(
+            {'age_years': self.extract_age_years, 'category': self.vocabulary.intern},
+            leading=('study_key', 'nct_id')
+        )
         self.studies_data = []
-        self.sponsors_data = []
-        self.conditions_data = []
-        self.interventions_data = []
-        self.sites_data = []
+        self.sponsors = EntityRegistry('sponsors')
+        self.conditions = EntityRegistry('conditions')
+        self.interventions = EntityRegistry('interventions')
+        self.sites = EntityRegistry('sites')
         self.study_sponsors_data = []
         self.study_conditions_data = []
         self.study_interventions_data = []
         self.study_sites_data = []
+        self.studies_processed = 0
 
 
 
     @staticmethod
-    def generate_key(*args) -> str:
-        """Generate a deterministic surrogate key from input values."""
-        combined = '|'.join(str(arg) for arg in args if arg is not None)
-        return hashlib.md5(combined.encode()).hexdigest()[:16]
+    def key_source(*args) -> str:
+        """The string a surrogate key hashes: the non-null values joined with '|'."""
+        return '|'.join(str(arg) for arg in args if arg is not None)
 
     @staticmethod
     def extract_age_years(age_str: str) -> int | None:
@@ -65,42 +112,138 @@ class Transformer:
 
 
 
-    def read_selective_parquet_columns(self, file_to_read, columns_to_read: List[str]) -> pd.DataFrame:
-        """read specific columns from parquet."""
+    def read_selective_parquet_columns(self, file_to_read, columns_to_read: List[str]) -> Dict[str, pd.DataFrame]:
+        """Read only the leaf columns under columns_to_read and flatten them."""
+        progress_logger.info(f"Reading parquet file at {file_to_read}")
+        root = self.nested_root(columns_to_read)
+        protocols = []
+        for file in self.list_parquet_files(file_to_read):
+            table = self.read_columns(file, columns_to_read)
+            protocols.extend(self.select_nested(table, root).to_pylist())
+            del table
+        progress_logger.info(f"Read {len(protocols)} rows")
+
+        progress_logger.info("Flattening parquet data...")
+        self.flatten_protocols(protocols, len(protocols))
+        progress_logger.info(f"Extracted {len(self.studies_data)} studies")
+        return self.transform_to_dataframes()
 
-        df = self.read_parquet(file_to_read, columns=columns_to_read)
 
-        dataframes = self.flatten_parquet_to_tables(df)
-        return dataframes
+    def stream_parquet_batches(
+            self, file_to_read: str, columns_to_read: List[str], batch_size: int
+    ) -> Iterator[Dict[str, pd.DataFrame]]:
+        """Yield the flattened tables for each record batch of the compacted parquet."""
+        files = self.list_parquet_files(file_to_read)
+        total = sum(pq.ParquetFile(file).metadata.num_rows for file in files)
+        progress_logger.info(
+            f"Streaming {total} rows from {len(files)} file(s) at {file_to_read} in batches of {batch_size}"
+        )
+
+        root = self.nested_root(columns_to_read)
+        for file in files:
+            parquet_file = self.open_parquet(file)
+            columns = self.leaf_columns(parquet_file.schema, columns_to_read)
+            for batch in parquet_file.iter_batches(batch_size=batch_size, columns=columns):
+                protocols = self.select_nested(batch, root).to_pylist()
+                del batch
+
+                self.flatten_protocols(protocols, total)
+                yield self.transform_to_dataframes()
+
+
+    def flatten_studies(self, file_to_read: str, nct_ids: List[str], columns_to_read: List[str]) -> Dict[str, pd.DataFrame]:
+        """Flatten only the given studies, using the nct_id index."""
+        dataset_dir = os.path.dirname(file_to_read) if os.path.isfile(file_to_read) else file_to_read
+        index = StudyIndex(dataset_dir).ensure(self.list_parquet_files(file_to_read))
+        locations, missing = index.locate(nct_ids)
+        if missing:
+            progress_logger.warning(f"{len(missing)} studies not found in {file_to_read}: {missing[:10]}")
+
+        root = self.nested_root(columns_to_read)
+        protocols = []
+        for (file, row_group), offsets in locations.items():
+            table = self.read_columns(os.path.join(dataset_dir, file), columns_to_read, [row_group])
+            protocols.extend(self.select_nested(table, root).take(offsets).to_pylist())
+        progress_logger.info(f"Read {len(protocols)} studies from {len(locations)} row group(s)")
+
+        self.flatten_protocols(protocols, len(protocols))
+        return self.transform_to_dataframes()
 
 
     @staticmethod
-    def read_parquet(file_path: str, columns: List) -> pd.DataFrame | None:
-        """Read parquet file with optional column selection."""
-        progress_logger.info(f"Reading parquet file at {file_path}")
+    def list_parquet_files(path: str) -> List[str]:
+        """Sorted parquet files in a file or directory, skipping hidden and underscore files."""
+        if os.path.isfile(path):
+            return [path]
 
-        if columns:
-            df = pd.read_parquet(file_path, columns=columns)
-            progress_logger.info(f"Read {len(df)} rows, {len(columns)} columns")
-        else:
-            df = pd.read_parquet(file_path)
-            progress_logger.info(f"Read {len(df)} rows, {len(df.columns)} columns")
+        files = []
+        for root, dirs, names in os.walk(path):
+            dirs[:] = [d for d in dirs if not d.startswith(('.', '_'))]
+            files.extend(
+                os.path.join(root, name) for name in names
+                if name.endswith(".parquet") and not name.startswith(('.', '_'))
+            )
+        return sorted(files)
 
-        progress_logger.info(f"Read {len(df)} rows")
-        progress_logger.info(f"Columns: {df.columns.tolist()}")
-        progress_logger.info(f"First row keys: {list(df.iloc[0].keys()) if len(df) > 0 else 'empty'}")
 
-        return df
+    @staticmethod
+    def select_nested(data: pa.RecordBatch | pa.Table, column_path: str) -> pa.Array | pa.ChunkedArray:
+        """Walk a dotted column path (e.g. studies.protocolSection) down to its array."""
+        top, *fields = column_path.split('.')
+        array = data.column(top)
+        for field in fields:
+            array = pc.struct_field(array, field)
+        return array
 
 
-    def flatten_parquet_to_tables(self, df: pd.DataFrame) -> Dict[str, pd.DataFrame]:
-        """Flatten nested structures in parquet DataFrame."""
-        progress_logger.info("Flattening parquet data...")
+    @staticmethod
+    def nested_root(columns_to_read: List[str]) -> str:
+        """The deepest path all columns share."""
+        if len(columns_to_read) == 1:
+            return columns_to_read[0]
+        shared = []
+        for names in zip(*(column.split('.') for column in columns_to_read)):
+            if len(set(names)) > 1:
+                break
+            shared.append(names[0])
+        return '.'.join(shared)
+
 
-        protocols = df['protocolSection'].tolist()
-        total = len(protocols)
+    @staticmethod
+    def open_parquet(file: str) -> pq.ParquetFile:
+        """Memory-mapped, with each row group's column chunks fetched in coalesced reads."""
+        return pq.ParquetFile(file, memory_map=True, pre_buffer=True)
+
+
+    @staticmethod
+    def leaf_columns(schema: pq.ParquetSchema, columns_to_read: List[str]) -> List[str]:
+        """Parquet leaf columns of this file under any of the dotted paths."""
+        wanted = set(columns_to_read)
+        leaves = []
+        for i in range(len(schema)):
+            path = schema.column(i).path
+            names = path.replace('.list.element', '').replace('.list.item', '').split('.')
+            if any('.'.join(names[:depth]) in wanted for depth in range(1, len(names) + 1)):
+                leaves.append(path)
+        return leaves
+
+
+    @classmethod
+    def read_columns(cls, file: str, columns_to_read: List[str], row_groups: List[int] | None = None) -> pa.Table:
+        """Read just the leaf columns under columns_to_read, from all or some row groups."""
+        parquet_file = cls.open_parquet(file)
+        columns = cls.leaf_columns(parquet_file.schema, columns_to_read)
+        if row_groups is None:
+            return parquet_file.read(columns=columns)
+        return parquet_file.read_row_groups(row_groups, columns=columns)
+
+
+    def flatten_protocols(self, protocols: List, total: int):
+        """Run every protocolSection through extract_study."""
+        for protocol in protocols:
+            idx = self.studies_processed
+            self.studies_processed += 1
 
-        for idx, protocol in enumerate(protocols):
             if idx % 1000 == 0 and idx > 0:
                 progress_logger.info(f"Processed {idx}/{total} studies ({idx / total * 100:.1f}%)")
 
@@ -115,10 +258,10 @@ class Transformer:
                 progress_logger.warning(f"Invalid protocolSection at index {idx}")
                 continue
 
-            self.extract_study(protocol, idx)
+            if self.change_detector and not self.change_detector.has_changed(protocol):
+                continue
 
-        progress_logger.info(f"Extracted {len(self.studies_data)} studies")
-        return self.transform_to_dataframes()
+            self.extract_study(protocol, idx)
 
 
     def extract_study(self, protocol: Dict, idx: Hashable):
@@ -128,7 +271,8 @@ class Transformer:
             progress_logger.warning(f"Study missing NCT ID, skipping index {idx}")
             return
 
-        study_key = self.generate_key(nct_id)
+        # key columns hold their key source until assign_keys hashes the whole batch
+        study_key = self.key_source(nct_id)
 
         self.flatten_study_data(protocol, study_key, nct_id)
         self.extract_sponsors(protocol, study_key)
@@ -138,72 +282,8 @@ class Transformer:
 
 
     def flatten_study_data(self, protocol: Dict, study_key: str, nct_id: str):
-        """Extract and flatten study information."""
-        study_data = {
-            'study_key': study_key,
-            'nct_id': nct_id,
-
-
-            'brief_title': self.safe_get(protocol, 'identificationModule', 'briefTitle'),
-            'official_title': self.safe_get(protocol, 'identificationModule', 'officialTitle'),
-            'acronym': self.safe_get(protocol, 'identificationModule', 'acronym'),
-            'org_study_id': self.safe_get(protocol, 'identificationModule', 'orgStudyIdInfo', 'id'),
-
-
-            'brief_summary': self.safe_get(protocol, 'descriptionModule', 'briefSummary'),
-            'detailed_description': self.safe_get(protocol, 'descriptionModule', 'detailedDescription'),
-
-
-            'overall_status': self.safe_get(protocol, 'statusModule', 'overallStatus'),
-            'status_verified_date': self.safe_get(protocol, 'statusModule', 'statusVerifiedDate'),
-
-            'start_date': self.safe_get(protocol, 'statusModule', 'startDateStruct', 'date'),
-            'start_date_type': self.safe_get(protocol, 'statusModule', 'startDateStruct', 'type'),
-            'completion_date': self.safe_get(protocol, 'statusModule', 'completionDateStruct', 'date'),
-            'completion_date_type': self.safe_get(protocol, 'statusModule', 'completionDateStruct', 'type'),
-            'primary_completion_date': self.safe_get(protocol, 'statusModule', 'primaryCompletionDateStruct', 'date'),
-            'primary_completion_date_type': self.safe_get(protocol, 'statusModule', 'primaryCompletionDateStruct',
-                                                          'type'),
-
-            'why_stopped': self.safe_get(protocol, 'statusModule', 'whyStopped'),
-
-            'has_expanded_access': self.safe_get(protocol, 'statusModule', 'expandedAccessInfo', 'hasExpandedAccess'),
-
-            'source_last_updated_date': self.safe_get(protocol, 'statusModule', 'lastUpdatePostDateStruct', 'date'),
-            'source_last_updated_date_type': self.safe_get(protocol, 'statusModule', 'lastUpdatePostDateStruct',
-                                                           'type'),
-
-
-            'study_type': self.safe_get(protocol, 'designModule', 'studyType'),
-            'enrollment_count': self.safe_get(protocol, 'designModule', 'enrollmentInfo', 'count'),
-            'enrollment_type': self.safe_get(protocol, 'designModule', 'enrollmentInfo', 'type'),
-            'allocation': self.safe_get(protocol, 'designModule', 'designInfo', 'allocation'),
-            'intervention_model': self.safe_get(protocol, 'designModule', 'designInfo', 'interventionModel'),
-            'primary_purpose': self.safe_get(protocol, 'designModule', 'designInfo', 'primaryPurpose'),
-            'masking': self.safe_get(protocol, 'designModule', 'designInfo', 'maskingInfo', 'masking'),
-            'masking_description': self.safe_get(protocol, 'designModule', 'designInfo', 'maskingInfo', 'maskingDescription'),
-
-            'patient_registry': self.safe_get(protocol, 'designModule', 'patientRegistry'),
-            'target_duration': self.safe_get(protocol, 'designModule', 'targetDuration'),
-
-
-            'eligibility_criteria': self.safe_get(protocol, 'eligibilityModule', 'eligibilityCriteria'),
-            'healthy_volunteers': self.safe_get(protocol, 'eligibilityModule', 'healthyVolunteers'),
-            'sex': self.safe_get(protocol, 'eligibilityModule', 'sex'),
-            'minimum_age_years': self.extract_age_years(
-                self.safe_get(protocol, 'eligibilityModule', 'minimumAge')
-            ),
-            'maximum_age_years': self.extract_age_years(
-                self.safe_get(protocol, 'eligibilityModule', 'maximumAge')
-            ),
-
-
-            'has_dmc': self.safe_get(protocol, 'oversightModule', 'oversightHasDmc'),
-            'is_fda_regulated_drug': self.safe_get(protocol, 'oversightModule', 'isFdaRegulatedDrug'),
-            'is_fda_regulated_device': self.safe_get(protocol, 'oversightModule', 'isFdaRegulatedDevice'),
-            'etl_created_at': datetime.now().isoformat()
-        }
-        self.studies_data.append(study_data)
+        """Extract and flatten study information with the row builder compiled from STUDY_SPEC."""
+        self.studies_data.append(self.build_study_row(protocol, study_key, nct_id))
 
 
 
@@ -213,24 +293,19 @@ class Transformer:
         lead = sponsor_module.get('leadSponsor', {})
 
         if lead.get('name'):
-            sponsor_key = self.generate_key(lead.get('name'))
-            if not any(s['sponsor_key'] == sponsor_key for s in self.sponsors_data):
-
-                self.sponsors_data.append({
-                    'sponsor_key': sponsor_key,
-                    'sponsor_name': lead.get('name'),
-                    'sponsor_class': lead.get('class'),
-                    'etl_created_at': datetime.now().isoformat()
-                })
+            sponsor_key = self.key_source(lead.get('name'))
+            self.sponsors.add(sponsor_key, lambda: {
+                'sponsor_key': sponsor_key,
+                'sponsor_name': lead.get('name'),
+                'sponsor_class': lead.get('class'),
+            })
 
             self.study_sponsors_data.append({
-                'study_sponsor_key': self.generate_key(study_key, sponsor_key, 'lead'),
+                'study_sponsor_key': None,
                 'study_key': study_key,
                 'sponsor_key': sponsor_key,
                 'is_lead': True,
                 'is_collaborator': False,
-                'etl_created_at': datetime.now().isoformat()
-
             })
 
             collaborators =sponsor_module.get('collaborators', [])
@@ -245,23 +320,20 @@ class Transformer:
 
             for collaborator in collaborators:
                 if collaborator.get('name'):
-                    sponsor_key = self.generate_key(collaborator.get('name'))
-
-                    if not any(s['sponsor_key'] == sponsor_key for s in self.sponsors_data):
-                        self.sponsors_data.append({
-                            'sponsor_key': sponsor_key,
-                            'sponsor_name': collaborator.get('name'),
-                            'sponsor_class': collaborator.get('class'),
-                            'etl_created_at': datetime.now().isoformat()
-                        })
+                    sponsor_key = self.key_source(collaborator.get('name'))
+
+                    self.sponsors.add(sponsor_key, lambda: {
+                        'sponsor_key': sponsor_key,
+                        'sponsor_name': collaborator.get('name'),
+                        'sponsor_class': collaborator.get('class'),
+                    })
 
                     self.study_sponsors_data.append({
-                        'study_sponsor_key': self.generate_key(study_key, sponsor_key, 'collab'),
+                        'study_sponsor_key': None,
                         'study_key': study_key,
                         'sponsor_key': sponsor_key,
                         'is_lead': False,
                         'is_collaborator': True,
-                        'etl_created_at': datetime.now().isoformat()
                         })
 
 
@@ -277,20 +349,17 @@ class Transformer:
 
         for condition in conditions:
             if condition:
-                condition_key = self.generate_key(condition)
+                condition_key = self.key_source(condition)
 
-                if not any(c['condition_key'] == condition_key for c in self.conditions_data):
-                        self.conditions_data.append({
-                            'condition_key': condition_key,
-                            'condition_name': condition,
-                            'etl_created_at': datetime.now().isoformat()
-                            })
+                self.conditions.add(condition_key, lambda: {
+                    'condition_key': condition_key,
+                    'condition_name': condition,
+                })
 
                 self.study_conditions_data.append({
-                    'study_condition_key': self.generate_key(study_key, condition_key),
+                    'study_condition_key': None,
                     'study_key': study_key,
                     'condition_key': condition_key,
-                    'etl_created_at': datetime.now().isoformat()
                     })
 
 
@@ -313,22 +382,19 @@ class Transformer:
             intervention_name = intervention.get('name')
 
             if intervention_name:
-                intervention_key = self.generate_key(intervention_type, intervention_name)
-
-                if not any(i['intervention_key'] == intervention_key for i in self.interventions_data):
-                    self.interventions_data.append({
-                         'intervention_key': intervention_key,
-                        'intervention_type': intervention_type,
-                        'intervention_name': intervention_name,
-                        'intervention_description': intervention.get('description'),
-                        'etl_created_at': datetime.now().isoformat()
-                    })
+                intervention_key = self.key_source(intervention_type, intervention_name)
+
+                self.interventions.add(intervention_key, lambda: {
+                    'intervention_key': intervention_key,
+                    'intervention_type': intervention_type,
+                    'intervention_name': intervention_name,
+                    'intervention_description': intervention.get('description'),
+                })
 
                 self.study_interventions_data.append({
-                    'study_intervention_key': self.generate_key(study_key, intervention_key),
+                    'study_intervention_key': None,
                     'study_key': study_key,
                     'intervention_key': intervention_key,
-                    'etl_created_at': datetime.now().isoformat()
                 })
 
 
@@ -350,47 +416,113 @@ class Transformer:
             country = location.get('country')
 
             if facility or city:
-                site_key = self.generate_key(facility, city, country)
-
-                if not any(s['site_key'] == site_key for s in self.sites_data):
-                    geo = location.get('geoPoint', {})
-                    self.sites_data.append({
-                        'site_key': site_key,
-                        'facility_name': facility,
-                        'city': city,
-                        'state': location.get('state'),
-                        'zip': location.get('zip'),
-                        'country': country,
-                        'latitude': geo.get('lat') if geo else None,
-                        'longitude': geo.get('lon') if geo else None,
-                        'etl_created_at': datetime.now().isoformat()
-                    })
+                site_key = self.key_source(facility, city, country)
+
+                self.sites.add(site_key, lambda: self.build_site_row(site_key, location))
 
                 self.study_sites_data.append({
-                    'study_site_key': self.generate_key(study_key, site_key),
+                    'study_site_key': None,
                     'study_key': study_key,
                     'site_key': site_key,
-                    'etl_created_at': datetime.now().isoformat()
                 })
 
 
 
+    @staticmethod
+    def build_site_row(site_key: str, location: Dict) -> Dict:
+        """Build a sites dimension row from a location entry."""
+        geo = location.get('geoPoint', {})
+        return {
+            'site_key': site_key,
+            'facility_name': location.get('facility'),
+            'city': location.get('city'),
+            'state': location.get('state'),
+            'zip': location.get('zip'),
+            'country': location.get('country'),
+            'latitude': geo.get('lat') if geo else None,
+            'longitude': geo.get('lon') if geo else None,
+        }
+
+
+    def reset_rows(self):
+        """Drop buffered study and bridge rows. Registry keys are kept."""
+        self.studies_data = []
+        self.study_sponsors_data = []
+        self.study_conditions_data = []
+        self.study_interventions_data = []
+        self.study_sites_data = []
+
+
+    def assign_keys(self, dataframes: Dict[str, pd.DataFrame]):
+        """Hash the buffered key sources into surrogate keys a whole column at a time."""
+        for name, key_col in SOURCE_KEY_COLUMNS.items():
+            df = dataframes[name]
+            if not df.empty:
+                df[key_col] = self.keys(df[key_col])
+
+        for name, (bridge_key_col, dimension_key_col) in BRIDGE_KEY_COLUMNS.items():
+            df = dataframes[name]
+            if df.empty:
+                continue
+            df['study_key'] = self.keys(df['study_key'])
+            df[dimension_key_col] = self.keys(df[dimension_key_col])
+            parts = [df['study_key'], df[dimension_key_col]]
+            if name == 'study_sponsors':
+                parts.append(np.where(df['is_lead'], 'lead', 'collab'))
+            df[bridge_key_col] = self.keys(*parts)
+
+
+    def split_texts(self, studies: pd.DataFrame) -> pd.DataFrame:
+        """Replace text columns with <column>_hash and return the distinct texts."""
+        texts = []
+        for column in TEXT_COLUMNS:
+            if column not in studies:
+                continue
+            position = studies.columns.get_loc(column)
+            values = studies.pop(column)
+            present = values.notna()
+            hashes = pd.Series(None, index=studies.index, dtype=object)
+            hashes[present] = self.keys(values[present])
+            studies.insert(position, f"{column}_hash", hashes)
+            texts.append(pd.DataFrame({'text_hash': hashes[present], 'content': values[present]}))
+
+        if not texts:
+            return pd.DataFrame()
+        return pd.concat(texts, ignore_index=True).drop_duplicates('text_hash', ignore_index=True)
+
+
+    def encode_categories(self, dataframes: Dict[str, pd.DataFrame]):
+        """Turn the CATEGORICAL_COLUMNS into categoricals over the shared vocabulary."""
+        for name, columns in CATEGORICAL_COLUMNS.items():
+            df = dataframes[name]
+            for column in columns:
+                if column in df:
+                    df[column] = self.vocabulary.categorical(column, df[column])
+
+
     def transform_to_dataframes(self) -> Dict[str, pd.DataFrame]:
         """Transform extracted data into pandas DataFrames ready for Postgres."""
         dataframes = {
             'studies': pd.DataFrame(self.studies_data),
-            'sponsors': pd.DataFrame(self.sponsors_data),
-            'conditions': pd.DataFrame(self.conditions_data),
-            'interventions': pd.DataFrame(self.interventions_data),
-            'sites': pd.DataFrame(self.sites_data),
+            'sponsors': pd.DataFrame(self.sponsors.drain()),
+            'conditions': pd.DataFrame(self.conditions.drain()),
+            'interventions': pd.DataFrame(self.interventions.drain()),
+            'sites': pd.DataFrame(self.sites.drain()),
             'study_sponsors': pd.DataFrame(self.study_sponsors_data),
             'study_conditions': pd.DataFrame(self.study_conditions_data),
             'study_interventions': pd.DataFrame(self.study_interventions_data),
             'study_sites': pd.DataFrame(self.study_sites_data),
         }
+        self.reset_rows()
+        self.assign_keys(dataframes)
+        dataframes['study_texts'] = self.split_texts(dataframes['studies'])
+        self.encode_categories(dataframes)
 
+        # one timestamp per batch rather than one per row
+        etl_created_at = datetime.now().isoformat()
         for name, df in dataframes.items():
             if not df.empty:
+                df['etl_created_at'] = etl_created_at
                 key_cols = [col for col in df.columns if col.endswith('_key')]
                 if key_cols:
                     original_len = len(df)
@@ -398,6 +530,9 @@ class Transformer:
                     if len(dataframes[name]) < original_len:
                         progress_logger.info(f"  {name}: Removed {original_len - len(dataframes[name])} duplicates")
 
+        for registry in (self.sponsors, self.conditions, self.interventions, self.sites):
+            progress_logger.info(f"  {registry.entity} registry: {registry.stats()}")
+
         progress_logger.info(f"\nDataFrames created {dataframes}")
 
         return dataframes
@@ -0,0 +1,139 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+from typing import Dict, List
+
+import pandas as pd
+
+from etl.utils.log_service import progress_logger, error_logger
+
+
+# written last, so an entry without it is incomplete; its mtime is the entry's last use
+MANIFEST = "_tables.json"
+
+
+class TransformCache:
+    """Flattened star tables cached as parquet between transform and load."""
+
+    def __init__(self, cache_dir: str, max_entries: int = 7, max_bytes: int = 2 * 1024 ** 3):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+
+    @staticmethod
+    def key(files: List[str], *options: str) -> str:
+        """sha256 over every input file's bytes and the options that shape the output."""
+        digest = hashlib.sha256()
+        for option in options:
+            digest.update(f"{option}\0".encode())
+        for file in files:
+            digest.update(f"{os.path.basename(file)}\0".encode())
+            with open(file, 'rb') as f:
+                for chunk in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(chunk)
+        return digest.hexdigest()[:32]
+
+
+    def get(self, key: str) -> Dict[str, pd.DataFrame] | None:
+        entry = f"{self.cache_dir}/{key}"
+        manifest = f"{entry}/{MANIFEST}"
+        if not os.path.exists(manifest):
+            return None
+
+        try:
+            with open(manifest) as f:
+                contents = json.load(f)
+            dtypes = contents.get('dtypes', {})
+            dataframes = {
+                name: self.restore_dtypes(pd.read_parquet(f"{entry}/{name}.parquet"), dtypes.get(name, {}))
+                for name in contents['tables']
+            }
+        except Exception as e:
+            error_logger.warning(f"Transform cache entry {key} unreadable, flattening again: {str(e)}")
+            shutil.rmtree(entry, ignore_errors=True)
+            return None
+
+        os.utime(manifest)
+        progress_logger.info(
+            f"Transform cache hit {key}: {', '.join(f'{name} {len(df)}' for name, df in dataframes.items())}"
+        )
+        return dataframes
+
+
+    def put(self, key: str, dataframes: Dict[str, pd.DataFrame]):
+        entry = f"{self.cache_dir}/{key}"
+        temp_entry = f"{self.cache_dir}/.{key}.tmp"
+        shutil.rmtree(temp_entry, ignore_errors=True)
+        os.makedirs(temp_entry)
+
+        try:
+            for name, df in dataframes.items():
+                df.to_parquet(f"{temp_entry}/{name}.parquet", index=False)
+            with open(f"{temp_entry}/{MANIFEST}", 'w') as f:
+                json.dump({
+                    'tables': list(dataframes),
+                    'dtypes': {name: self.describe_dtypes(df) for name, df in dataframes.items()},
+                    'cached_at': time.time(),
+                }, f)
+
+            shutil.rmtree(entry, ignore_errors=True)
+            os.replace(temp_entry, entry)
+
+        except Exception as e:
+            # the cache only saves time, a failed write never fails the run
+            error_logger.warning(f"Could not cache flattened tables under {key}: {str(e)}")
+            shutil.rmtree(temp_entry, ignore_errors=True)
+            return
+
+        progress_logger.info(f"Cached flattened tables under {key}")
+        self.evict()
+
+
+    @staticmethod
+    def describe_dtypes(df: pd.DataFrame) -> Dict[str, Dict]:
+        """Each column's dtype, including categorical categories."""
+        dtypes = {}
+        for column, dtype in df.dtypes.items():
+            if isinstance(dtype, pd.CategoricalDtype):
+                dtypes[column] = {'dtype': 'category', 'categories': list(dtype.categories), 'ordered': dtype.ordered}
+            else:
+                dtypes[column] = {'dtype': str(dtype)}
+        return dtypes
+
+
+    @staticmethod
+    def restore_dtypes(df: pd.DataFrame, dtypes: Dict[str, Dict]) -> pd.DataFrame:
+        """Cast columns read back from parquet to their cached dtypes."""
+        casts = {}
+        for column, spec in dtypes.items():
+            if spec['dtype'] == 'category':
+                dtype = pd.CategoricalDtype(spec['categories'], ordered=spec['ordered'])
+            else:
+                dtype = pd.api.types.pandas_dtype(spec['dtype'])
+            if column in df.columns and df[column].dtype != dtype:
+                casts[column] = dtype
+        return df.astype(casts) if casts else df
+
+
+    def evict(self):
+        """Drop least recently used entries until both limits hold."""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            entry = f"{self.cache_dir}/{name}"
+            manifest = f"{entry}/{MANIFEST}"
+            if name.startswith('.') or not os.path.exists(manifest):
+                continue
+            size = sum(os.path.getsize(f"{entry}/{file}") for file in os.listdir(entry))
+            entries.append((os.path.getmtime(manifest), size, entry))
+
+        entries.sort(reverse=True)
+        total = sum(size for _, size, _ in entries)
+        while entries and (len(entries) > self.max_entries or total > self.max_bytes):
+            _, size, entry = entries.pop()
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+            progress_logger.info(f"Evicted transform cache entry {os.path.basename(entry)}")
@@ -0,0 +1,51 @@
+import io
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+
+
+def to_arrow(data: pd.DataFrame | pa.Table) -> pa.Table:
+    """Normalise loader input to an Arrow table."""
+    if isinstance(data, pa.Table):
+        return data
+    return pa.Table.from_pandas(data, preserve_index=False)
+
+
+class CsvCopyStream:
+    """File object feeding COPY FROM STDIN with CSV, one record batch at a time."""
+
+    write_options = pacsv.WriteOptions(include_header=False)
+
+    def __init__(self, table: pa.Table, batch_rows: int = 50_000):
+        self.batches = iter(table.to_batches(max_chunksize=batch_rows))
+        self.buffer = memoryview(b'')
+        self.position = 0
+
+    def _fill(self) -> bool:
+        batch = next(self.batches, None)
+        if batch is None:
+            return False
+
+        sink = io.BytesIO()
+        pacsv.write_csv(batch, sink, self.write_options)
+        self.buffer = sink.getbuffer()
+        self.position = 0
+        return True
+
+    def read(self, size: int = -1) -> bytes:
+        while self.position >= len(self.buffer):
+            if not self._fill():
+                return b''
+
+        if size is None or size < 0:
+            chunks = [self.buffer[self.position:].tobytes()]
+            self.position = len(self.buffer)
+            while self._fill():
+                chunks.append(self.buffer.tobytes())
+                self.position = len(self.buffer)
+            return b''.join(chunks)
+
+        end = min(self.position + size, len(self.buffer))
+        chunk = self.buffer[self.position:end].tobytes()
+        self.position = end
+        return chunk
@@ -24,4 +24,9 @@ class MissingStateError(CTPException):
 
 class NoProcessToRun(CTPException):
     def __init__(self):
-        self.log = f"No process selected to run. Check your ETL class instantiation"
\ No newline at end of file
+        self.log = f"No process selected to run. Check your ETL class instantiation"
+
+
+class ShardWriteError(CTPException):
+    def __init__(self, path: str, details: str):
+        self.log = f"Could not write shard {path}: {details}"
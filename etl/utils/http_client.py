@@ -0,0 +1,103 @@
+import json
+import random
+import time
+from typing import Callable, Dict, TypeVar
+
+import pyarrow as pa
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import make_headers
+
+from etl.utils.exceptions import FailedRequestError
+from etl.utils.rate_limit import RateLimiterHandler
+from etl.utils.log_service import progress_logger, error_logger
+
+
+T = TypeVar("T")
+
+
+class HttpClient:
+    """Pooled, rate-limited HTTP transport for the API with retry and backoff."""
+
+    retryable_statuses = {429, 500, 502, 503, 504}
+
+    def __init__(self, rate_limit_handler: RateLimiterHandler, timeout: int, max_retries: int,
+                 pool_size: int = 4, backoff_base: float = 1.0, backoff_cap: float = 60.0):
+        self.rate_limit_handler = rate_limit_handler
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+
+        self.session = requests.Session()
+        # retries are handled here so they go through the rate limiter
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update(make_headers(accept_encoding=True, keep_alive=True))
+
+
+    def close(self):
+        self.session.close()
+
+
+    def get_json(self, url: str, page: int) -> Dict:
+        return self.get(url, page, json.loads)
+
+
+    def get(self, url: str, page: int, parse: Callable[[bytes], T]) -> T:
+        """Fetch url and hand the raw (decompressed) body to parse."""
+        for attempt in range(1, self.max_retries + 1):
+            self.rate_limit_handler.wait_if_needed()
+            started = time.perf_counter()
+
+            try:
+                response = self.session.get(url, timeout=self.timeout)
+                downloaded = time.perf_counter()
+
+                if response.status_code == 200:
+                    try:
+                        data = parse(response.content)
+                    except (ValueError, pa.ArrowInvalid) as e:
+                        # a truncated or garbled body is retried like a dropped connection
+                        failure = f"unreadable body ({type(e).__name__}: {str(e)[:200]})"
+                    else:
+                        progress_logger.info(
+                            f"Page {page}: first byte {response.elapsed.total_seconds() * 1000:.0f} ms, "
+                            f"download {(downloaded - started) * 1000:.0f} ms, "
+                            f"parse {(time.perf_counter() - downloaded) * 1000:.0f} ms, "
+                            f"{len(response.content)} bytes ({response.headers.get('Content-Encoding', 'identity')})"
+                        )
+                        return data
+                else:
+                    failure = f"HTTP {response.status_code}"
+                    if response.status_code not in self.retryable_statuses:
+                        raise FailedRequestError(page, f"{failure} from {url}: {response.text[:200]}")
+
+            except requests.RequestException as e:
+                failure = f"{type(e).__name__}: {e}"
+                response = None
+
+            if attempt == self.max_retries:
+                raise FailedRequestError(page, f"gave up after {attempt} attempts, last error {failure}")
+
+            retry_after = response.headers.get("Retry-After") if response is not None else None
+            if response is not None and (response.status_code == 429 or retry_after):
+                delay = RateLimiterHandler.parse_retry_after(retry_after)
+                self.rate_limit_handler.backoff(delay)
+                error_logger.warning(
+                    f"Page {page}: {failure} on attempt {attempt}/{self.max_retries}, "
+                    f"server asked to wait {delay:.0f}s"
+                )
+                continue
+
+            delay = self.backoff_delay(attempt)
+            error_logger.warning(
+                f"Page {page}: {failure} on attempt {attempt}/{self.max_retries}, retrying in {delay:.1f}s"
+            )
+            time.sleep(delay)
+
+
+    def backoff_delay(self, attempt: int) -> float:
+        """Full jitter: uniform over [0, min(cap, base * 2^(attempt-1))]."""
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** (attempt - 1)))
@@ -0,0 +1,60 @@
+import hashlib
+from typing import Sequence
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+
+_HEX_DIGITS = np.frombuffer(b'0123456789abcdef', dtype='S1')
+_NIBBLE_SHIFTS = np.arange(60, -1, -4, dtype=np.uint64)
+
+
+class KeyGenerator:
+    """Surrogate keys for whole columns at once."""
+
+    schemes = ('md5', 'siphash')
+
+    def __init__(self, scheme: str = "md5"):
+        if scheme not in self.schemes:
+            raise ValueError(f"Unknown surrogate key scheme {scheme!r}")
+        self.scheme = scheme
+
+
+    def __call__(self, *columns: Sequence | pa.Array | pa.ChunkedArray) -> np.ndarray:
+        """Keys for each row of the given string columns (pandas, numpy, lists or Arrow)."""
+        joined = self.join(*columns)
+        codes, uniques = pd.factorize(joined.to_numpy(zero_copy_only=False))
+        if not len(uniques):
+            return np.array([], dtype=object)
+        return self.hash_strings(uniques)[codes]
+
+
+    @staticmethod
+    def join(*columns) -> pa.Array:
+        arrays = [
+            column.combine_chunks() if isinstance(column, pa.ChunkedArray) else
+            column if isinstance(column, pa.Array) else
+            pa.array(column, pa.string(), from_pandas=True)
+            for column in columns
+        ]
+        arrays = [array if pa.types.is_string(array.type) else array.cast(pa.string()) for array in arrays]
+        if len(arrays) == 1:
+            return pc.fill_null(arrays[0], '')
+
+        # every non-null part followed by '|', then the final '|' cut off; rows whose
+        # parts are all null come out as '' (null_handling='skip' drops such rows)
+        parts = [pc.if_else(pc.is_null(array), '', pc.binary_join_element_wise(array, '|', '')) for array in arrays]
+        return pc.utf8_slice_codeunits(pc.binary_join_element_wise(*parts, ''), 0, -1)
+
+
+    def hash_strings(self, values: np.ndarray) -> np.ndarray:
+        if self.scheme == "md5":
+            md5 = hashlib.md5
+            return np.array([md5(value.encode()).hexdigest()[:16] for value in values], dtype=object)
+
+        hashes = pd.util.hash_array(np.asarray(values, dtype=object), categorize=False)
+        nibbles = (hashes[:, None] >> _NIBBLE_SHIFTS) & np.uint64(0xF)
+        digits = _HEX_DIGITS[nibbles.astype(np.intp)].view('S16').ravel()
+        return digits.astype(str).astype(object)
@@ -0,0 +1,67 @@
+from typing import Dict, List
+
+import pyarrow as pa
+
+from etl.study_spec import STUDY_SPEC
+
+
+def _struct(**fields) -> pa.DataType:
+    return pa.struct([pa.field(name, data_type) for name, data_type in fields.items()])
+
+
+_string = pa.string()
+
+# protocolSection leaves the API does not send as strings; every other leaf is a string
+LEAF_TYPES: Dict[str, pa.DataType] = {
+    'statusModule.expandedAccessInfo.hasExpandedAccess': pa.bool_(),
+    'designModule.enrollmentInfo.count': pa.int64(),
+    'designModule.patientRegistry': pa.bool_(),
+    'eligibilityModule.healthyVolunteers': pa.bool_(),
+    'oversightModule.oversightHasDmc': pa.bool_(),
+    'oversightModule.isFdaRegulatedDrug': pa.bool_(),
+    'oversightModule.isFdaRegulatedDevice': pa.bool_(),
+    'contactsLocationsModule.locations.geoPoint': _struct(lat=pa.float64(), lon=pa.float64()),
+}
+
+# protocolSection paths that hold JSON arrays
+LIST_PATHS = {
+    'sponsorCollaboratorsModule.collaborators',
+    'conditionsModule.conditions',
+    'armsInterventionsModule.interventions',
+    'contactsLocationsModule.locations',
+}
+
+
+def pinned_struct(paths: List[str], prefix: str = '') -> pa.DataType:
+    """Struct type holding exactly the given dotted paths, typed by LEAF_TYPES and LIST_PATHS."""
+    children: Dict[str, List[str]] = {}
+    for path in paths:
+        head, _, rest = path.partition('.')
+        children.setdefault(head, [])
+        if rest:
+            children[head].append(rest)
+
+    fields = []
+    for name, rest in children.items():
+        path = f"{prefix}{name}"
+        data_type = pinned_struct(rest, f"{path}.") if rest else LEAF_TYPES.get(path, _string)
+        fields.append(pa.field(name, pa.list_(data_type) if path in LIST_PATHS else data_type))
+    return pa.struct(fields)
+
+
+# the parts of protocolSection the Transformer reads; anything else in the page is dropped
+PROTOCOL_SECTION = pinned_struct(STUDY_SPEC.paths)
+
+STUDY = _struct(protocolSection=PROTOCOL_SECTION)
+
+# one API response: {"studies": [...], "nextPageToken": "..."}
+PAGE_SCHEMA = pa.schema([
+    pa.field('studies', pa.list_(STUDY)),
+    pa.field('nextPageToken', _string),
+])
+
+# one row per study, laid out like pd.DataFrame(page) so existing readers are unaffected
+SHARD_SCHEMA = pa.schema([
+    pa.field('studies', STUDY),
+    pa.field('nextPageToken', _string),
+])
@@ -1,19 +1,110 @@
+import fcntl
+import json
+import os
+import threading
 import time
+from collections import deque
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+
 
 class RateLimiterHandler:
-    def __init__(self, max_requests=50, window_seconds=60):
+    """Sliding-window limiter: at most max_requests in any window_seconds."""
+
+    def __init__(self, max_requests=50, window_seconds=60, state_file: str = None, margin_seconds=0.5):
         self.max_requests = max_requests
-        self.window = window_seconds
-        self.requests = []
+        # a little slack so network jitter can't squeeze max_requests + 1 into the server's window
+        self.window = window_seconds + margin_seconds
+        self.state_file = state_file
+
+        self.slots = deque()
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+
+        self.requests = 0
+        self.waits = 0
+        self.seconds_waited = 0.0
+        self.backoffs = 0
+
+
+    def reserve(self) -> float:
+        """Claim the next free slot and return how long to sleep before using it."""
+        with self._shared_state():
+            now = time.time()
+            while self.slots and self.slots[0] <= now - self.window:
+                self.slots.popleft()
+
+            slot = max(now, self.blocked_until, self.slots[-1] if self.slots else now)
+            if len(self.slots) >= self.max_requests:
+                slot = max(slot, self.slots[-self.max_requests] + self.window)
+
+            self.slots.append(slot)
+
+            delay = slot - now
+            self.requests += 1
+            if delay > 0:
+                self.waits += 1
+                self.seconds_waited += delay
+        return delay
+
 
     def wait_if_needed(self):
-        now = time.time()
-        self.requests = [req_time for req_time in self.requests
-                         if now - req_time < self.window]
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+
+    def backoff(self, seconds: float):
+        """Hold every caller back for the given number of seconds (e.g. Retry-After)."""
+        with self._shared_state():
+            self.blocked_until = max(self.blocked_until, time.time() + seconds)
+            self.backoffs += 1
+
+
+    def stats(self) -> dict:
+        return {
+            'requests': self.requests,
+            'waits': self.waits,
+            'seconds_waited': round(self.seconds_waited, 2),
+            'backoffs': self.backoffs,
+        }
+
+
+    @staticmethod
+    def parse_retry_after(value: str | None, default: float = 60.0) -> float:
+        """Retry-After is either delta-seconds or an HTTP date."""
+        if not value:
+            return default
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return default
+
+
+    @contextmanager
+    def _shared_state(self):
+        """Serialise access within the process, and across processes when a state file is set."""
+        with self.lock:
+            if not self.state_file:
+                yield
+                return
+
+            os.makedirs(os.path.dirname(self.state_file) or '.', exist_ok=True)
+            with open(self.state_file, 'a+') as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                f.seek(0)
+                raw = f.read()
+                state = json.loads(raw) if raw.strip() else {}
+                self.slots = deque(state.get('slots', []))
+                self.blocked_until = state.get('blocked_until', 0.0)
 
-        if len(self.requests) >= self.max_requests:
-            sleep_time = self.window - (now - self.requests[0])
-            time.sleep(sleep_time)
-            self.requests = []
+                yield
 
-        self.requests.append(time.time())
+                f.seek(0)
+                f.truncate()
+                json.dump({'slots': list(self.slots), 'blocked_until': self.blocked_until}, f)
+                f.flush()
@@ -0,0 +1,54 @@
+from typing import Callable, Dict, Hashable, List
+
+
+class EntityRegistry:
+    """Insert-once store for dimension rows keyed by their surrogate key."""
+
+    def __init__(self, entity: str):
+        self.entity = entity
+        self._seen = set()
+        self._rows: Dict[Hashable, Dict] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._seen)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._seen
+
+    def add(self, key: Hashable, build_row: Callable[[], Dict]) -> bool:
+        """Register an entity once; returns True if it was new."""
+        if key in self._seen:
+            self.hits += 1
+            return False
+
+        self.misses += 1
+        self._seen.add(key)
+        self._rows[key] = build_row()
+        return True
+
+    def merge(self, key_field: str, rows: List[Dict], hits: int = 0):
+        """Fold rows de-duplicated elsewhere into this registry, in order."""
+        self.hits += hits
+        for row in rows:
+            self.add(row[key_field], lambda: row)
+
+    def rows(self) -> List[Dict]:
+        """Rows registered since the last drain, in insertion order."""
+        return list(self._rows.values())
+
+    def drain(self) -> List[Dict]:
+        """Return pending rows and release them, keeping their keys."""
+        rows = self.rows()
+        self._rows = {}
+        return rows
+
+    def stats(self) -> Dict[str, int | float]:
+        lookups = self.hits + self.misses
+        return {
+            'unique': len(self._seen),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+        }
@@ -0,0 +1,73 @@
+import os
+import queue
+import threading
+import time
+from typing import Any, Callable
+
+from etl.utils.exceptions import ShardWriteError
+from etl.utils.log_service import progress_logger, error_logger
+
+
+class ShardWriter:
+    """Writes shards on a background thread through a bounded queue."""
+
+    def __init__(self, write: Callable[[Any, str], None], max_pending: int = 8):
+        self.write = write
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.error: ShardWriteError | None = None
+
+        self.written = 0
+        self.seconds_blocked = 0.0
+
+        self.thread = threading.Thread(target=self._run, name="shard-writer", daemon=True)
+        self.thread.start()
+
+
+    def submit(self, payload: Any, path: str, on_durable: Callable[[], None] | None = None):
+        self.raise_if_failed()
+
+        started = time.perf_counter()
+        self.queue.put((payload, path, on_durable))
+        blocked = time.perf_counter() - started
+        if blocked > 0.01:
+            self.seconds_blocked += blocked
+            progress_logger.info(f"Shard writer behind, fetching paused {blocked:.2f}s")
+
+
+    def close(self):
+        """Wait for every queued shard to be written, then stop the thread."""
+        if self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join()
+        progress_logger.info(
+            f"Shard writer finished: {self.written} shards written, "
+            f"fetching paused {self.seconds_blocked:.1f}s waiting on disk"
+        )
+        self.raise_if_failed()
+
+
+    def raise_if_failed(self):
+        if self.error:
+            raise self.error
+
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+
+            payload, path, on_durable = item
+            if self.error:
+                continue
+
+            try:
+                self.write(payload, f"{path}.tmp")
+                os.replace(f"{path}.tmp", path)
+                self.written += 1
+                if on_durable:
+                    on_durable()
+
+            except Exception as e:
+                self.error = ShardWriteError(path, str(e))
+                error_logger.error(self.error.log)
@@ -0,0 +1,57 @@
+from typing import Any, Dict, Iterable, List
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+
+class Vocabulary:
+    """Shared, append-only categories for low-cardinality columns."""
+
+    def __init__(self):
+        self.categories: Dict[str, List[str]] = {}
+        self._codes: Dict[str, Dict[str, int]] = {}
+        self._interned: Dict[str, str] = {}
+
+
+    def intern(self, value: Any) -> Any:
+        if value.__class__ is not str:
+            return value
+        return self._interned.setdefault(value, value)
+
+
+    def add(self, column: str, values: Iterable) -> List[int]:
+        """Codes of values in column's categories, adding the ones not seen before."""
+        codes = self._codes.setdefault(column, {})
+        categories = self.categories.setdefault(column, [])
+        result = []
+        for value in values:
+            code = codes.get(value)
+            if code is None:
+                code = codes[value] = len(categories)
+                categories.append(value)
+            result.append(code)
+        return result
+
+
+    def categorical(self, column: str, values: pd.Series) -> pd.Categorical:
+        local_codes, uniques = pd.factorize(values)
+        codes = np.full(len(local_codes), -1, dtype=np.int64)
+        if len(uniques):
+            mapping = np.array(self.add(column, uniques), dtype=np.int64)
+            valid = local_codes >= 0
+            codes[valid] = mapping[local_codes[valid]]
+        return pd.Categorical.from_codes(codes, categories=list(self.categories.get(column, [])))
+
+
+    def dictionary(self, column: str, values: pa.Array | pa.ChunkedArray) -> pa.DictionaryArray:
+        """Dictionary array over the shared categories."""
+        if isinstance(values, pa.ChunkedArray):
+            values = values.combine_chunks()
+        if not pa.types.is_dictionary(values.type):
+            values = pc.dictionary_encode(values if pa.types.is_string(values.type) else values.cast(pa.string()))
+
+        mapping = pa.array(self.add(column, values.dictionary.to_pylist()), pa.int32())
+        indices = pc.take(mapping, values.indices)
+        return pa.DictionaryArray.from_arrays(indices, pa.array(self.categories.get(column, []), pa.string()))
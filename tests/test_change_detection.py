@@ -0,0 +1,79 @@
+import copy
+
+from etl.change_detection import ChangeDetector
+from etl.study_spec import STUDY_SPEC
+from etl.transform import Transformer
+
+
+def classify(detector, protocols):
+    return {
+        protocol['identificationModule']['nctId']: detector.has_changed(protocol)
+        for protocol in protocols
+    }
+
+
+def updated(protocol, date=None, title=None):
+    protocol = copy.deepcopy(protocol)
+    if date:
+        protocol['statusModule']['lastUpdatePostDateStruct']['date'] = date
+    if title:
+        protocol['identificationModule']['briefTitle'] = title
+    return protocol
+
+
+def test_studies_are_classified_against_the_committed_index(tmp_path, studies):
+    index = str(tmp_path / 'study_index.db')
+    protocols = studies(1, 3)
+
+    first = ChangeDetector(index)
+    assert all(classify(first, protocols).values())
+    assert first.commit() == {'new': 3, 'changed': 0, 'unchanged': 0, 'disappeared': 0}
+
+    second = ChangeDetector(index)
+    batch = [protocols[0], updated(protocols[1], date='2025-01-01', title='Retitled'), studies(4, 4)[0]]
+    assert classify(second, batch) == {'NCT00000001': False, 'NCT00000002': True, 'NCT00000004': True}
+    assert second.commit() == {'new': 1, 'changed': 1, 'unchanged': 1, 'disappeared': 1}
+
+    # the committed index holds the new date and has dropped the study that disappeared
+    third = ChangeDetector(index)
+    assert classify(third, [batch[1]]) == {'NCT00000002': False}
+    assert sorted(third.disappeared()) == ['NCT00000001', 'NCT00000004']
+
+
+def test_undated_studies_are_compared_by_content(tmp_path, studies):
+    index = str(tmp_path / 'study_index.db')
+    protocol = studies(1, 1)[0]
+    del protocol['statusModule']['lastUpdatePostDateStruct']
+
+    first = ChangeDetector(index)
+    classify(first, [protocol])
+    first.commit()
+
+    second = ChangeDetector(index)
+    assert classify(second, [protocol, studies(2, 2)[0]]) == {'NCT00000001': False, 'NCT00000002': True}
+    assert classify(ChangeDetector(index), [updated(protocol, title='Retitled')]) == {'NCT00000001': True}
+
+
+def test_uncommitted_run_is_classified_again(tmp_path, studies):
+    index = str(tmp_path / 'study_index.db')
+    protocols = studies(1, 3)
+
+    failed = ChangeDetector(index)
+    assert all(classify(failed, protocols).values())
+
+    rerun = ChangeDetector(index)
+    assert all(classify(rerun, protocols).values())
+
+
+def test_transformer_flattens_only_changed_studies(tmp_path, compacted_studies):
+    compact_dir = compacted_studies(1, 20)
+    columns = STUDY_SPEC.leaf_columns('studies.protocolSection')
+    index = str(tmp_path / 'study_index.db')
+
+    detector = ChangeDetector(index)
+    assert len(Transformer(compact_dir, detector).read_selective_parquet_columns(compact_dir, columns)['studies']) == 20
+    detector.commit()
+
+    compact_dir = compacted_studies(1, 22)
+    studies = Transformer(compact_dir, ChangeDetector(index)).read_selective_parquet_columns(compact_dir, columns)['studies']
+    assert studies['nct_id'].tolist() == ['NCT00000021', 'NCT00000022']
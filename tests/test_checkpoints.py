@@ -0,0 +1,54 @@
+import os
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from config import config
+
+
+def write_legacy_state(states_dir, shard_dir, token="tok2"):
+    """The generated modules the old extractor left behind, plus two shards."""
+    os.makedirs(states_dir, exist_ok=True)
+    os.makedirs(shard_dir, exist_ok=True)
+    with open(f"{states_dir}/last_extraction_result.py", "w") as f:
+        f.write('result = "FAILURE"')
+    with open(f"{states_dir}/last_shard_path.py", "w") as f:
+        f.write(f'shard_path = "{shard_dir}"')
+    with open(f"{states_dir}/last_token.py", "w") as f:
+        f.write(f'last_saved_token = "{token}"')
+    for page in (1, 2):
+        pq.write_table(pa.table({'nct_id': [f'NCT{page:08d}']}), f"{shard_dir}/{page}.parquet")
+
+
+def test_legacy_state_in_mounted_volume_is_resumed(tmp_path, monkeypatch):
+    """Docker mounts the old states volume at STATE_MGT_DIR, so the modules are there and
+    etl/states (relative to the working directory) is empty."""
+    from etl.main import ETL
+
+    states_dir = tmp_path / "states"
+    shard_dir = tmp_path / "shards" / "2025-10-08"
+    write_legacy_state(str(states_dir), str(shard_dir))
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(config, "STATE_MGT_DIR", str(states_dir))
+    monkeypatch.setattr(config, "SHARD_STORAGE_DIR", str(tmp_path / "shards"))
+    monkeypatch.setattr(config, "COMPACTED_STORAGE_DIR", str(tmp_path / "compacted"))
+
+    etl = ETL(run_extraction=True, run_transformation_and_load=False)
+    etl.open_run()
+
+    assert etl.run["run_id"] == "legacy-2025-10-08"
+    assert etl.shard_dir == str(shard_dir)
+    resume = etl.checkpoints.resume_point(etl.run["run_id"], "registry")
+    assert (resume["page"], resume["token"]) == (2, "tok2")
+    assert os.path.exists(states_dir / "last_token.py.migrated")
+
+
+def test_legacy_state_in_checkout_is_resumed(tmp_path):
+    from etl.checkpoints import CheckpointStore
+
+    shard_dir = tmp_path / "shards" / "2025-10-08"
+    write_legacy_state(str(tmp_path / "etl" / "states"), str(shard_dir))
+    store = CheckpointStore(str(tmp_path / "states" / "checkpoints.db"))
+    store.import_legacy_state([str(tmp_path / "states"), str(tmp_path / "etl" / "states")])
+
+    assert store.open_run(str(tmp_path / "shards" / "today"))["run_id"] == "legacy-2025-10-08"
@@ -0,0 +1,52 @@
+import random
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from etl.compaction import Compactor
+
+
+def write_shards(directory, pages=12, per_page=40):
+    """Shards of studies with shuffled nct_ids, some repeated and some missing."""
+    rng = random.Random(7)
+    ids = [f"NCT{rng.randrange(10 ** 8):08d}" for _ in range(pages * per_page)]
+    ids[5] = ids[300]
+    ids[17] = None
+    shards = []
+    for page in range(pages):
+        page_ids = ids[page * per_page:(page + 1) * per_page]
+        studies = pa.array([
+            {'protocolSection': {'identificationModule': {'nctId': nct_id}}, 'page': page} for nct_id in page_ids
+        ])
+        path = f"{directory}/{page + 1}.parquet"
+        pq.write_table(pa.table({'studies': studies}), path)
+        shards.append((path, len(page_ids)))
+    return shards, ids
+
+
+def compacted_ids(path):
+    table = pq.read_table(path)
+    return Compactor.nct_ids(table).to_pylist(), pq.ParquetFile(path).metadata
+
+
+def test_external_sort_matches_in_memory_sort(tmp_path):
+    shards, ids = write_shards(tmp_path)
+    expected = sorted(ids, key=lambda nct_id: nct_id or "")
+
+    in_memory = Compactor(row_group_size=50, workers=2, sort_run_rows=10 ** 6)
+    assert in_memory.compact(shards, str(tmp_path / "memory.parquet")) == len(ids)
+    external = Compactor(row_group_size=50, workers=2, sort_run_rows=70)
+    assert external.compact(shards, str(tmp_path / "external.parquet")) == len(ids)
+
+    memory_ids, _ = compacted_ids(tmp_path / "memory.parquet")
+    external_ids, metadata = compacted_ids(tmp_path / "external.parquet")
+    assert memory_ids == expected
+    assert external_ids == expected
+    assert [metadata.row_group(i).num_rows for i in range(metadata.num_row_groups)] == [50] * 9 + [30]
+    assert not list(tmp_path.glob("*.run*"))
+
+
+def test_unclustered_keeps_page_order(tmp_path):
+    shards, ids = write_shards(tmp_path)
+    Compactor(cluster=False).compact(shards, str(tmp_path / "out.parquet"))
+    assert compacted_ids(tmp_path / "out.parquet")[0] == ids
@@ -0,0 +1,120 @@
+import os
+import threading
+
+import pandas as pd
+import pytest
+
+from config import config
+
+pytestmark = pytest.mark.skipif(not os.environ.get('TEST_DATABASE_URL'), reason='needs TEST_DATABASE_URL')
+
+
+def frames(first: int, last: int):
+    numbers = range(first, last + 1)
+    return {
+        'studies': pd.DataFrame({
+            'study_key': [f'study{n}' for n in numbers], 'nct_id': [f'NCT{n:08d}' for n in numbers],
+            'etl_created_at': ['2025-10-08T00:00:00'] * len(numbers),
+        }),
+        'sponsors': pd.DataFrame({
+            'sponsor_key': [f'sponsor{n % 3}' for n in numbers][:3], 'name': [f'Sponsor {n % 3}' for n in numbers][:3],
+            'etl_created_at': ['2025-10-08T00:00:00'] * min(3, len(numbers)),
+        }),
+        'study_sponsors': pd.DataFrame({
+            'study_sponsor_key': [f'link{n}' for n in numbers], 'study_key': [f'study{n}' for n in numbers],
+            'sponsor_key': [f'sponsor{n % 3}' for n in numbers], 'etl_created_at': ['2025-10-08T00:00:00'] * len(numbers),
+        }),
+    }
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    from sqlalchemy import create_engine, text
+
+    monkeypatch.setattr(config, 'DATABASE_URL', os.environ['TEST_DATABASE_URL'])
+    engine = create_engine(os.environ['TEST_DATABASE_URL'])
+    with engine.begin() as conn:
+        conn.execute(text('DROP SCHEMA IF EXISTS staging CASCADE'))
+        conn.execute(text('CREATE SCHEMA staging'))
+    yield engine
+    engine.dispose()
+
+
+def counts(engine):
+    from sqlalchemy import inspect, text
+
+    with engine.connect() as conn:
+        tables = inspect(conn).get_table_names(schema='staging')
+        return {
+            table: conn.execute(text(f'SELECT count(*) FROM staging."{table}"')).scalar()
+            for table in sorted(tables)
+        }
+
+
+def test_concurrent_append_commits_every_table(engine):
+    from etl.load import Loader
+
+    loader = Loader('copy', workers=3, load_mode='append')
+    loader.load_to_postgres(frames(1, 20))
+    loader.close()
+    assert counts(engine) == {'sponsors': 3, 'studies': 20, 'study_sponsors': 20}
+
+
+def test_failed_table_rolls_back_the_others(engine):
+    from etl.load import Loader
+
+    loader = Loader('copy', workers=3, load_mode='append')
+    write_table = loader.write_table
+
+    def failing(conn, table_name, data):
+        if table_name == 'study_sponsors':
+            raise RuntimeError('connection lost')
+        return write_table(conn, table_name, data)
+
+    loader.write_table = failing
+    with pytest.raises(RuntimeError):
+        loader.load_to_postgres(frames(1, 20))
+    loader.close()
+    assert counts(engine) == {}
+
+
+def test_overlapping_upserts_keep_their_own_shadows(engine):
+    from etl.load import Loader
+
+    first = Loader('copy', workers=2, load_mode='upsert')
+    first.load_to_postgres(frames(1, 5))
+
+    barrier = threading.Barrier(2)
+    errors = []
+
+    def run(loader, data):
+        copy_table = loader.copy_table
+
+        def copy_after_both_started(conn, table_name, table):
+            copy_table(conn, table_name, table)
+            if table_name.startswith('_shadow_') and table_name.endswith('_studies'):
+                barrier.wait(timeout=10)
+
+        loader.copy_table = copy_after_both_started
+        try:
+            loader.load_to_postgres(data)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            loader.close()
+
+    threads = [
+        threading.Thread(target=run, args=(first, frames(1, 30))),
+        threading.Thread(target=run, args=(Loader('copy', workers=2, load_mode='upsert'), frames(20, 40))),
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    loaded = counts(engine)
+    assert {table: loaded[table] for table in ('sponsors', 'studies', 'study_sponsors')} == {
+        'sponsors': 3, 'studies': 40, 'study_sponsors': 40
+    }
+    assert not [table for table in loaded if table.startswith('_shadow_')]
@@ -0,0 +1,15 @@
+import re
+
+from config import Settings
+
+
+def test_readme_tuning_block_loads(tmp_path):
+    """The Readme's .env example, tuning block included, is a valid settings file."""
+    readme = open('Readme.md').read()
+    example = re.search(r'```env\n(.*?)```', readme, re.S).group(1)
+    env_file = tmp_path / '.env'
+    env_file.write_text(example)
+
+    settings = Settings(_env_file=str(env_file))
+    assert settings.EXTRACTION_MAX_PAGES is None
+    assert settings.EXTRACTION_MODE == 'full'
@@ -0,0 +1,36 @@
+import pandas as pd
+
+from etl.arrow_transform import ArrowTransformer
+from etl.parallel_transform import ParallelTransformer
+from etl.study_spec import STUDY_SPEC
+from etl.transform import Transformer
+
+COLUMNS = STUDY_SPEC.leaf_columns('studies.protocolSection')
+
+
+def comparable(frames):
+    return {name: df.drop(columns=['etl_created_at'], errors='ignore').reset_index(drop=True) for name, df in frames.items()}
+
+
+def python_frames(compact_dir):
+    return comparable(Transformer(compact_dir).read_selective_parquet_columns(compact_dir, COLUMNS))
+
+
+def assert_same_frames(expected, actual):
+    assert sorted(actual) == sorted(expected)
+    for name in expected:
+        pd.testing.assert_frame_equal(actual[name], expected[name], obj=name)
+
+
+def test_parallel_engine_matches_single_process(compacted_studies):
+    compact_dir = compacted_studies(1, 60, row_group_size=7)
+    parallel = ParallelTransformer(Transformer(compact_dir), workers=3, tasks_per_worker=2)
+
+    assert_same_frames(python_frames(compact_dir), comparable(parallel.read_selective_parquet_columns(compact_dir, COLUMNS)))
+
+
+def test_arrow_engine_matches_python(compacted_studies):
+    compact_dir = compacted_studies(1, 60, row_group_size=7)
+    arrow = ArrowTransformer(compact_dir).read_selective_parquet_columns(compact_dir, COLUMNS)
+
+    assert_same_frames(python_frames(compact_dir), comparable(arrow))
@@ -0,0 +1,81 @@
+import json
+from datetime import timedelta
+
+import pytest
+
+from etl.utils.exceptions import FailedRequestError
+from etl.utils.http_client import HttpClient
+
+
+class FakeLimiter:
+    def wait_if_needed(self):
+        pass
+
+
+    def backoff(self, delay):
+        pass
+
+
+class FakeResponse:
+    def __init__(self, content: bytes, status_code: int = 200):
+        self.content = content
+        self.status_code = status_code
+        self.text = content.decode(errors='replace')
+        self.headers = {}
+        self.elapsed = timedelta(milliseconds=5)
+
+
+class FakeSession:
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.calls = 0
+
+
+    def get(self, url, timeout):
+        self.calls += 1
+        return self.responses.pop(0)
+
+
+def client(*responses, max_retries=3) -> HttpClient:
+    http = HttpClient(FakeLimiter(), timeout=1, max_retries=max_retries, backoff_base=0)
+    http.session = FakeSession(*responses)
+    return http
+
+
+def test_garbled_body_is_retried():
+    http = client(FakeResponse(b'{"studies": [tru'), FakeResponse(b'{"studies": []}'))
+    assert http.get_json('http://api/badjson', page=1) == {"studies": []}
+    assert http.session.calls == 2
+
+
+def test_garbled_body_fails_after_last_attempt():
+    http = client(*[FakeResponse(b'{"studies": [') for _ in range(3)])
+    with pytest.raises(FailedRequestError) as error:
+        http.get_json('http://api/badjson', page=4)
+    assert http.session.calls == 3
+    assert 'unreadable body' in error.value.log
+
+
+def test_arrow_parse_errors_are_retried():
+    import pyarrow as pa
+
+    def parse(body: bytes):
+        if body == b'bad':
+            raise pa.ArrowInvalid('JSON parse error')
+        return json.loads(body)
+
+    http = client(FakeResponse(b'bad'), FakeResponse(b'[1]'))
+    assert http.get('http://api/studies', page=1, parse=parse) == [1]
+
+
+def test_non_retryable_status_fails_at_once():
+    http = client(FakeResponse(b'not found', status_code=404))
+    with pytest.raises(FailedRequestError):
+        http.get_json('http://api/studies', page=1)
+    assert http.session.calls == 1
+
+
+def test_session_negotiates_brotli():
+    pytest.importorskip('brotli')
+    encodings = HttpClient(FakeLimiter(), timeout=1, max_retries=1).session.headers['Accept-Encoding']
+    assert encodings.split(',') == ['gzip', 'deflate', 'br']
@@ -0,0 +1,86 @@
+import json
+import os
+
+import pyarrow.parquet as pq
+import pytest
+
+from config import config
+from etl.checkpoints import CheckpointStore
+from etl.compaction import Compactor, IncrementalCompactor
+from etl.extract import Extractor
+from etl.utils.page_schema import SHARD_SCHEMA
+
+
+@pytest.fixture
+def run(tmp_path, monkeypatch, studies):
+    """A run with five arrow shards of six studies each, not yet recorded."""
+    monkeypatch.setattr(config, 'PAGE_INGESTION', 'arrow')
+    checkpoints = CheckpointStore(str(tmp_path / 'checkpoints.db'))
+    run_id = checkpoints.open_run(str(tmp_path / 'shards'))['run_id']
+    os.makedirs(tmp_path / 'shards')
+
+    pages = []
+    for page in range(1, 6):
+        body = json.dumps({
+            'studies': [{'protocolSection': protocol} for protocol in studies(6 * page - 5, 6 * page)],
+            'nextPageToken': f'tok{page}' if page < 5 else None,
+        }).encode()
+        shard, token = Extractor.read_page(body)
+        shard_file = str(tmp_path / 'shards' / f'{page}.parquet')
+        Extractor.write_shard(shard, shard_file)
+        pages.append((page, shard_file, token))
+    return checkpoints, run_id, pages
+
+
+def compactor(tmp_path, checkpoints, run_id):
+    return IncrementalCompactor(
+        str(tmp_path / 'dataset'), run_id, checkpoints, SHARD_SCHEMA, row_group_size=6, row_groups_per_file=2
+    )
+
+
+def save(checkpoints, run_id, page, shard_file, token):
+    checkpoints.record_page(run_id, 'registry', page, token, shard_file)
+
+
+def fold(incremental, checkpoints, run_id, page, shard_file, token):
+    """Record a shard then fold it, as the shard writer thread does."""
+    save(checkpoints, run_id, page, shard_file, token)
+    incremental.add('registry', page, shard_file, token is None)
+
+
+def dataset_ids(compactor):
+    files = compactor.dataset_files()
+    assert not [path for path in files if path.endswith('.inprogress')]
+    return sorted(nct_id for path in files for nct_id in Compactor.nct_ids(pq.read_table(path)).to_pylist())
+
+
+def test_shards_are_folded_as_they_arrive(tmp_path, run):
+    checkpoints, run_id, pages = run
+    incremental = compactor(tmp_path, checkpoints, run_id)
+    incremental.start()
+    for entry in pages:
+        fold(incremental, checkpoints, run_id, *entry)
+
+    assert incremental.finish() == 30
+    assert len(incremental.dataset_files()) == 3
+    assert dataset_ids(incremental) == [f'NCT{n:08d}' for n in range(1, 31)]
+    assert checkpoints.uncompacted_pages(run_id) == []
+
+
+def test_restart_refolds_only_pages_outside_closed_files(tmp_path, run):
+    checkpoints, run_id, pages = run
+    crashed = compactor(tmp_path, checkpoints, run_id)
+    crashed.start()
+    for entry in pages[:3]:
+        fold(crashed, checkpoints, run_id, *entry)
+    # page 4 became durable after the crash stopped folding
+    save(checkpoints, run_id, *pages[3])
+    # pages 1-2 are in a closed file, page 3 only in the hidden file being written
+    assert [entry['page'] for entry in checkpoints.uncompacted_pages(run_id)] == [3, 4]
+
+    restarted = compactor(tmp_path, checkpoints, run_id)
+    restarted.start()
+    fold(restarted, checkpoints, run_id, *pages[4])
+
+    assert restarted.finish() == 30
+    assert dataset_ids(restarted) == [f'NCT{n:08d}' for n in range(1, 31)]
@@ -0,0 +1,34 @@
+import pyarrow as pa
+import pytest
+
+from etl.utils.keys import KeyGenerator
+
+
+def test_md5_keys_match_the_warehouse():
+    """The first 16 hex digits of md5 over the '|'-joined non-null parts, as loaded so far."""
+    keys = KeyGenerator("md5")
+    assert keys(['NCT00000001', 'Sponsor 1']).tolist() == ['11c9f43908e5ecb1', '98090897eedfacaa']
+    assert keys(['DRUG'], ['Aspirin']).tolist() == ['7ba3c77cf91feaf4']
+    assert keys(['Hospital 3', 'abc'], ['Boston', 'Boston'], ['United States', None]).tolist() == [
+        '088c7c594729a093', '6464624a4607e67b'
+    ]
+
+
+def test_all_null_parts_hash_the_empty_string():
+    assert KeyGenerator("md5")([None], [None]).tolist() == ['d41d8cd98f00b204']
+
+
+def test_input_types_give_the_same_keys():
+    keys = KeyGenerator("md5")
+    expected = ['7ba3c77cf91feaf4', '7ba3c77cf91feaf4']
+    assert keys(['DRUG', 'DRUG'], ['Aspirin', 'Aspirin']).tolist() == expected
+    assert keys(pa.array(['DRUG', 'DRUG']), pa.chunked_array([['Aspirin'], ['Aspirin']])).tolist() == expected
+
+
+def test_siphash_keys_are_stable():
+    assert KeyGenerator("siphash")(['NCT00000001', 'Sponsor 1']).tolist() == ['279b3afa3ad2201f', '79b9273a1444afe2']
+
+
+def test_unknown_scheme():
+    with pytest.raises(ValueError):
+        KeyGenerator("sha1")
@@ -0,0 +1,90 @@
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from etl.load import Loader
+
+
+def studies_frame() -> pd.DataFrame:
+    """A studies-like frame as the python engine produces it: nullable booleans are object columns."""
+    return pd.DataFrame({
+        'study_key': ['a1', 'b2', 'c3'],
+        'has_dmc': [True, None, False],
+        'healthy_volunteers': [None, True, None],
+        'overall_status': pd.Categorical(['RECRUITING', None, 'COMPLETED']),
+        'enrollment_count': [10, 20, 30],
+        'maximum_age_years': [65.0, None, 18.0],
+        'why_stopped': [None, None, None],
+    })
+
+
+EXPECTED_TYPES = {
+    'study_key': 'TEXT',
+    'has_dmc': 'BOOLEAN',
+    'healthy_volunteers': 'BOOLEAN',
+    'overall_status': 'TEXT',
+    'enrollment_count': 'BIGINT',
+    'maximum_age_years': 'FLOAT(53)',
+    'why_stopped': 'TEXT',
+}
+
+
+def column_types(data) -> dict:
+    schema = Loader.arrow_schema(data)
+    return {field.name: Loader.sql_type(field.type) for field in schema}
+
+
+def test_pandas_frame_types():
+    assert column_types(studies_frame()) == EXPECTED_TYPES
+
+
+def test_arrow_table_types_match_pandas():
+    table = pa.table({
+        'study_key': pa.array(['a1', 'b2', 'c3']),
+        'has_dmc': pa.array([True, None, False]),
+        'healthy_volunteers': pa.array([None, True, None], pa.bool_()),
+        'overall_status': pa.array(['RECRUITING', None, 'COMPLETED']).dictionary_encode(),
+        'enrollment_count': pa.array([10, 20, 30]),
+        # an integer column with nulls is float64 once in pandas, so to_sql made it FLOAT(53)
+        'maximum_age_years': pa.array([65, None, 18]),
+        'why_stopped': pa.array([None, None, None], pa.string()),
+    })
+    assert column_types(table) == EXPECTED_TYPES
+
+
+def test_create_table_sql():
+    sql = Loader.create_table_sql('studies', Loader.arrow_schema(studies_frame()))
+    assert sql.startswith('CREATE TABLE staging."studies" (')
+    assert '"has_dmc" BOOLEAN' in sql
+    assert '"maximum_age_years" FLOAT(53)' in sql
+
+
+@pytest.mark.skipif(not os.environ.get('TEST_DATABASE_URL'), reason='needs TEST_DATABASE_URL')
+def test_created_column_types_in_postgres():
+    from sqlalchemy import create_engine, text
+
+    engine = create_engine(os.environ['TEST_DATABASE_URL'])
+    try:
+        with engine.begin() as conn:
+            conn.execute(text('CREATE SCHEMA IF NOT EXISTS staging'))
+            conn.execute(text('DROP TABLE IF EXISTS staging."_test_types"'))
+            Loader.ensure_table(conn, '_test_types', studies_frame())
+            types = dict(conn.execute(text(
+                "SELECT column_name, data_type FROM information_schema.columns "
+                "WHERE table_schema = 'staging' AND table_name = '_test_types'"
+            )).all())
+            conn.execute(text('DROP TABLE staging."_test_types"'))
+    finally:
+        engine.dispose()
+
+    assert types == {
+        'study_key': 'text',
+        'has_dmc': 'boolean',
+        'healthy_volunteers': 'boolean',
+        'overall_status': 'text',
+        'enrollment_count': 'bigint',
+        'maximum_age_years': 'double precision',
+        'why_stopped': 'text',
+    }
@@ -0,0 +1,39 @@
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from config import config
+
+
+@pytest.fixture
+def etl(tmp_path, monkeypatch):
+    from etl.main import ETL
+
+    monkeypatch.setattr(config, "STATE_MGT_DIR", str(tmp_path / "states"))
+    monkeypatch.setattr(config, "COMPACTED_STORAGE_DIR", str(tmp_path / "compacted"))
+    etl = ETL(run_extraction=False, run_transformation_and_load=True)
+    etl.compact_dir = str(tmp_path / "compacted" / "2025-10-08")
+    (tmp_path / "compacted" / "2025-10-08").mkdir(parents=True)
+    pq.write_table(pa.table({'nct_id': ['NCT00000001']}), f"{etl.compact_dir}/studies.parquet")
+    return etl
+
+
+def test_same_data_and_settings_resume_the_same_load(etl):
+    assert etl.load_id() == etl.load_id()
+
+
+@pytest.mark.parametrize("setting, value", [
+    ("SURROGATE_KEY_SCHEME", "siphash"),
+    ("LOAD_MODE", "upsert"),
+    ("TRANSFORM_ENGINE", "arrow"),
+])
+def test_changed_setting_starts_a_new_load(etl, monkeypatch, setting, value):
+    before = etl.load_id()
+    monkeypatch.setattr(config, setting, value)
+    assert etl.load_id() != before
+
+
+def test_changed_data_starts_a_new_load(etl):
+    before = etl.load_id()
+    pq.write_table(pa.table({'nct_id': ['NCT00000001', 'NCT00000002']}), f"{etl.compact_dir}/studies.parquet")
+    assert etl.load_id() != before
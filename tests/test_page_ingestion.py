@@ -0,0 +1,50 @@
+import json
+
+import pyarrow as pa
+
+from config import config
+from etl.extract import Extractor
+from etl.study_spec import STUDY_SPEC
+from etl.utils.page_schema import PROTOCOL_SECTION
+
+
+PAGE = json.dumps({
+    'studies': [{
+        'protocolSection': {
+            'identificationModule': {'nctId': 'NCT00000001', 'briefTitle': 'A study'},
+            'designModule': {'enrollmentInfo': {'count': 40}},
+        },
+        'derivedSection': {'miscInfoModule': {'versionHolder': '2024-01-01'}},
+        'hasResults': False,
+    }],
+    'nextPageToken': 'abc',
+}).encode()
+
+
+def leaf_paths(data_type: pa.DataType, prefix: str = ''):
+    if pa.types.is_list(data_type):
+        data_type = data_type.value_type
+    if not pa.types.is_struct(data_type) or prefix.endswith('geoPoint'):
+        return [prefix]
+    return [path for field in data_type for path in leaf_paths(field.type, f"{prefix}{'.' if prefix else ''}{field.name}")]
+
+
+def test_pinned_schema_is_the_study_spec():
+    assert sorted(leaf_paths(PROTOCOL_SECTION)) == sorted(STUDY_SPEC.paths)
+
+
+def test_json_ingestion_keeps_the_full_payload(monkeypatch):
+    monkeypatch.setattr(config, 'PAGE_INGESTION', 'json')
+    data, token = Extractor.read_page(PAGE)
+    assert token == 'abc'
+    assert data['studies'][0]['derivedSection'] == {'miscInfoModule': {'versionHolder': '2024-01-01'}}
+
+
+def test_arrow_ingestion_keeps_only_the_pinned_fields(monkeypatch):
+    monkeypatch.setattr(config, 'PAGE_INGESTION', 'arrow')
+    table, token = Extractor.read_page(PAGE)
+    assert token == 'abc'
+    study = table.column('studies')[0].as_py()
+    assert list(study) == ['protocolSection']
+    assert study['protocolSection']['identificationModule']['nctId'] == 'NCT00000001'
+    assert study['protocolSection']['designModule']['enrollmentInfo']['count'] == 40
@@ -0,0 +1,36 @@
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+from config import config
+from etl.extract import Extractor, updated_since
+from etl.partitioned_extract import QueryPartition
+
+
+@pytest.mark.parametrize('base_url, pages_base_url', [
+    ('https://example.org/api/v2/studies', 'https://example.org/api/v2/studies?pageToken='),
+    ('https://example.org/api/v2/studies?pageSize=100', 'https://example.org/api/v2/studies?pageSize=100&pageToken='),
+])
+def test_partition_urls_with_and_without_a_query(monkeypatch, base_url, pages_base_url):
+    monkeypatch.setattr(config, 'BASE_URL', base_url)
+    monkeypatch.setattr(config, 'PAGES_BASE_URL', pages_base_url)
+    partition = QueryPartition('2020', 'AREA[LastUpdatePostDate]RANGE[2020-01-01,2020-12-31]')
+
+    first, later = urlsplit(partition.url), urlsplit(partition.page_url('tok+en/1'))
+    assert first.path == later.path == '/api/v2/studies'
+    assert parse_qs(first.query)['filter.advanced'] == ['AREA[LastUpdatePostDate]RANGE[2020-01-01,2020-12-31]']
+    assert parse_qs(later.query)['filter.advanced'] == parse_qs(first.query)['filter.advanced']
+    assert 'pageToken' in parse_qs(later.query)
+    if '?' in base_url:
+        assert parse_qs(later.query)['pageSize'] == ['100']
+
+
+def test_delta_filter_on_a_base_url_without_a_query(monkeypatch):
+    monkeypatch.setattr(config, 'BASE_URL', 'https://example.org/api/v2/studies')
+    monkeypatch.setattr(config, 'PAGES_BASE_URL', 'https://example.org/api/v2/studies?pageToken=')
+    extractor = Extractor.__new__(Extractor)
+    extractor.advanced_filter = updated_since('2024-05-01')
+
+    first, later = urlsplit(extractor.page_url()), urlsplit(extractor.page_url('abc'))
+    assert parse_qs(first.query) == {'filter.advanced': ['AREA[LastUpdatePostDate]RANGE[2024-05-01,MAX]']}
+    assert parse_qs(later.query) == {'pageToken': ['abc'], 'filter.advanced': ['AREA[LastUpdatePostDate]RANGE[2024-05-01,MAX]']}
@@ -0,0 +1,28 @@
+import threading
+
+from etl.utils.rate_limit import RateLimiterHandler
+
+
+def test_concurrent_reservations_are_all_counted(tmp_path):
+    limiter = RateLimiterHandler(max_requests=1000, window_seconds=60, state_file=str(tmp_path / 'rate_limit.json'))
+
+    def reserve_many():
+        for _ in range(50):
+            limiter.reserve()
+
+    threads = [threading.Thread(target=reserve_many) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert limiter.stats()['requests'] == 400
+    assert len(limiter.slots) == 400
+
+
+def test_full_window_delays_the_next_request():
+    limiter = RateLimiterHandler(max_requests=2, window_seconds=10, margin_seconds=0)
+    assert limiter.reserve() <= 0
+    assert limiter.reserve() <= 0
+    assert 9 < limiter.reserve() <= 10
+    assert limiter.stats()['waits'] == 1
@@ -0,0 +1,57 @@
+from etl.study_spec import STUDY_SPEC
+from etl.transform import Transformer
+from etl.utils.registry import EntityRegistry
+
+
+def test_each_key_is_registered_once():
+    registry = EntityRegistry('sponsors')
+    built = []
+
+    def row(name):
+        built.append(name)
+        return {'sponsor_key': name.lower(), 'sponsor_name': name}
+
+    assert registry.add('a', lambda: row('A'))
+    assert not registry.add('a', lambda: row('A again'))
+    assert registry.add('b', lambda: row('B'))
+
+    assert built == ['A', 'B']
+    assert [r['sponsor_name'] for r in registry.rows()] == ['A', 'B']
+    assert registry.stats() == {'unique': 2, 'hits': 1, 'misses': 2, 'hit_rate': 0.3333}
+
+
+def test_drained_keys_stay_registered():
+    registry = EntityRegistry('conditions')
+    registry.add('a', lambda: {'condition_key': 'a'})
+    assert registry.drain() == [{'condition_key': 'a'}]
+
+    assert not registry.add('a', lambda: {'condition_key': 'a'})
+    assert registry.drain() == []
+    assert 'a' in registry and len(registry) == 1
+
+
+def test_merge_keeps_the_first_row_per_key():
+    registry = EntityRegistry('sites')
+    registry.add('x', lambda: {'site_key': 'x', 'city': 'first'})
+    registry.merge('site_key', [{'site_key': 'x', 'city': 'second'}, {'site_key': 'y', 'city': 'third'}], hits=4)
+
+    assert registry.rows() == [{'site_key': 'x', 'city': 'first'}, {'site_key': 'y', 'city': 'third'}]
+    assert registry.hits == 5
+
+
+def test_transformer_dimensions_hold_one_row_per_entity(compacted_studies, studies):
+    compact_dir = compacted_studies(1, 30)
+    frames = Transformer(compact_dir).read_selective_parquet_columns(
+        compact_dir, STUDY_SPEC.leaf_columns('studies.protocolSection')
+    )
+
+    sponsors = frames['sponsors']
+    assert sponsors['sponsor_key'].is_unique
+    names = {
+        sponsor['name']
+        for protocol in studies(1, 30)
+        for module in [protocol['sponsorCollaboratorsModule']]
+        for sponsor in [module['leadSponsor'], *module.get('collaborators', [])]
+    }
+    assert set(sponsors['sponsor_name']) == names
+    assert len(frames['study_sponsors']) == sum(1 + bool(n % 3) for n in range(1, 31))
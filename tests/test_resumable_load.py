@@ -0,0 +1,61 @@
+import os
+
+import pytest
+
+from config import config
+
+pytestmark = pytest.mark.skipif(not os.environ.get('TEST_DATABASE_URL'), reason='needs TEST_DATABASE_URL')
+
+
+@pytest.fixture
+def loader(monkeypatch):
+    from sqlalchemy import text
+    from etl.load import Loader
+
+    monkeypatch.setattr(config, 'DATABASE_URL', os.environ['TEST_DATABASE_URL'])
+    loader = Loader('copy', workers=1, load_mode='append')
+    with loader.engine.begin() as conn:
+        conn.execute(text('DROP SCHEMA IF EXISTS staging CASCADE'))
+        conn.execute(text('CREATE SCHEMA staging'))
+    yield loader
+    loader.close()
+
+
+def start_load(conn, loader, load_id: str, started_hours_ago: int, chunk_hours_ago: int | None = None):
+    from sqlalchemy import text
+
+    loader.open_load(conn, load_id, {'studies': 3})
+    conn.execute(text(f'CREATE TABLE staging."_load_{load_id}_studies" (study_key TEXT)'))
+    conn.execute(
+        text("UPDATE staging._load_runs SET started_at = now() - make_interval(hours => :hours) WHERE load_id = :id"),
+        {"id": load_id, "hours": started_hours_ago}
+    )
+    if chunk_hours_ago is not None:
+        conn.execute(
+            text(
+                "INSERT INTO staging._load_chunks (load_id, table_name, chunk, rows, committed_at) "
+                "VALUES (:id, 'studies', 0, 3, now() - make_interval(hours => :hours))"
+            ),
+            {"id": load_id, "hours": chunk_hours_ago}
+        )
+
+
+def test_new_load_drops_abandoned_loads(loader):
+    from sqlalchemy import inspect, text
+
+    with loader.engine.begin() as conn:
+        start_load(conn, loader, 'abandoned', started_hours_ago=72, chunk_hours_ago=48)
+        start_load(conn, loader, 'recent', started_hours_ago=1)
+        start_load(conn, loader, 'slow', started_hours_ago=72, chunk_hours_ago=1)
+
+    with loader.engine.begin() as conn:
+        assert loader.open_load(conn, 'current', {'studies': 3}) == {}
+
+    with loader.engine.connect() as conn:
+        loads = conn.execute(text('SELECT load_id FROM staging._load_runs ORDER BY load_id')).scalars().all()
+        chunks = conn.execute(text('SELECT DISTINCT load_id FROM staging._load_chunks')).scalars().all()
+        tables = set(inspect(conn).get_table_names(schema='staging'))
+    assert loads == ['current', 'recent', 'slow']
+    assert chunks == ['slow']
+    assert '_load_abandoned_studies' not in tables
+    assert {'_load_recent_studies', '_load_slow_studies'} <= tables
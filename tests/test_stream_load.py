@@ -0,0 +1,76 @@
+import os
+
+import pytest
+
+from config import config
+
+pytestmark = pytest.mark.skipif(not os.environ.get('TEST_DATABASE_URL'), reason='needs TEST_DATABASE_URL')
+
+
+@pytest.fixture
+def stream_etl(tmp_path, monkeypatch, compacted_studies):
+    from sqlalchemy import create_engine, text
+
+    for name, value in {
+        'DATABASE_URL': os.environ['TEST_DATABASE_URL'], 'STATE_MGT_DIR': str(tmp_path / 'states'),
+        'TRANSFORM_MODE': 'stream', 'LOAD_RESUMABLE': True, 'LOAD_MODE': 'append', 'TRANSFORM_BATCH_SIZE': 10,
+    }.items():
+        monkeypatch.setattr(config, name, value)
+    engine = create_engine(os.environ['TEST_DATABASE_URL'])
+    with engine.begin() as conn:
+        conn.execute(text('DROP SCHEMA IF EXISTS staging CASCADE'))
+        conn.execute(text('CREATE SCHEMA staging'))
+    compact_dir = compacted_studies(1, 30)
+
+    def build(fail_on_batch: int | None = None):
+        from etl.main import ETL
+
+        etl = ETL(run_extraction=False, run_transformation_and_load=True)
+        etl.compact_dir = compact_dir
+        load_resumable, calls = etl.loader.load_resumable, []
+
+        def flaky(dataframes, load_id):
+            calls.append(load_id)
+            if len(calls) == fail_on_batch:
+                raise RuntimeError('connection lost')
+            return load_resumable(dataframes, load_id)
+
+        etl.loader.load_resumable = flaky
+        return etl
+
+    def loaded():
+        with engine.connect() as conn:
+            return conn.execute(text('SELECT nct_id FROM staging.studies ORDER BY nct_id')).scalars().all()
+
+    yield build, loaded
+    engine.dispose()
+
+
+def test_rerun_with_another_batch_size_loads_every_study_once(stream_etl, monkeypatch):
+    build, loaded = stream_etl
+    expected = [f'NCT{n:08d}' for n in range(1, 31)]
+
+    with pytest.raises(RuntimeError):
+        build(fail_on_batch=2).stream_transform_and_load()
+    assert loaded() == expected[:10]
+
+    # the published first batch held studies 1-10; batches of 7 would append some of them again
+    monkeypatch.setattr(config, 'TRANSFORM_BATCH_SIZE', 7)
+    with pytest.raises(ValueError, match='TRANSFORM_BATCH_SIZE'):
+        build().stream_transform_and_load()
+
+    monkeypatch.setattr(config, 'TRANSFORM_BATCH_SIZE', 10)
+    build().stream_transform_and_load()
+    assert loaded() == expected
+
+
+def test_upsert_rerun_with_another_batch_size(stream_etl, monkeypatch):
+    build, loaded = stream_etl
+    monkeypatch.setattr(config, 'LOAD_MODE', 'upsert')
+
+    with pytest.raises(RuntimeError):
+        build(fail_on_batch=2).stream_transform_and_load()
+
+    monkeypatch.setattr(config, 'TRANSFORM_BATCH_SIZE', 7)
+    build().stream_transform_and_load()
+    assert loaded() == [f'NCT{n:08d}' for n in range(1, 31)]
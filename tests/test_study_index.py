@@ -0,0 +1,53 @@
+import os
+
+from etl.study_index import StudyIndex
+from etl.transform import Transformer
+
+from test_engines import COLUMNS, assert_same_frames, comparable, python_frames
+
+
+def plain(df):
+    """Categoricals as their values: a subset only sees some of the categories."""
+    return df.astype({name: object for name, dtype in df.dtypes.items() if dtype == 'category'})
+
+
+def test_locate_finds_row_group_and_offset(compacted_studies):
+    compact_dir = compacted_studies(1, 30, row_group_size=10)
+    files = Transformer.list_parquet_files(compact_dir)
+    index = StudyIndex(compact_dir).ensure(files)
+
+    locations, missing = index.locate(['NCT00000023', 'NCT00000005', 'NCT00000005', 'NCT99999999'])
+
+    assert locations == {('studies.parquet', 0): [4], ('studies.parquet', 2): [2]}
+    assert missing == ['NCT99999999']
+
+
+def test_index_is_rebuilt_when_files_change(compacted_studies):
+    compact_dir = compacted_studies(1, 30, row_group_size=10)
+    files = Transformer.list_parquet_files(compact_dir)
+    StudyIndex(compact_dir).build(files)
+    assert StudyIndex(compact_dir).load(files)
+
+    compacted_studies(1, 40, row_group_size=10)
+    assert not StudyIndex(compact_dir).load(files)
+    assert StudyIndex(compact_dir).ensure(files).locate(['NCT00000035'])[0] == {('studies.parquet', 3): [4]}
+
+
+def test_flatten_studies_matches_full_flatten(compacted_studies):
+    compact_dir = compacted_studies(1, 30, row_group_size=7)
+    nct_ids = ['NCT00000002', 'NCT00000013', 'NCT00000014', 'NCT00000029']
+
+    full = python_frames(compact_dir)
+    study_keys = full['studies'].loc[full['studies']['nct_id'].isin(nct_ids), 'study_key']
+    actual = comparable(Transformer(compact_dir).flatten_studies(compact_dir, nct_ids, COLUMNS))
+
+    # fact tables hold exactly these studies' rows; dimensions only keys they reference
+    facts = {name for name, df in full.items() if 'study_key' in df.columns}
+    assert_same_frames(
+        {name: plain(full[name][full[name]['study_key'].isin(study_keys)].reset_index(drop=True)) for name in facts},
+        {name: plain(actual[name]) for name in facts}
+    )
+    for name in set(full) - facts:
+        key = full[name].columns[0]
+        assert set(actual[name][key]) <= set(full[name][key]), name
+    assert os.path.exists(StudyIndex(compact_dir).index_file)
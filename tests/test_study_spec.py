@@ -0,0 +1,45 @@
+import pytest
+
+from etl.study_spec import STUDY_SPEC, FieldSpec, StudySpec
+from etl.transform import Transformer
+
+SPEC = StudySpec([
+    FieldSpec('title', 'identification.title'),
+    FieldSpec('status', 'status.detail.value', convert='upper'),
+    FieldSpec('count', 'design.count'),
+])
+
+
+@pytest.mark.parametrize('protocol, expected', [
+    (
+        {'identification': {'title': 'T'}, 'status': {'detail': {'value': 'open'}}, 'design': {'count': 0}},
+        {'key': 'k', 'title': 'T', 'status': 'OPEN', 'count': 0},
+    ),
+    ({'identification': None, 'status': {'detail': 'open'}}, {'key': 'k', 'title': None, 'status': None, 'count': None}),
+    ({'design': ['count']}, {'key': 'k', 'title': None, 'status': None, 'count': None}),
+    ({}, {'key': 'k', 'title': None, 'status': None, 'count': None}),
+])
+def test_compiled_row_walks_missing_and_non_dict_nodes(protocol, expected):
+    build_row = SPEC.compile_rows({'upper': lambda value: value.upper() if value else None}, leading=('key',))
+
+    row = build_row(protocol, 'k')
+
+    assert row == expected
+    assert list(row) == ['key', 'title', 'status', 'count']
+
+
+def test_compiled_row_matches_safe_get(studies):
+    converters = {'age_years': Transformer.extract_age_years, 'category': lambda value: value}
+    build_row = STUDY_SPEC.compile_rows(converters, leading=('study_key', 'nct_id'))
+
+    protocols = studies(1, 30)
+    protocols[0]['statusModule'] = None
+    protocols[1]['designModule']['designInfo'] = 'RANDOMIZED'
+    del protocols[2]['eligibilityModule']
+
+    for protocol in protocols:
+        expected = {'study_key': 'key', 'nct_id': 'id'}
+        for field in STUDY_SPEC.fields:
+            value = Transformer.safe_get(protocol, *field.path)
+            expected[field.column] = converters[field.convert](value) if field.convert else value
+        assert build_row(protocol, 'key', 'id') == expected
@@ -0,0 +1,72 @@
+import os
+
+import pandas as pd
+import pytest
+
+from config import config
+from etl.utils.keys import KeyGenerator
+
+pytestmark = pytest.mark.skipif(not os.environ.get('TEST_DATABASE_URL'), reason='needs TEST_DATABASE_URL')
+
+
+@pytest.fixture
+def loader(monkeypatch):
+    from sqlalchemy import text
+    from etl.load import Loader
+
+    monkeypatch.setattr(config, 'DATABASE_URL', os.environ['TEST_DATABASE_URL'])
+    loader = Loader('copy', workers=1, load_mode='append')
+    with loader.engine.begin() as conn:
+        conn.execute(text('DROP SCHEMA IF EXISTS staging CASCADE'))
+        conn.execute(text('CREATE SCHEMA staging'))
+    yield loader
+    loader.close()
+
+
+def test_legacy_texts_are_backfilled_once(loader):
+    from sqlalchemy import text
+
+    # staging.studies as loaded before the texts moved out
+    pd.DataFrame({
+        'study_key': ['a1', 'b2', 'c3'],
+        'nct_id': ['NCT00000001', 'NCT00000002', 'NCT00000003'],
+        'brief_summary': ['Short summary', 'Short summary', None],
+        'detailed_description': ['Long description', None, None],
+        'eligibility_criteria': ['Adults only', 'Short summary', None],
+        'etl_created_at': ['2025-10-08T00:00:00'] * 3,
+    }).to_sql('studies', loader.engine, schema='staging', index=False)
+
+    loader.backfill_study_texts()
+    loader.backfill_study_texts()
+
+    studies = pd.read_sql('SELECT * FROM staging.studies ORDER BY study_key', loader.engine)
+    texts = pd.read_sql('SELECT * FROM staging.study_texts ORDER BY content', loader.engine)
+    keys = KeyGenerator('md5')
+    assert studies['brief_summary_hash'].tolist() == [*keys(['Short summary', 'Short summary']), None]
+    assert studies['detailed_description_hash'].tolist() == [keys(['Long description'])[0], None, None]
+    assert texts['content'].tolist() == ['Adults only', 'Long description', 'Short summary']
+    assert texts['text_hash'].tolist() == keys(texts['content']).tolist()
+    with loader.engine.connect() as conn:
+        assert conn.execute(text('SELECT count(*) FROM staging._migrations')).scalar() == 1
+
+    # a new load carrying a text the backfill already stored does not copy it again
+    loader.load_to_postgres({
+        'studies': pd.DataFrame({
+            'study_key': ['d4'], 'nct_id': ['NCT00000004'], 'brief_summary_hash': keys(['Short summary']),
+            'etl_created_at': ['2025-10-09T00:00:00'],
+        }),
+        'study_texts': pd.DataFrame({
+            'text_hash': keys(['Short summary']), 'content': ['Short summary'], 'etl_created_at': ['2025-10-09T00:00:00'],
+        }),
+    })
+    with loader.engine.connect() as conn:
+        assert conn.execute(text('SELECT count(*) FROM staging.study_texts')).scalar() == 3
+        assert conn.execute(text('SELECT count(*) FROM staging.studies')).scalar() == 4
+
+
+def test_fresh_database_has_nothing_to_backfill(loader):
+    from sqlalchemy import inspect
+
+    loader.backfill_study_texts()
+    with loader.engine.connect() as conn:
+        assert not inspect(conn).has_table('study_texts', schema='staging')
@@ -0,0 +1,40 @@
+import pandas as pd
+
+from etl.transform_cache import TransformCache
+
+
+def flattened_tables():
+    statuses = pd.Categorical.from_codes([0, -1, 1], categories=['RECRUITING', 'COMPLETED'])
+    return {
+        'studies': pd.DataFrame({
+            'study_key': ['a1', 'b2', 'c3'],
+            'overall_status': statuses,
+            # no study has a value, but the vocabulary does
+            'enrollment_type': pd.Categorical.from_codes([-1, -1, -1], categories=['ACTUAL']),
+            # entirely null and never seen by the vocabulary
+            'masking': pd.Categorical.from_codes([-1, -1, -1], categories=[]),
+            'has_dmc': pd.Series([True, None, False], dtype=object),
+            'why_stopped': pd.Series([None, None, None], dtype=object),
+            'enrollment_count': [10, 20, 30],
+            'maximum_age_years': [65.0, None, 18.0],
+        }),
+        'sponsors': pd.DataFrame({'sponsor_key': ['s1'], 'sponsor_class': pd.Categorical(['INDUSTRY'])}),
+    }
+
+
+def test_cache_round_trip_keeps_dtypes(tmp_path):
+    cache = TransformCache(str(tmp_path))
+    tables = flattened_tables()
+    cache.put('entry', tables)
+    cached = cache.get('entry')
+
+    assert list(cached) == list(tables)
+    for name, df in tables.items():
+        assert list(cached[name].columns) == list(df.columns)
+        for column in df.columns:
+            assert cached[name][column].dtype == df[column].dtype, (name, column)
+        pd.testing.assert_frame_equal(cached[name], df)
+
+
+def test_missing_entry_is_a_miss(tmp_path):
+    assert TransformCache(str(tmp_path)).get('absent') is None
@@ -0,0 +1,47 @@
+import pandas as pd
+import pyarrow as pa
+
+from etl.transform import CATEGORICAL_COLUMNS, Transformer
+from etl.utils.vocabulary import Vocabulary
+
+from test_engines import COLUMNS, python_frames
+
+
+def test_codes_are_stable_and_categories_append_only():
+    vocabulary = Vocabulary()
+
+    first = vocabulary.categorical('status', pd.Series(['COMPLETED', None, 'RECRUITING', 'COMPLETED']))
+    second = vocabulary.categorical('status', pd.Series(['TERMINATED', 'RECRUITING']))
+
+    assert list(first.codes) == [0, -1, 1, 0]
+    assert list(second.codes) == [2, 1]
+    assert list(second.categories) == ['COMPLETED', 'RECRUITING', 'TERMINATED']
+    assert list(first.categories) == list(second.categories)[:2]
+
+
+def test_arrow_dictionary_shares_the_codes():
+    vocabulary = Vocabulary()
+    vocabulary.categorical('status', pd.Series(['COMPLETED', 'RECRUITING']))
+
+    encoded = vocabulary.dictionary('status', pa.chunked_array([['RECRUITING', None], ['WITHDRAWN']]))
+
+    assert encoded.indices.to_pylist() == [1, None, 2]
+    assert encoded.dictionary.to_pylist() == ['COMPLETED', 'RECRUITING', 'WITHDRAWN']
+
+
+def test_streamed_batches_share_one_vocabulary(compacted_studies):
+    compact_dir = compacted_studies(1, 30, row_group_size=10)
+    batches = [
+        frames['studies'] for frames in Transformer(compact_dir).stream_parquet_batches(compact_dir, COLUMNS, 4)
+    ]
+    full = python_frames(compact_dir)['studies']
+
+    for column in CATEGORICAL_COLUMNS['studies']:
+        seen = []
+        for batch in batches:
+            categories = list(batch[column].cat.categories)
+            # later batches only ever append, so earlier codes keep their meaning
+            assert categories[:len(seen)] == seen
+            seen = categories
+        values = pd.concat([batch[column].astype(object) for batch in batches], ignore_index=True)
+        pd.testing.assert_series_equal(values, full[column].astype(object), obj=column)